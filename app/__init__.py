@@ -5,9 +5,10 @@ from flask_mail import Mail
 from flask_login import LoginManager
 from app.forms import ModifierMonCompteForm
 from flask_login import current_user
+from app.utils.database import SessionRoutage
 
 # Initialiser les extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SessionRoutage})
 migrate = Migrate()
 mail = Mail()
 login_manager = LoginManager()
@@ -31,6 +32,10 @@ def create_app():
     # Initialiser les extensions avec l'application Flask
     db.init_app(app)
     migrate.init_app(app, db)
+    
+    # Réglages de connexion (PRAGMA SQLite, réplique de lecture)
+    from app.utils.database import configurer_base_de_donnees
+    configurer_base_de_donnees(app, db)
     mail.init_app(app)
     
     @app.context_processor
@@ -80,8 +85,8 @@ def create_app():
     app.register_blueprint(paie_bp)
     
     # Enregistrer les commandes CLI
-    # from app.utils.cli_commands import register_commands
-    # register_commands(app)
+    from app.utils.cli_commands import register_commands
+    register_commands(app)
 
     return app
 
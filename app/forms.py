@@ -264,8 +264,9 @@ class BulletinPaieForm(FlaskForm):
     # Éléments de temps
     nb_jours_ouvres = IntegerField("Jours ouvrés", validators=[DataRequired(), NumberRange(min=1, max=31)],
                                   default=22, render_kw={'class': 'form-control'})
-    nb_jours_travailles = FloatField("Jours travaillés", validators=[DataRequired(), NumberRange(min=0)],
-                                    render_kw={'class': 'form-control', 'step': '0.5'})
+    nb_jours_travailles = FloatField("Jours travaillés", validators=[Optional(), NumberRange(min=0)],
+                                    render_kw={'class': 'form-control', 'step': '0.5',
+                                               'placeholder': 'Calculé depuis les présences si vide'})
     nb_heures_normales = FloatField("Heures normales", validators=[Optional(), NumberRange(min=0)],
                                    render_kw={'class': 'form-control', 'step': '0.25'})
     nb_heures_supplementaires = FloatField("Heures supplémentaires", validators=[Optional(), NumberRange(min=0)],
@@ -677,7 +678,7 @@ class TemplateEvaluationForm(FlaskForm):
                      render_kw={'class': 'form-control'})
     description = TextAreaField("Description", validators=[Optional()],
                                render_kw={'class': 'form-control', 'rows': 3})
-    type_template = SelectField("Type de template", validators=[DataRequired()],
+    type_evaluation = SelectField("Type de template", validators=[DataRequired()],
                                choices=[
                                    ('annuelle', 'Annuelle'),
                                    ('semestrielle', 'Semestrielle'),
@@ -686,9 +687,26 @@ class TemplateEvaluationForm(FlaskForm):
                                    ('autre', 'Autre')
                                ],
                                render_kw={'class': 'form-select'})
-    actif = BooleanField("Template actif", render_kw={'class': 'form-check-input'})
+    score_max = FloatField("Score maximum", default=100.0, validators=[DataRequired(), NumberRange(min=1)],
+                           render_kw={'class': 'form-control'})
+    criteres = TextAreaField("Critères (un par ligne : Section | Critère | score max | poids | description)",
+                             validators=[DataRequired()],
+                             render_kw={'class': 'form-control font-monospace', 'rows': 10,
+                                        'placeholder': 'Compétences techniques | Maîtrise des outils | 5 | 2\n'
+                                                       'Comportement | Travail en équipe | 5 | 1'})
+    actif = BooleanField("Template actif", default=True, render_kw={'class': 'form-check-input'})
+    par_defaut = BooleanField("Template par défaut", render_kw={'class': 'form-check-input'})
     submit = SubmitField("Enregistrer", render_kw={'class': 'btn btn-primary'})
 
+    def validate_criteres(self, field):
+        from app.utils.campagnes_evaluation import analyser_criteres
+        try:
+            self.criteres_analyses = analyser_criteres(field.data)
+        except ValueError as e:
+            raise ValidationError(str(e))
+        if not self.criteres_analyses:
+            raise ValidationError("Saisissez au moins un critère")
+
 class CritereEvaluationForm(FlaskForm):
     """Formulaire pour créer/modifier un critère d'évaluation"""
     nom = StringField("Nom du critère", validators=[DataRequired()],
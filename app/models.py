@@ -58,6 +58,12 @@ class Employee(db.Model):
     manager = db.relationship('Employee', remote_side=[id], backref='subordonne')
     createur = db.relationship('Utilisateur', foreign_keys=[cree_par])
     modificateur = db.relationship('Utilisateur', foreign_keys=[modifie_par])
+    
+    # Index pour optimisation (filtres par statut et regroupements par département)
+    __table_args__ = (
+        db.Index('idx_employee_statut_departement', 'statut', 'departement'),
+        db.Index('idx_employee_departement', 'departement'),
+    )
 
     @property
     def age(self):
@@ -93,8 +99,16 @@ class Absence(db.Model):
     etat = db.Column(db.String(50), default='En attente')  # En attente, Justifiée, Non justifiée
     impact_paie = db.Column(db.Boolean, default=False)
     date_enregistrement = db.Column(db.DateTime, default=datetime.utcnow)
+    date_modification = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     employe = db.relationship('Employee', backref='absences')
+    
+    # Index pour optimisation
+    __table_args__ = (
+        db.Index('idx_absence_date', 'date_absence'),
+        db.Index('idx_absence_etat_date', 'etat', 'date_absence'),
+        db.Index('idx_absence_employe_date', 'employe_id', 'date_absence'),
+    )
 
 class Conge(db.Model):
     __tablename__ = 'conge'
@@ -113,6 +127,7 @@ class Conge(db.Model):
     commentaire_approbateur = db.Column(db.Text)
     justificatif = db.Column(db.String(255))  # Chemin vers le fichier justificatif
     remplacant_id = db.Column(db.Integer, db.ForeignKey('employee.id'))
+    date_modification = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relations
     employe = db.relationship("Employee", backref="conges", foreign_keys=[employe_id])
@@ -120,6 +135,12 @@ class Conge(db.Model):
     approbateur = db.relationship("Utilisateur", foreign_keys=[approbateur_id], backref="conges_approuves")
     remplacant = db.relationship("Employee", foreign_keys=[remplacant_id])
     
+    # Index pour optimisation
+    __table_args__ = (
+        db.Index('idx_conge_statut_dates', 'statut', 'date_debut', 'date_fin'),
+        db.Index('idx_conge_employe_statut', 'employe_id', 'statut'),
+    )
+    
     @property
     def duree_en_jours(self):
         if self.date_debut and self.date_fin:
@@ -171,7 +192,17 @@ class Candidat(db.Model):
     statut = db.Column(db.String(50), default='en cours d\'examen')
 
     offre_emploi_id = db.Column(db.Integer, db.ForeignKey('offre_emploi.id'), nullable=False)
+    # Fichiers déposés, partagés entre candidats quand leur contenu est identique
+    cv_fichier_id = db.Column(db.Integer, db.ForeignKey('fichier_candidature.id'))
+    lettre_fichier_id = db.Column(db.Integer, db.ForeignKey('fichier_candidature.id'))
     entretiens = db.relationship('Entretien', backref='candidat', cascade='all, delete-orphan', lazy=True)
+    cv_fichier = db.relationship('FichierCandidature', foreign_keys=[cv_fichier_id])
+    lettre_fichier = db.relationship('FichierCandidature', foreign_keys=[lettre_fichier_id])
+
+    __table_args__ = (
+        db.Index('idx_candidat_offre_statut', 'offre_emploi_id', 'statut'),
+        db.Index('idx_candidat_offre_email', 'offre_emploi_id', 'email'),
+    )
 
     def __repr__(self):
         return f"<Candidat {self.nom} ({self.statut})>"
@@ -188,10 +219,60 @@ class Entretien(db.Model):
 
     offre_emploi_id = db.Column(db.Integer, db.ForeignKey('offre_emploi.id'), nullable=False)
     candidat_id = db.Column(db.Integer, db.ForeignKey('candidat.id'), nullable=False)
+    participants_employes = db.relationship('ParticipantEntretien', backref='entretien',
+                                            cascade='all, delete-orphan', lazy=True)
+
+    __table_args__ = (
+        db.Index('idx_entretien_offre_datetime', 'offre_emploi_id', 'datetime'),
+    )
 
     def __repr__(self):
         return f"<Entretien {self.titre} pour candidat {self.candidat_id}>"
 
+class ParticipantEntretien(db.Model):
+    """Employé participant à un entretien ; le créneau est recopié pour indexer les occupations"""
+    __tablename__ = 'participant_entretien'
+
+    id = db.Column(db.Integer, primary_key=True)
+    entretien_id = db.Column(db.Integer, db.ForeignKey('entretien.id'), nullable=False)
+    employe_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=False)
+    debut = db.Column(db.DateTime, nullable=False)
+    fin = db.Column(db.DateTime, nullable=False)
+
+    employe = db.relationship('Employee', backref=db.backref('participations_entretiens',
+                                                             cascade='all, delete-orphan'))
+
+    __table_args__ = (
+        db.UniqueConstraint('entretien_id', 'employe_id', name='unique_participant_entretien'),
+        db.Index('idx_participant_employe_debut', 'employe_id', 'debut'),
+    )
+
+    def __repr__(self):
+        return f"<ParticipantEntretien {self.employe_id} {self.debut}-{self.fin}>"
+
+class FichierCandidature(db.Model):
+    """Fichier PDF déposé avec une candidature, stocké une seule fois par contenu (SHA-256)"""
+    __tablename__ = 'fichier_candidature'
+
+    id = db.Column(db.Integer, primary_key=True)
+    empreinte = db.Column(db.String(64), nullable=False, unique=True)
+    chemin = db.Column(db.String(200), nullable=False)  # relatif à static/uploads
+    taille = db.Column(db.Integer, nullable=False)
+    date_depot = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Extraction du texte différée (commande extract-cv-texts) : en_attente, terminee, erreur
+    statut_extraction = db.Column(db.String(20), nullable=False, default='en_attente')
+    texte = db.Column(db.Text)
+    erreur_extraction = db.Column(db.String(255))
+    date_extraction = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('idx_fichier_candidature_extraction', 'statut_extraction', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<FichierCandidature {self.empreinte[:12]} ({self.statut_extraction})>"
+
 class Evaluation(db.Model):
     __tablename__ = 'evaluation'
     id = db.Column(db.Integer, primary_key=True)
@@ -239,6 +320,12 @@ class Evaluation(db.Model):
     template = db.relationship('TemplateEvaluation', backref='evaluations')
     creator = db.relationship('Utilisateur', foreign_keys=[created_by])
     updater = db.relationship('Utilisateur', foreign_keys=[updated_by])
+    
+    # Index pour optimisation
+    __table_args__ = (
+        db.Index('idx_evaluation_annee_statut', 'annee', 'statut'),
+        db.Index('idx_evaluation_employe_annee', 'employe_id', 'annee'),
+    )
 
 class TemplateEvaluation(db.Model):
     __tablename__ = 'template_evaluation'
@@ -283,6 +370,11 @@ class CritereEvaluation(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     evaluation = db.relationship('Evaluation', backref='criteres')
+    
+    # Index pour optimisation
+    __table_args__ = (
+        db.Index('idx_critere_evaluation', 'evaluation_id', 'section', 'ordre'),
+    )
 
 class ObjectifEmploye(db.Model):
     __tablename__ = 'objectif_employe'
@@ -417,6 +509,7 @@ class Presence(db.Model):
     heure_arrivee = db.Column(db.Time, nullable=True)
     heure_depart = db.Column(db.Time, nullable=True)
     retard_minutes = db.Column(db.Integer, default=0)
+    date_modification = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     employe = db.relationship("Employee", backref="presences")
 
@@ -430,6 +523,7 @@ class TypeConge(db.Model):
     duree_max_jours = db.Column(db.Integer)  # Durée maximale en jours
     justificatif_requis = db.Column(db.Boolean, default=False)
     deductible_conge_annuel = db.Column(db.Boolean, default=True)  # Si ce type déduit du congé annuel
+    remunere = db.Column(db.Boolean, default=True)  # False pour un congé sans solde (déduit de la paie)
     couleur = db.Column(db.String(7), default='#007bff')  # Couleur pour l'affichage (format hex)
     actif = db.Column(db.Boolean, default=True)
     ordre_affichage = db.Column(db.Integer, default=0)
@@ -486,6 +580,11 @@ class HistoriqueConge(db.Model):
     conge = db.relationship("Conge", backref="historique")
     utilisateur = db.relationship("Utilisateur", backref="actions_conges")
     
+    # Index pour optimisation
+    __table_args__ = (
+        db.Index('idx_historique_conge_date', 'conge_id', 'date_action'),
+    )
+    
     def __repr__(self):
         return f'<HistoriqueConge {self.action} - {self.date_action}>'
 
@@ -507,6 +606,11 @@ class EmployeeHistory(db.Model):
     employee = db.relationship('Employee', backref='historique')
     user = db.relationship('Utilisateur', backref='modifications_employees')
     
+    # Index pour optimisation
+    __table_args__ = (
+        db.Index('idx_employee_history_employee_date', 'employee_id', 'date_modification'),
+    )
+    
     def __repr__(self):
         return f"<EmployeeHistory {self.action} on {self.employee.nom}>"
 
@@ -603,22 +707,70 @@ class Pointage(db.Model):
     user_agent = db.Column(db.String(200))
     commentaire = db.Column(db.Text)
     valide = db.Column(db.Boolean, default=True)
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id'))  # Site contenant la position GPS
+    
+    # Synchronisation des bornes hors ligne
+    borne_id = db.Column(db.Integer, db.ForeignKey('borne_pointage.id'))
+    sequence = db.Column(db.Integer)  # Numéro de séquence attribué par la borne
+    horodatage_appareil = db.Column(db.DateTime)  # Horodatage brut de la borne, avant correction du décalage
     
     # Horodatage
     timestamp_creation = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relations
     employe = db.relationship('Employee', backref='pointages')
+    borne = db.relationship('BornePointage', backref='pointages')
+    site = db.relationship('Site', backref='pointages')
     
     # Index pour optimisation
     __table_args__ = (
         db.Index('idx_pointage_employe_date', 'employe_id', 'date_pointage'),
         db.Index('idx_pointage_date_type', 'date_pointage', 'type_pointage'),
+        db.UniqueConstraint('borne_id', 'sequence', name='unique_pointage_borne_sequence'),
     )
     
     def __repr__(self):
         return f"<Pointage {self.employe.nom} {self.type_pointage} {self.date_pointage} {self.heure_pointage}>"
 
+class Site(db.Model):
+    """Site de travail : zone circulaire (centre et rayon) ou polygone pour la validation GPS"""
+    __tablename__ = 'site'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    nom = db.Column(db.String(100), unique=True, nullable=False)
+    adresse = db.Column(db.String(200))
+    
+    # Zone : polygone [[lat, lon], ...] prioritaire, sinon cercle autour du centre
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    rayon_metres = db.Column(db.Integer)  # Vide : rayon_presence_metres des paramètres
+    polygone = db.Column(db.JSON)
+    
+    actif = db.Column(db.Boolean, default=True)
+    date_creation = db.Column(db.DateTime, default=datetime.utcnow)
+    date_modification = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<Site {self.nom}>"
+
+class BornePointage(db.Model):
+    """Borne de pointage pouvant fonctionner hors ligne et synchroniser ses pointages par lots"""
+    __tablename__ = 'borne_pointage'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    identifiant = db.Column(db.String(50), unique=True, nullable=False)
+    nom = db.Column(db.String(100))
+    active = db.Column(db.Boolean, default=True)
+    
+    # Curseur d'acquittement : toutes les séquences jusqu'à cette valeur ont été reçues
+    dernier_sequence = db.Column(db.Integer, nullable=False, default=0)
+    decalage_secondes = db.Column(db.Float, nullable=False, default=0.0)  # Horloge serveur - horloge borne
+    date_derniere_synchro = db.Column(db.DateTime)
+    date_creation = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<BornePointage {self.identifiant} seq={self.dernier_sequence}>"
+
 class HeuresTravail(db.Model):
     """Calcul des heures de travail journalières (table consolidée)"""
     __tablename__ = 'heures_travail'
@@ -717,11 +869,128 @@ class NotificationPresence(db.Model):
     __table_args__ = (
         db.Index('idx_notif_employe_date', 'employe_id', 'date_reference'),
         db.Index('idx_notif_type_statut', 'type_notification', 'statut'),
+        db.Index('idx_notif_statut_date', 'statut', 'date_reference'),
+        db.Index('idx_notif_rh_statut_id', 'destinataire_rh', 'statut', 'id'),
     )
     
     def __repr__(self):
         return f"<NotificationPresence {self.type_notification} {self.employe.nom} {self.date_reference}>"
 
+class NotificationPresenceArchive(db.Model):
+    """Notifications de présence traitées archivées (table froide)"""
+    __tablename__ = 'notification_presence_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)  # Même identifiant que dans notification_presence
+    employe_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=False)
+    type_notification = db.Column(db.String(50), nullable=False)
+    titre = db.Column(db.String(100), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    priorite = db.Column(db.String(20))
+    destinataire_employe = db.Column(db.Boolean)
+    destinataire_manager = db.Column(db.Boolean)
+    destinataire_rh = db.Column(db.Boolean)
+    statut = db.Column(db.String(20))
+    date_envoi = db.Column(db.DateTime)
+    date_lecture = db.Column(db.DateTime)
+    date_reference = db.Column(db.Date, nullable=False)
+    donnees_reference = db.Column(db.JSON)
+    date_creation = db.Column(db.DateTime)
+    date_archivage = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_notif_archive_employe_date', 'employe_id', 'date_reference'),
+    )
+
+class CompteurNotification(db.Model):
+    """Compteurs maintenus à l'écriture (cache du nombre de notifications non lues)"""
+    __tablename__ = 'compteur_notification'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    cle = db.Column(db.String(50), unique=True, nullable=False)
+    valeur = db.Column(db.Integer, nullable=False, default=0)
+    date_mise_a_jour = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<CompteurNotification {self.cle}={self.valeur}>"
+
+class ArchivePresence(db.Model):
+    """Manifeste des mois de pointages et d'heures déplacés vers les tables d'archive annuelles"""
+    __tablename__ = 'archive_presence'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(50), nullable=False)  # pointage, heures_travail
+    annee = db.Column(db.Integer, nullable=False)
+    mois = db.Column(db.Integer, nullable=False)
+    table_archive = db.Column(db.String(64), nullable=False)
+    nb_lignes = db.Column(db.Integer, nullable=False, default=0)
+    date_archivage = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('source', 'annee', 'mois', name='unique_archive_source_mois'),
+    )
+    
+    def __repr__(self):
+        return f"<ArchivePresence {self.source} {self.mois:02d}/{self.annee} ({self.nb_lignes})>"
+
+class StatistiquePresenceJour(db.Model):
+    """Agrégats journaliers de présence par département (table de faits)"""
+    __tablename__ = 'statistique_presence_jour'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    date_travail = db.Column(db.Date, nullable=False)
+    departement = db.Column(db.String(50), nullable=False, default='')  # '' si non renseigné
+    
+    # Compteurs (lignes HeuresTravail du jour)
+    nb_enregistrements = db.Column(db.Integer, nullable=False, default=0)
+    nb_presents = db.Column(db.Integer, nullable=False, default=0)   # present + retard
+    nb_absents = db.Column(db.Integer, nullable=False, default=0)
+    nb_retards = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Sommes
+    heures_travaillees = db.Column(db.Float, nullable=False, default=0.0)
+    heures_supplementaires = db.Column(db.Float, nullable=False, default=0.0)
+    retard_minutes = db.Column(db.Integer, nullable=False, default=0)
+    retard_minutes_retards = db.Column(db.Integer, nullable=False, default=0)  # lignes au statut 'retard' uniquement
+    
+    date_mise_a_jour = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('date_travail', 'departement', name='unique_statistique_date_departement'),
+    )
+    
+    def __repr__(self):
+        return f"<StatistiquePresenceJour {self.date_travail} {self.departement} {self.nb_presents}/{self.nb_enregistrements}>"
+
+class HeuresSemaine(db.Model):
+    """Cumul hebdomadaire des heures par employé (semaine ISO, du lundi au dimanche)"""
+    __tablename__ = 'heures_semaine'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    employe_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=False)
+    date_debut_semaine = db.Column(db.Date, nullable=False)  # Lundi de la semaine
+    
+    nb_jours = db.Column(db.Integer, nullable=False, default=0)
+    heures_travaillees = db.Column(db.Float, nullable=False, default=0.0)
+    heures_normales = db.Column(db.Float, nullable=False, default=0.0)
+    heures_supplementaires = db.Column(db.Float, nullable=False, default=0.0)
+    
+    # Ventilation des heures supplémentaires par tranche de majoration (ParametresPaie.hs_25 / hs_50)
+    heures_sup_25 = db.Column(db.Float, nullable=False, default=0.0)
+    heures_sup_50 = db.Column(db.Float, nullable=False, default=0.0)
+    
+    date_mise_a_jour = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relations
+    employe = db.relationship('Employee', backref=db.backref('heures_semaines', cascade='all, delete-orphan'))
+    
+    __table_args__ = (
+        db.UniqueConstraint('employe_id', 'date_debut_semaine', name='unique_employe_semaine'),
+        db.Index('idx_heures_semaine_date', 'date_debut_semaine'),
+    )
+    
+    def __repr__(self):
+        return f"<HeuresSemaine {self.employe_id} {self.date_debut_semaine} {self.heures_travaillees}h (+{self.heures_supplementaires}h)>"
+
 # Extension du modèle Presence existant pour compatibilité
 # (Le modèle Presence existant est conservé pour la compatibilité ascendante)
 
@@ -870,6 +1139,7 @@ class BulletinPaie(db.Model):
         db.UniqueConstraint('employe_id', 'mois', 'annee', name='unique_bulletin_employe_periode'),
         db.Index('idx_bulletin_periode', 'mois', 'annee'),
         db.Index('idx_bulletin_employe', 'employe_id'),
+        db.Index('idx_bulletin_statut', 'statut'),
     )
     
     @property
@@ -923,6 +1193,11 @@ class ElementPaie(db.Model):
     # Relations
     bulletin = db.relationship('BulletinPaie', backref='elements_paie')
     
+    # Index pour optimisation
+    __table_args__ = (
+        db.Index('idx_element_paie_bulletin_type', 'bulletin_id', 'type_element'),
+    )
+    
     def __repr__(self):
         return f"<ElementPaie {self.libelle}: {self.montant}>"
 
@@ -952,6 +1227,11 @@ class HistoriquePaie(db.Model):
     bulletin = db.relationship('BulletinPaie', backref='historique_paie')
     utilisateur = db.relationship('Utilisateur', backref='actions_paie')
     
+    # Index pour optimisation
+    __table_args__ = (
+        db.Index('idx_historique_paie_bulletin_date', 'bulletin_id', 'date_action'),
+    )
+    
     def __repr__(self):
         return f"<HistoriquePaie {self.action} - {self.date_action}>"
 
@@ -991,6 +1271,12 @@ class AvanceSalaire(db.Model):
     demandeur = db.relationship('Utilisateur', foreign_keys=[demandeur_id])
     approbateur = db.relationship('Utilisateur', foreign_keys=[approbateur_id])
     
+    # Index pour optimisation
+    __table_args__ = (
+        db.Index('idx_avance_employe_statut', 'employe_id', 'statut'),
+        db.Index('idx_avance_statut_date', 'statut', 'date_demande'),
+    )
+    
     @property
     def est_soldee(self):
         """Vérifie si l'avance est entièrement remboursée"""
@@ -1019,6 +1305,11 @@ class RemboursementAvance(db.Model):
     avance = db.relationship('AvanceSalaire', backref='remboursements')
     bulletin = db.relationship('BulletinPaie', backref='remboursements_avances')
     
+    # Index pour optimisation
+    __table_args__ = (
+        db.Index('idx_remboursement_bulletin', 'bulletin_id'),
+    )
+    
     def __repr__(self):
         return f"<RemboursementAvance {self.montant} FCFA>"
 
@@ -1,23 +1,34 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, current_app, request, jsonify, send_file
+from flask import Blueprint, render_template, redirect, url_for, flash, current_app, request, jsonify, send_file, Response
 from flask_login import login_required, current_user
 from app.models import (Conge, Employee, Absence, 
                        TypeConge, SoldeConge, HistoriqueConge, Utilisateur,
-                       Presence, ParametrePresence, Pointage, HeuresTravail, NotificationPresence)
+                       Presence, ParametrePresence, Pointage, HeuresTravail, NotificationPresence, BornePointage, Site, ArchivePresence)
 from app.forms import (AbsenceForm, CongeForm as CongeFormV1, ApprovalCongeForm, TypeCongeForm, SoldeCongeForm,
                       ParametrePresenceForm, PointageForm, HeuresTravailForm, RapportPresenceForm)
 from app import db
 import os
 from datetime import datetime, date, timedelta, time
 from app.utils.permissions import permission_requise
+from app.utils.database import lecture_replica
 from werkzeug.utils import secure_filename
 from io import BytesIO
 import pandas as pd
-from weasyprint import HTML
-from sqlalchemy import and_, or_, func, extract
+from sqlalchemy import and_, or_, func, extract, insert, case
 from collections import defaultdict
 import json
 from calendar import monthrange
 from app.utils.email_service import email_service
+from app.utils.statistiques_presence import actualiser_statistiques_presence, statistiques_presence_periode
+from app.utils.heures_hebdomadaires import actualiser_heures_semaine, debut_semaine
+from app.utils.notifications_presence import creer_notifications_presence
+from app.utils.boite_notifications import lister_notifications, compter_non_lues, mettre_a_jour_statut
+from app.utils.flux_presences import diffuseur_presences, publier_evenement
+from app.utils.synchro_bornes import synchroniser_borne, lire_horodatage, TAILLE_LOT_MAX
+from sqlalchemy.exc import IntegrityError
+from app.utils.geofence import appliquer_geofence, lire_definition_site
+from app.utils.archivage_presences import heures_travail_periode, mois_archive
+from app.utils.rapports_pdf import rapport_pdf, paragraphes_synthese
+from app.utils.cache_rapports import rapport_en_cache
 
 conges_temps_bp = Blueprint('conges_temps', __name__, template_folder='../templates/conges_temps')
 
@@ -55,6 +66,80 @@ def log_conge_action(conge_id, action, ancien_statut=None, nouveau_statut=None,
     except Exception as e:
         print(f"Erreur lors de l'enregistrement de l'historique: {e}")
 
+def appliquer_decision_conges(conge_ids, decision, commentaire=None):
+    """Approuve ou rejette un lot de demandes de congé dans la transaction courante
+    
+    Les demandes sont chargées en une requête, l'historique et les soldes sont
+    écrits en masse. Seules les demandes encore en attente sont traitées ; la
+    liste des identifiants effectivement traités est retournée.
+    """
+    action = 'APPROVE' if decision == 'Approuvé' else 'REJECT'
+    maintenant = datetime.utcnow()
+    
+    conges = Conge.query.filter(
+        Conge.id.in_(conge_ids),
+        Conge.statut == 'En attente'
+    ).all()
+    
+    if not conges:
+        return []
+    
+    historiques = []
+    jours_par_solde = defaultdict(int)
+    
+    for conge in conges:
+        historiques.append({
+            'conge_id': conge.id,
+            'action': action,
+            'ancien_statut': conge.statut,
+            'nouveau_statut': decision,
+            'commentaire': commentaire,
+            'utilisateur_id': current_user.id,
+            'date_action': maintenant
+        })
+        
+        conge.statut = decision
+        conge.approbateur_id = current_user.id
+        conge.date_approbation = maintenant
+        conge.commentaire_approbateur = commentaire
+        
+        # Si approuvé, cumuler les jours à déduire par employé et par année
+        if decision == 'Approuvé':
+            jours_par_solde[(conge.employe_id, conge.date_debut.year)] += conge.nombre_jours
+    
+    db.session.execute(insert(HistoriqueConge), historiques)
+    
+    if jours_par_solde:
+        employe_ids = {employe_id for employe_id, _ in jours_par_solde}
+        annees = {annee for _, annee in jours_par_solde}
+        soldes = {
+            (solde.employe_id, solde.annee): solde
+            for solde in SoldeConge.query.filter(
+                SoldeConge.employe_id.in_(employe_ids),
+                SoldeConge.annee.in_(annees)
+            ).all()
+        }
+        
+        nouveaux_soldes = []
+        for (employe_id, annee), jours_pris in jours_par_solde.items():
+            solde = soldes.get((employe_id, annee))
+            if solde:
+                solde.jours_pris += jours_pris
+                solde.date_maj = maintenant
+            else:
+                nouveaux_soldes.append({
+                    'employe_id': employe_id,
+                    'annee': annee,
+                    'jours_alloues': 25,  # Valeur par défaut
+                    'jours_pris': jours_pris,
+                    'date_maj': maintenant
+                })
+        
+        if nouveaux_soldes:
+            db.session.execute(insert(SoldeConge), nouveaux_soldes)
+    
+    return [conge.id for conge in conges]
+
 def calculer_jours_ouvrables(date_debut, date_fin):
     """Calcule le nombre de jours ouvrables entre deux dates"""
     if not date_debut or not date_fin:
@@ -363,6 +448,59 @@ def rejeter_demande_conge(id):
     """Rejeter une demande de congé (alias pour rejeter)"""
     return rejeter_conge(id)
 
+@conges_temps_bp.route('/conges-temps/conges/decision-groupee', methods=['POST'])
+@login_required
+@permission_requise('absences_conges')
+def decision_groupee_conges():
+    """Approuver ou rejeter plusieurs demandes de congé en une seule opération"""
+    data = request.get_json(silent=True)
+    if data:
+        conge_ids = [int(conge_id) for conge_id in data.get('conge_ids', []) if str(conge_id).isdigit()]
+        decision = data.get('decision')
+        commentaire = data.get('commentaire')
+    else:
+        conge_ids = request.form.getlist('conge_ids', type=int)
+        decision = request.form.get('decision')
+        commentaire = request.form.get('commentaire')
+    
+    if decision not in ('Approuvé', 'Rejeté') or not conge_ids:
+        if request.is_json:
+            return jsonify({'error': 'Décision ou liste de congés invalide'}), 400
+        flash("Décision ou liste de congés invalide", "danger")
+        return redirect(url_for('conges_temps.list_conges'))
+    
+    try:
+        traites = appliquer_decision_conges(conge_ids, decision, commentaire)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        if request.is_json:
+            return jsonify({'error': str(e)}), 500
+        flash(f"Erreur lors du traitement groupé: {str(e)}", "danger")
+        return redirect(url_for('conges_temps.list_conges'))
+    
+    # Envoyer les notifications email en un seul lot
+    if traites:
+        try:
+            email_service.notify_leave_decisions(traites, decision)
+        except Exception as e:
+            print(f"Erreur envoi emails groupés: {e}")
+    
+    ignores = len(set(conge_ids)) - len(traites)
+    
+    if request.is_json:
+        return jsonify({
+            'success': True,
+            'decision': decision,
+            'traites': traites,
+            'ignores': ignores
+        })
+    
+    flash(f"{len(traites)} demande(s) de congé traitée(s) ({decision.lower()})", "success")
+    if ignores:
+        flash(f"{ignores} demande(s) ignorée(s) car déjà traitée(s) ou introuvable(s)", "warning")
+    return redirect(url_for('conges_temps.list_conges'))
+
 # ============= GESTION DES ABSENCES =============
 
 @conges_temps_bp.route('/conges-temps/absences')
@@ -492,6 +630,7 @@ def list_soldes():
 @conges_temps_bp.route('/conges-temps/export/conges/excel')
 @login_required
 @permission_requise('absences_conges')
+@lecture_replica
 def export_conges_excel():
     """Export des congés en Excel"""
     conges = Conge.query.join(Employee).all()
@@ -563,6 +702,7 @@ def api_get_solde(employe_id, annee):
 
 @conges_temps_bp.route('/api/conges/calendrier')
 @login_required
+@lecture_replica
 def api_conges_calendrier():
     """API pour le calendrier des congés"""
     conges = Conge.query.filter_by(statut='Approuvé').all()
@@ -624,55 +764,133 @@ def calculer_retard(heure_arrivee, heure_standard, tolerance_minutes=15):
     return 0
 
 def generer_notifications_presence(employe_id, date_reference, type_notif, donnees):
-    """Génère des notifications automatiques de présence"""
+    """Génère une notification automatique de présence (sans doublon pour le même jour)"""
     try:
-        employe = Employee.query.get(employe_id)
-        if not employe:
-            return
-        
-        # Définir les messages selon le type
-        messages = {
-            'retard': {
-                'titre': f'Retard détecté - {employe.nom}',
-                'message': f'{employe.nom} est arrivé en retard de {donnees.get("retard_minutes", 0)} minutes le {date_reference.strftime("%d/%m/%Y")}.',
-                'priorite': 'normale'
-            },
-            'absence': {
-                'titre': f'Absence détectée - {employe.nom}',
-                'message': f'{employe.nom} est absent le {date_reference.strftime("%d/%m/%Y")} sans justification.',
-                'priorite': 'haute'
-            },
-            'depart_anticipe': {
-                'titre': f'Départ anticipé - {employe.nom}',
-                'message': f'{employe.nom} est parti {donnees.get("depart_anticipe_minutes", 0)} minutes plus tôt le {date_reference.strftime("%d/%m/%Y")}.',
-                'priorite': 'normale'
-            },
-            'heures_sup': {
-                'titre': f'Heures supplémentaires - {employe.nom}',
-                'message': f'{employe.nom} a effectué {donnees.get("heures_sup", 0)} heures supplémentaires le {date_reference.strftime("%d/%m/%Y")}.',
-                'priorite': 'normale'
-            }
+        creer_notifications_presence([(employe_id, type_notif, date_reference, donnees)])
+    except Exception as e:
+        print(f"Erreur génération notification: {e}")
+
+def publier_pointage(pointage):
+    """Annonce un nouveau pointage aux tableaux de bord connectés (après commit)"""
+    publier_evenement('pointage', {
+        'id': pointage.id,
+        'employe_id': pointage.employe_id,
+        'employe': pointage.employe.nom if pointage.employe else None,
+        'type_pointage': pointage.type_pointage,
+        'date': pointage.date_pointage.isoformat(),
+        'heure': pointage.heure_pointage.strftime('%H:%M')
+    })
+
+def publier_heures_travail(heures_travail):
+    """Annonce le nouveau statut d'une journée et les compteurs du jour mis à jour (après commit)"""
+    faits = statistiques_presence_periode(heures_travail.date_travail, heures_travail.date_travail)
+    publier_evenement('heures', {
+        'employe_id': heures_travail.employe_id,
+        'date': heures_travail.date_travail.isoformat(),
+        'statut': heures_travail.statut,
+        'heures_travaillees': heures_travail.heures_travaillees,
+        'retard_minutes': heures_travail.retard_minutes,
+        'stats_jour': {
+            'presents': faits['nb_presents'],
+            'absents': faits['nb_absents'],
+            'retards': faits['nb_retards']
         }
-        
-        if type_notif not in messages:
-            return
-        
-        info = messages[type_notif]
-        
-        notification = NotificationPresence(
+    })
+
+def calculer_journee(employe_id, date_travail, params):
+    """Calcule les heures d'une journée à partir de ses pointages valides (sans commit)"""
+    # Récupérer les pointages de la journée
+    pointages = Pointage.query.filter(
+        Pointage.employe_id == employe_id,
+        Pointage.date_pointage == date_travail,
+        Pointage.valide == True
+    ).order_by(Pointage.heure_pointage).all()
+    
+    if not pointages:
+        return None
+    
+    # Trouver la première entrée et la dernière sortie
+    entrees = [p for p in pointages if p.type_pointage == 'entree']
+    sorties = [p for p in pointages if p.type_pointage == 'sortie']
+    
+    if not entrees or not sorties:
+        return None
+    
+    heure_arrivee = entrees[0].heure_pointage
+    heure_depart = sorties[-1].heure_pointage
+    
+    # Calculer les pauses
+    pauses_debut = [p for p in pointages if p.type_pointage == 'pause_debut']
+    pauses_fin = [p for p in pointages if p.type_pointage == 'pause_fin']
+    
+    duree_pause_minutes = 0
+    for i, pause_debut in enumerate(pauses_debut):
+        if i < len(pauses_fin):
+            pause_fin = pauses_fin[i]
+            today = date.today()
+            dt_debut = datetime.combine(today, pause_debut.heure_pointage)
+            dt_fin = datetime.combine(today, pause_fin.heure_pointage)
+            duree_pause_minutes += (dt_fin - dt_debut).total_seconds() / 60
+    
+    # Si pas de pause explicite, utiliser la pause standard
+    if duree_pause_minutes == 0:
+        duree_pause_minutes = params.duree_pause_minutes
+    
+    # Calculer les heures travaillées
+    heures_travaillees = calculer_heures_travaillees(heure_arrivee, heure_depart, duree_pause_minutes)
+    
+    # Calculer le retard
+    retard_minutes = calculer_retard(heure_arrivee, params.heure_arrivee_standard, params.tolerance_retard_minutes)
+    
+    # Calculer les heures supplémentaires
+    heures_normales = min(heures_travaillees, params.seuil_hs_quotidien)
+    heures_supplementaires = max(0, heures_travaillees - params.seuil_hs_quotidien)
+    
+    # Déterminer le statut
+    statut = 'present'
+    if retard_minutes > 0:
+        statut = 'retard'
+    if heures_travaillees < params.heures_minimum_journee:
+        statut = 'absent'
+    
+    # Créer ou mettre à jour l'enregistrement
+    heures_travail = HeuresTravail.query.filter_by(
+        employe_id=employe_id,
+        date_travail=date_travail
+    ).first()
+    
+    if not heures_travail:
+        heures_travail = HeuresTravail(
             employe_id=employe_id,
-            type_notification=type_notif,
-            titre=info['titre'],
-            message=info['message'],
-            priorite=info['priorite'],
-            date_reference=date_reference,
-            donnees_reference=donnees
+            date_travail=date_travail
         )
-        
-        db.session.add(notification)
-        
-    except Exception as e:
-        print(f"Erreur génération notification: {e}")
+        db.session.add(heures_travail)
+    
+    # Mettre à jour les données
+    heures_travail.heure_arrivee = heure_arrivee
+    heures_travail.heure_depart = heure_depart
+    heures_travail.duree_pause_minutes = int(duree_pause_minutes)
+    heures_travail.heures_travaillees = heures_travaillees
+    heures_travail.heures_normales = heures_normales
+    heures_travail.heures_supplementaires = heures_supplementaires
+    heures_travail.retard_minutes = retard_minutes
+    heures_travail.statut = statut
+    heures_travail.calcule_automatiquement = True
+    
+    return heures_travail
+
+def evenements_journee(heures_travail, params):
+    """Notifications de présence dues pour une journée calculée"""
+    evenements = []
+    if params.notifier_retard and heures_travail.retard_minutes > 0:
+        evenements.append((heures_travail.employe_id, 'retard', heures_travail.date_travail,
+                           {'retard_minutes': heures_travail.retard_minutes}))
+    if params.notifier_absence and heures_travail.statut == 'absent':
+        evenements.append((heures_travail.employe_id, 'absence', heures_travail.date_travail, {}))
+    if params.notifier_heures_supplementaires and heures_travail.heures_supplementaires > 0:
+        evenements.append((heures_travail.employe_id, 'heures_sup', heures_travail.date_travail,
+                           {'heures_sup': heures_travail.heures_supplementaires}))
+    return evenements
 
 def mettre_a_jour_heures_travail(employe_id, date_travail):
     """Met à jour automatiquement les heures de travail d'un employé pour une date"""
@@ -682,103 +900,27 @@ def mettre_a_jour_heures_travail(employe_id, date_travail):
         if not params:
             return
         
-        # Récupérer les pointages de la journée
-        pointages = Pointage.query.filter(
-            Pointage.employe_id == employe_id,
-            Pointage.date_pointage == date_travail,
-            Pointage.valide == True
-        ).order_by(Pointage.heure_pointage).all()
-        
-        if not pointages:
-            return
-        
-        # Trouver la première entrée et la dernière sortie
-        entrees = [p for p in pointages if p.type_pointage == 'entree']
-        sorties = [p for p in pointages if p.type_pointage == 'sortie']
-        
-        if not entrees or not sorties:
+        heures_travail = calculer_journee(employe_id, date_travail, params)
+        if heures_travail is None:
             return
         
-        heure_arrivee = entrees[0].heure_pointage
-        heure_depart = sorties[-1].heure_pointage
-        
-        # Calculer les pauses
-        pauses_debut = [p for p in pointages if p.type_pointage == 'pause_debut']
-        pauses_fin = [p for p in pointages if p.type_pointage == 'pause_fin']
-        
-        duree_pause_minutes = 0
-        for i, pause_debut in enumerate(pauses_debut):
-            if i < len(pauses_fin):
-                pause_fin = pauses_fin[i]
-                today = date.today()
-                dt_debut = datetime.combine(today, pause_debut.heure_pointage)
-                dt_fin = datetime.combine(today, pause_fin.heure_pointage)
-                duree_pause_minutes += (dt_fin - dt_debut).total_seconds() / 60
-        
-        # Si pas de pause explicite, utiliser la pause standard
-        if duree_pause_minutes == 0:
-            duree_pause_minutes = params.duree_pause_minutes
-        
-        # Calculer les heures travaillées
-        heures_travaillees = calculer_heures_travaillees(heure_arrivee, heure_depart, duree_pause_minutes)
-        
-        # Calculer le retard
-        retard_minutes = calculer_retard(heure_arrivee, params.heure_arrivee_standard, params.tolerance_retard_minutes)
-        
-        # Calculer les heures supplémentaires
-        heures_normales = min(heures_travaillees, params.seuil_hs_quotidien)
-        heures_supplementaires = max(0, heures_travaillees - params.seuil_hs_quotidien)
-        
-        # Déterminer le statut
-        statut = 'present'
-        if retard_minutes > 0:
-            statut = 'retard'
-        if heures_travaillees < params.heures_minimum_journee:
-            statut = 'absent'
-        
-        # Créer ou mettre à jour l'enregistrement
-        heures_travail = HeuresTravail.query.filter_by(
-            employe_id=employe_id,
-            date_travail=date_travail
-        ).first()
-        
-        if not heures_travail:
-            heures_travail = HeuresTravail(
-                employe_id=employe_id,
-                date_travail=date_travail
-            )
-            db.session.add(heures_travail)
+        # Mettre à jour les agrégats journaliers du département et le cumul hebdomadaire
+        actualiser_statistiques_presence(date_travail, employe_id)
+        actualiser_heures_semaine(employe_id, date_travail, params)
+        publier_heures_travail(heures_travail)
         
-        # Mettre à jour les données
-        heures_travail.heure_arrivee = heure_arrivee
-        heures_travail.heure_depart = heure_depart
-        heures_travail.duree_pause_minutes = int(duree_pause_minutes)
-        heures_travail.heures_travaillees = heures_travaillees
-        heures_travail.heures_normales = heures_normales
-        heures_travail.heures_supplementaires = heures_supplementaires
-        heures_travail.retard_minutes = retard_minutes
-        heures_travail.statut = statut
-        heures_travail.calcule_automatiquement = True
-        
-        # Générer notifications si nécessaire
-        if params.notifier_retard and retard_minutes > 0:
-            generer_notifications_presence(employe_id, date_travail, 'retard', {'retard_minutes': retard_minutes})
-            # Envoyer notification email
-            try:
-                email_service.notify_attendance_issue(employe_id, 'retard', {'retard_minutes': retard_minutes, 'date': date_travail})
-            except Exception as e:
-                print(f"Erreur envoi email retard: {e}")
-        
-        if params.notifier_absence and statut == 'absent':
-            generer_notifications_presence(employe_id, date_travail, 'absence', {})
+        # Générer notifications si nécessaire (en une seule insertion)
+        evenements = evenements_journee(heures_travail, params)
+        for _, type_notif, _, donnees in evenements:
+            if type_notif not in ('retard', 'absence'):
+                continue
             # Envoyer notification email
             try:
-                email_service.notify_attendance_issue(employe_id, 'absence', {'date': date_travail})
+                email_service.notify_attendance_issue(employe_id, type_notif, dict(donnees, date=date_travail))
             except Exception as e:
-                print(f"Erreur envoi email absence: {e}")
+                print(f"Erreur envoi email {type_notif}: {e}")
         
-        if params.notifier_heures_supplementaires and heures_supplementaires > 0:
-            generer_notifications_presence(employe_id, date_travail, 'heures_sup', {'heures_sup': heures_supplementaires})
+        creer_notifications_presence(evenements)
         
         db.session.commit()
         
@@ -786,6 +928,37 @@ def mettre_a_jour_heures_travail(employe_id, date_travail):
         db.session.rollback()
         print(f"Erreur mise à jour heures travail: {e}")
 
+def recalculer_journees(journees):
+    """Recalcule en un lot les journées (employé, date) d'une synchronisation de borne (sans commit).
+
+    Pas d'email pour des pointages rejoués après coup, seulement les notifications de
+    l'application. Retourne le nombre de journées recalculées.
+    """
+    params = ParametrePresence.query.first()
+    if not params:
+        return 0
+    
+    recalculees = [h for h in (calculer_journee(employe_id, jour, params) for employe_id, jour in journees)
+                   if h is not None]
+    if not recalculees:
+        return 0
+    
+    # Agrégats : une fois par jour et par semaine d'employé touchés
+    for jour in {h.date_travail for h in recalculees}:
+        actualiser_statistiques_presence(jour)
+    semaines = {}
+    for h in recalculees:
+        semaines.setdefault((h.employe_id, debut_semaine(h.date_travail)), h.date_travail)
+    for (employe_id, _), jour in semaines.items():
+        actualiser_heures_semaine(employe_id, jour, params)
+    
+    for heures_travail in recalculees:
+        publier_heures_travail(heures_travail)
+    creer_notifications_presence(
+        evenement for h in recalculees for evenement in evenements_journee(h, params)
+    )
+    return len(recalculees)
+
 # ============= ROUTES PRINCIPALES PRESENCES =============
 
 @conges_temps_bp.route('/conges-temps/presences')
@@ -795,20 +968,12 @@ def presences_dashboard():
     """Dashboard principal du module présences"""
     today = date.today()
     
-    # Statistiques du jour
+    # Statistiques du jour (agrégats journaliers)
+    faits_jour = statistiques_presence_periode(today, today)
     stats_jour = {
-        'presents': HeuresTravail.query.filter(
-            HeuresTravail.date_travail == today,
-            HeuresTravail.statut.in_(['present', 'retard'])
-        ).count(),
-        'absents': HeuresTravail.query.filter(
-            HeuresTravail.date_travail == today,
-            HeuresTravail.statut == 'absent'
-        ).count(),
-        'retards': HeuresTravail.query.filter(
-            HeuresTravail.date_travail == today,
-            HeuresTravail.statut == 'retard'
-        ).count(),
+        'presents': faits_jour['nb_presents'],
+        'absents': faits_jour['nb_absents'],
+        'retards': faits_jour['nb_retards'],
         'total_employes': Employee.query.filter_by(statut='Actif').count()
     }
     
@@ -840,6 +1005,9 @@ def pointage():
     ]
     
     if form.validate_on_submit():
+        if mois_archive(form.date_pointage.data):
+            flash('Ce mois est clos et archivé : aucun pointage ne peut y être ajouté', 'error')
+            return redirect(url_for('conges_temps.pointage'))
         try:
             # Créer le pointage
             pointage = Pointage(
@@ -855,15 +1023,21 @@ def pointage():
                 ip_address=request.remote_addr,
                 user_agent=request.headers.get('User-Agent', '')[:200]
             )
+            dans_zone = appliquer_geofence(pointage)
             
             db.session.add(pointage)
+            db.session.flush()
+            publier_pointage(pointage)
             db.session.commit()
             
             # Mettre à jour les heures de travail si c'est une sortie
             if form.type_pointage.data == 'sortie':
                 mettre_a_jour_heures_travail(form.employe_id.data, form.date_pointage.data)
             
-            flash('Pointage enregistré avec succès', 'success')
+            if dans_zone:
+                flash('Pointage enregistré avec succès', 'success')
+            else:
+                flash('Pointage enregistré mais invalidé : position hors des sites autorisés', 'warning')
             return redirect(url_for('conges_temps.pointage'))
             
         except Exception as e:
@@ -890,38 +1064,58 @@ def gestion_heures():
     date_fin = request.args.get('date_fin')
     statut = request.args.get('statut')
     
-    # Query de base
-    query = HeuresTravail.query.join(Employee)
+    debut = datetime.strptime(date_debut, '%Y-%m-%d').date() if date_debut else None
+    fin = datetime.strptime(date_fin, '%Y-%m-%d').date() if date_fin else None
+    
+    # Query de base (archives comprises pour une période ancienne)
+    heures = heures_travail_periode(debut, fin)
+    query = db.session.query(heures).join(Employee, heures.employe_id == Employee.id)
     
     # Appliquer les filtres
     if employe_id:
-        query = query.filter(HeuresTravail.employe_id == employe_id)
+        query = query.filter(heures.employe_id == employe_id)
     
-    if date_debut:
-        query = query.filter(HeuresTravail.date_travail >= datetime.strptime(date_debut, '%Y-%m-%d').date())
+    if debut:
+        query = query.filter(heures.date_travail >= debut)
     
-    if date_fin:
-        query = query.filter(HeuresTravail.date_travail <= datetime.strptime(date_fin, '%Y-%m-%d').date())
+    if fin:
+        query = query.filter(heures.date_travail <= fin)
     
     if statut:
-        query = query.filter(HeuresTravail.statut == statut)
+        query = query.filter(heures.statut == statut)
     
     # Pagination
     page = request.args.get('page', 1, type=int)
-    heures_travail = query.order_by(HeuresTravail.date_travail.desc()).paginate(
+    heures_travail = query.order_by(heures.date_travail.desc()).paginate(
         page=page, per_page=50, error_out=False
     )
     
     # Données pour les filtres
     employes = Employee.query.filter_by(statut='Actif').all()
     
-    # Statistiques
-    stats = {
-        'total_heures': query.with_entities(func.sum(HeuresTravail.heures_travaillees)).scalar() or 0,
-        'total_heures_sup': query.with_entities(func.sum(HeuresTravail.heures_supplementaires)).scalar() or 0,
-        'moyenne_retard': query.with_entities(func.avg(HeuresTravail.retard_minutes)).scalar() or 0,
-        'taux_presence': query.filter(HeuresTravail.statut.in_(['present', 'retard'])).count() / max(query.count(), 1) * 100
-    }
+    # Statistiques : agrégats journaliers si seule la période est filtrée
+    if not employe_id and not statut:
+        faits = statistiques_presence_periode(debut, fin)
+        stats = {
+            'total_heures': faits['heures_travaillees'],
+            'total_heures_sup': faits['heures_supplementaires'],
+            'moyenne_retard': faits['moyenne_retard'],
+            'taux_presence': faits['taux_presence']
+        }
+    else:
+        total, presents, total_heures, total_heures_sup, moyenne_retard = query.with_entities(
+            func.count(heures.id),
+            func.sum(case((heures.statut.in_(['present', 'retard']), 1), else_=0)),
+            func.sum(heures.heures_travaillees),
+            func.sum(heures.heures_supplementaires),
+            func.avg(heures.retard_minutes)
+        ).one()
+        stats = {
+            'total_heures': total_heures or 0,
+            'total_heures_sup': total_heures_sup or 0,
+            'moyenne_retard': moyenne_retard or 0,
+            'taux_presence': (presents or 0) / max(total, 1) * 100
+        }
     
     return render_template('conges_temps/presences/heures.html',
                          heures_travail=heures_travail,
@@ -981,6 +1175,9 @@ def modifier_heures(id):
             if form.heures_supplementaires.data is not None:
                 heures_travail.heures_supplementaires = form.heures_supplementaires.data
             
+            actualiser_statistiques_presence(heures_travail.date_travail, heures_travail.employe_id)
+            actualiser_heures_semaine(heures_travail.employe_id, heures_travail.date_travail)
+            publier_heures_travail(heures_travail)
             db.session.commit()
             flash('Heures de travail mises à jour avec succès', 'success')
             return redirect(url_for('conges_temps.gestion_heures'))
@@ -1026,17 +1223,25 @@ def api_pointage_rapide():
             ip_address=request.remote_addr,
             user_agent=request.headers.get('User-Agent', '')[:200]
         )
+        dans_zone = appliquer_geofence(pointage)
         
         db.session.add(pointage)
+        db.session.flush()
+        publier_pointage(pointage)
         db.session.commit()
         
         # Mettre à jour les heures si c'est une sortie
         if type_pointage == 'sortie':
             mettre_a_jour_heures_travail(employe_id, date.today())
         
+        message = f'Pointage {type_pointage} enregistré pour {employe.nom}'
+        if not dans_zone:
+            message += ' (hors zone, pointage invalidé)'
         return jsonify({
             'success': True,
-            'message': f'Pointage {type_pointage} enregistré pour {employe.nom}',
+            'message': message,
+            'valide': dans_zone,
+            'site_id': pointage.site_id,
             'pointage_id': pointage.id,
             'heure': pointage.heure_pointage.strftime('%H:%M')
         })
@@ -1045,20 +1250,138 @@ def api_pointage_rapide():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@conges_temps_bp.route('/api/presences/bornes/<identifiant>/synchro', methods=['POST'])
+@login_required
+@permission_requise('presences')
+def api_synchro_borne(identifiant):
+    """API de synchronisation par lots des pointages d'une borne hors ligne"""
+    try:
+        # Longueur vérifiée avant la recherche : un identifiant tronqué ne serait jamais retrouvé
+        if len(identifiant) > 50:
+            return jsonify({'error': 'Identifiant de borne limité à 50 caractères'}), 400
+        
+        data = request.get_json(silent=True) or {}
+        pointages = data.get('pointages') or []
+        if not isinstance(pointages, list):
+            return jsonify({'error': 'Liste de pointages attendue'}), 400
+        if len(pointages) > TAILLE_LOT_MAX:
+            return jsonify({'error': f'Lot limité à {TAILLE_LOT_MAX} pointages'}), 413
+        
+        try:
+            horloge_appareil = lire_horodatage(data.get('horloge_appareil'))
+        except (TypeError, ValueError, OverflowError, OSError):
+            return jsonify({'error': 'Horloge de la borne invalide'}), 400
+        
+        # Enregistrement de la borne à sa première synchronisation
+        borne = BornePointage.query.filter_by(identifiant=identifiant).first()
+        if borne is None:
+            borne = BornePointage(identifiant=identifiant, nom=str(data.get('nom') or '')[:100] or None)
+            db.session.add(borne)
+            db.session.flush()
+        elif not borne.active:
+            return jsonify({'error': 'Borne désactivée'}), 403
+        
+        resultat = synchroniser_borne(
+            borne, horloge_appareil, pointages,
+            ip_address=request.remote_addr,
+            user_agent=request.headers.get('User-Agent', '')[:200]
+        )
+        for pointage in resultat.pop('pointages'):
+            publier_pointage(pointage)
+        
+        # Recalcul des seules journées touchées, dans la transaction du lot : en cas d'échec
+        # rien n'est acquitté et la borne renverra le lot
+        resultat['journees_recalculees'] = recalculer_journees(resultat.pop('journees'))
+        db.session.commit()
+        
+        return jsonify(resultat)
+        
+    except IntegrityError:
+        # Synchronisation concurrente de la même borne : la borne renverra le lot
+        db.session.rollback()
+        return jsonify({'error': 'Synchronisation concurrente, réessayer'}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def _site_json(site):
+    return {
+        'id': site.id,
+        'nom': site.nom,
+        'adresse': site.adresse,
+        'latitude': site.latitude,
+        'longitude': site.longitude,
+        'rayon_metres': site.rayon_metres,
+        'polygone': site.polygone,
+        'actif': site.actif
+    }
+
+@conges_temps_bp.route('/api/presences/sites', methods=['GET', 'POST'])
+@login_required
+@permission_requise('presences')
+def api_sites():
+    """API des sites de pointage (liste et création)"""
+    if request.method == 'GET':
+        return jsonify([_site_json(site) for site in Site.query.order_by(Site.nom).all()])
+    
+    try:
+        champs, erreur = lire_definition_site(request.get_json(silent=True) or {})
+        if erreur:
+            return jsonify({'error': erreur}), 400
+        site = Site(**champs)
+        db.session.add(site)
+        db.session.commit()
+        return jsonify(_site_json(site)), 201
+        
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Un site porte déjà ce nom'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@conges_temps_bp.route('/api/presences/sites/<int:id>', methods=['PUT', 'DELETE'])
+@login_required
+@permission_requise('presences')
+def api_site(id):
+    """API de modification ou désactivation d'un site de pointage"""
+    site = Site.query.get_or_404(id)
+    try:
+        if request.method == 'DELETE':
+            # Désactivation : les pointages existants gardent leur site
+            site.actif = False
+        else:
+            champs, erreur = lire_definition_site(request.get_json(silent=True) or {}, site)
+            if erreur:
+                return jsonify({'error': erreur}), 400
+            for champ, valeur in champs.items():
+                setattr(site, champ, valeur)
+        db.session.commit()
+        return jsonify(_site_json(site))
+        
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Un site porte déjà ce nom'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 @conges_temps_bp.route('/api/presences/statistiques')
 @login_required
 @permission_requise('presences')
+@lecture_replica
 def api_stats_presences():
     """API pour récupérer les statistiques de présence"""
     try:
         periode = request.args.get('periode', 'semaine')  # jour, semaine, mois
         employe_id = request.args.get('employe_id', type=int)
         
-        # Statistiques globales
+        # Statistiques globales (agrégats journaliers)
+        faits = statistiques_presence_periode()
         stats = {
             'total_employes': Employee.query.filter_by(statut='Actif').count(),
-            'total_present': HeuresTravail.query.filter(HeuresTravail.statut.in_(['present', 'retard'])).count(),
-            'total_absent': HeuresTravail.query.filter(HeuresTravail.statut == 'absent').count(),
+            'total_present': faits['nb_presents'],
+            'total_absent': faits['nb_absents'],
             'taux_presence': 0,
             'moyenne_retard': 0,
             'total_heures_travaillees': 0,
@@ -1069,11 +1392,11 @@ def api_stats_presences():
             stats['taux_presence'] = (stats['total_present'] / stats['total_employes']) * 100
             
             # Moyenne de retard
-            stats['moyenne_retard'] = HeuresTravail.query.filter(HeuresTravail.statut == 'retard').with_entities(func.avg(HeuresTravail.retard_minutes)).scalar() or 0
+            stats['moyenne_retard'] = faits['moyenne_retard_retards']
             
             # Total des heures travaillées et supplémentaires
-            stats['total_heures_travaillees'] = HeuresTravail.query.with_entities(func.sum(HeuresTravail.heures_travaillees)).scalar() or 0
-            stats['total_heures_supplementaires'] = HeuresTravail.query.with_entities(func.sum(HeuresTravail.heures_supplementaires)).scalar() or 0
+            stats['total_heures_travaillees'] = faits['heures_travaillees']
+            stats['total_heures_supplementaires'] = faits['heures_supplementaires']
         
         # Statistiques par période
         if periode == 'jour':
@@ -1087,33 +1410,24 @@ def api_stats_presences():
             next_month = date.today().replace(day=1) + timedelta(days=31)
             date_fin = datetime.combine(next_month.replace(day=1) - timedelta(days=1), time.max)
         
-        stats_periode = HeuresTravail.query.filter(
-            HeuresTravail.date_travail >= date_debut,
-            HeuresTravail.date_travail <= date_fin
-        ).with_entities(
-            func.count(HeuresTravail.id),
-            func.sum(HeuresTravail.heures_travaillees),
-            func.sum(HeuresTravail.heures_supplementaires),
-            func.avg(HeuresTravail.retard_minutes)
-        ).first()
-        
-        if stats_periode:
-            stats['total_jours_ouvres'] = stats_periode[0]
-            stats['total_heures_travaillees_periode'] = stats_periode[1] or 0
-            stats['total_heures_supplementaires_periode'] = stats_periode[2] or 0
-            stats['moyenne_retard_periode'] = stats_periode[3] or 0
+        faits_periode = statistiques_presence_periode(date_debut.date(), date_fin.date())
+        stats['total_jours_ouvres'] = faits_periode['nb_enregistrements']
+        stats['total_heures_travaillees_periode'] = faits_periode['heures_travaillees']
+        stats['total_heures_supplementaires_periode'] = faits_periode['heures_supplementaires']
+        stats['moyenne_retard_periode'] = faits_periode['moyenne_retard']
         
         # Filtrer par employé si demandé
         if employe_id:
             stats['employe'] = Employee.query.get(employe_id)
             
-            # Statistiques spécifiques à l'employé
-            stats_employe = HeuresTravail.query.filter_by(employe_id=employe_id).with_entities(
-                func.count(HeuresTravail.id),
-                func.sum(HeuresTravail.heures_travaillees),
-                func.sum(HeuresTravail.heures_supplementaires),
-                func.avg(HeuresTravail.retard_minutes)
-            ).first()
+            # Statistiques spécifiques à l'employé (tout l'historique, archives comprises)
+            heures = heures_travail_periode()
+            stats_employe = db.session.query(
+                func.count(heures.id),
+                func.sum(heures.heures_travaillees),
+                func.sum(heures.heures_supplementaires),
+                func.avg(heures.retard_minutes)
+            ).filter(heures.employe_id == employe_id).first()
             
             if stats_employe:
                 stats['total_jours_ouvres_employe'] = stats_employe[0]
@@ -1126,11 +1440,103 @@ def api_stats_presences():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@conges_temps_bp.route('/api/presences/flux')
+@login_required
+@permission_requise('presences')
+def api_flux_presences():
+    """Flux SSE des événements de présence ; reprise via l'en-tête Last-Event-ID"""
+    dernier_id = request.headers.get('Last-Event-ID') or request.args.get('dernier_id')
+    try:
+        dernier_id = int(dernier_id) if dernier_id else None
+    except ValueError:
+        dernier_id = None
+    
+    # Le flux ne lit pas la base : libérer la connexion pour toute la durée de l'abonnement
+    db.session.close()
+    abonnement = diffuseur_presences.abonner(dernier_id)
+    return Response(
+        diffuseur_presences.flux(abonnement, current_app.config.get('PRESENCES_SSE_HEARTBEAT', 15)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# ============= BOITE DE NOTIFICATIONS PRESENCES =============
+
+def _notification_json(notification):
+    return {
+        'id': notification.id,
+        'employe_id': notification.employe_id,
+        'type': notification.type_notification,
+        'titre': notification.titre,
+        'message': notification.message,
+        'priorite': notification.priorite,
+        'statut': notification.statut,
+        'date_reference': notification.date_reference.isoformat() if notification.date_reference else None,
+        'date_creation': notification.date_creation.isoformat() if notification.date_creation else None
+    }
+
+@conges_temps_bp.route('/api/presences/notifications')
+@login_required
+@permission_requise('presences')
+def api_notifications_presence():
+    """API paginée par curseur de la boîte de notifications RH"""
+    try:
+        limite = min(max(request.args.get('limite', 50, type=int), 1), 200)
+        notifications, curseur_suivant = lister_notifications(
+            curseur=request.args.get('curseur', type=int),
+            limite=limite,
+            statut=request.args.get('statut'),
+            type_notification=request.args.get('type')
+        )
+        return jsonify({
+            'notifications': [_notification_json(n) for n in notifications],
+            'curseur_suivant': curseur_suivant,
+            'non_lues': compter_non_lues()
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@conges_temps_bp.route('/api/presences/notifications/non-lues')
+@login_required
+@permission_requise('presences')
+def api_notifications_non_lues():
+    """API du compteur de notifications non lues"""
+    try:
+        return jsonify({'non_lues': compter_non_lues()})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@conges_temps_bp.route('/api/presences/notifications/statut', methods=['POST'])
+@login_required
+@permission_requise('presences')
+def api_notifications_statut():
+    """API de marquage en masse : liste d'ids ou toutes les notifications jusqu'au curseur"""
+    try:
+        data = request.get_json(silent=True) or {}
+        jusqu_a = data.get('jusqu_a')
+        modifiees = mettre_a_jour_statut(
+            data.get('statut', 'lue'),
+            ids=[int(i) for i in data.get('ids') or []],
+            jusqu_a=int(jusqu_a) if jusqu_a is not None else None
+        )
+        db.session.commit()
+        return jsonify({'success': True, 'modifiees': modifiees, 'non_lues': compter_non_lues()})
+        
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
 # ============= ROUTES RAPPORTS PRESENCES =============
 
 @conges_temps_bp.route('/conges-temps/presences/rapports', methods=['GET', 'POST'])
 @login_required
 @permission_requise('presences')
+@lecture_replica
 def rapports_presences():
     """Génération de rapports de présence"""
     form = RapportPresenceForm()
@@ -1141,8 +1547,9 @@ def rapports_presences():
     
     if form.validate_on_submit():
         try:
-            # Générer le rapport selon le type demandé
-            return generer_rapport_presence(form)
+            # Générer le rapport selon le type demandé (resservi depuis le cache si les heures n'ont pas changé)
+            return rapport_en_cache('presences.rapport', form.data, [HeuresTravail, Employee, ArchivePresence],
+                                    lambda: generer_rapport_presence(form))
             
         except Exception as e:
             flash(f'Erreur lors de la génération du rapport: {e}', 'error')
@@ -1156,25 +1563,34 @@ def generer_rapport_presence(form):
     type_rapport = form.type_rapport.data
     format_export = form.format_export.data
     
-    # Query de base
-    query = HeuresTravail.query.join(Employee).filter(
-        HeuresTravail.date_travail >= date_debut,
-        HeuresTravail.date_travail <= date_fin
+    # Query de base (tables d'archive incluses si la période remonte aux mois archivés)
+    heures = heures_travail_periode(date_debut, date_fin)
+    query = db.session.query(heures).join(Employee, heures.employe_id == Employee.id).filter(
+        heures.date_travail >= date_debut,
+        heures.date_travail <= date_fin
     )
     
     # Appliquer les filtres
     if form.employes.data:
-        query = query.filter(HeuresTravail.employe_id.in_(form.employes.data))
+        query = query.filter(heures.employe_id.in_(form.employes.data))
     
     if form.statuts.data:
-        query = query.filter(HeuresTravail.statut.in_(form.statuts.data))
+        query = query.filter(heures.statut.in_(form.statuts.data))
+    
+    query = query.order_by(heures.date_travail.desc(), Employee.nom)
+    
+    if format_export == 'pdf':
+        # Colonnes seules, lues par lots pendant le rendu du PDF
+        lignes = query.with_entities(
+            Employee.nom, Employee.prenom, heures.date_travail, heures.heure_arrivee, heures.heure_depart,
+            heures.heures_travaillees, heures.heures_supplementaires, heures.retard_minutes, heures.statut
+        ).yield_per(2000)
+        return exporter_presences_pdf(lignes, type_rapport, date_debut, date_fin)
     
-    heures_travail = query.order_by(HeuresTravail.date_travail.desc(), Employee.nom).all()
+    heures_travail = query.all()
     
     if format_export == 'excel':
         return exporter_presences_excel(heures_travail, type_rapport, date_debut, date_fin)
-    elif format_export == 'pdf':
-        return exporter_presences_pdf(heures_travail, type_rapport, date_debut, date_fin)
     else:  # CSV
         return exporter_presences_csv(heures_travail, type_rapport, date_debut, date_fin)
 
@@ -1238,32 +1654,44 @@ def exporter_presences_csv(heures_travail, type_rapport, date_debut, date_fin):
         mimetype='text/csv'
     )
 
-def exporter_presences_pdf(heures_travail, type_rapport, date_debut, date_fin):
-    """Export PDF des données de présence"""
-    template_name = 'conges_temps/presences/rapport_pdf.html'
-    
-    # Calculer les statistiques globales
-    stats = {
-        'periode': f"Du {date_debut.strftime('%d/%m/%Y')} au {date_fin.strftime('%d/%m/%Y')}",
-        'total_heures': sum([h.heures_travaillees or 0 for h in heures_travail]),
-        'total_heures_sup': sum([h.heures_supplementaires or 0 for h in heures_travail]),
-        'total_retards': len([h for h in heures_travail if h.retard_minutes > 0]),
-        'total_absences': len([h for h in heures_travail if h.statut == 'absent'])
-    }
-    
-    html_content = render_template(template_name, 
-                                  heures_travail=heures_travail,
-                                  stats=stats,
-                                  date_generation=datetime.now())
-    
-    # Générer le PDF
-    pdf_file = HTML(string=html_content).write_pdf()
-    
-    filename = f'rapport_presences_{date_debut.strftime("%Y%m%d")}.pdf'
+def exporter_presences_pdf(lignes, type_rapport, date_debut, date_fin):
+    """Export PDF des données de présence (lignes consommées au fil du rendu)"""
+    stats = {'total_heures': 0.0, 'total_heures_sup': 0.0, 'total_retards': 0, 'total_absences': 0}
+    
+    def lignes_rapport():
+        for h in lignes:
+            # Statistiques globales calculées pendant le parcours
+            stats['total_heures'] += h.heures_travaillees or 0
+            stats['total_heures_sup'] += h.heures_supplementaires or 0
+            stats['total_retards'] += 1 if (h.retard_minutes or 0) > 0 else 0
+            stats['total_absences'] += 1 if h.statut == 'absent' else 0
+            yield (
+                f"{h.nom} {h.prenom or ''}",
+                h.date_travail.strftime('%d/%m/%Y'),
+                h.heure_arrivee.strftime('%H:%M') if h.heure_arrivee else '-',
+                h.heure_depart.strftime('%H:%M') if h.heure_depart else '-',
+                round(h.heures_travaillees or 0, 2),
+                round(h.heures_supplementaires or 0, 2),
+                h.retard_minutes or 0,
+                h.statut
+            )
     
-    return send_file(
-        BytesIO(pdf_file),
-        as_attachment=True,
-        download_name=filename,
-        mimetype='application/pdf'
-    )
\ No newline at end of file
+    def synthese():
+        return paragraphes_synthese([
+            ('Total heures travaillées', f"{stats['total_heures']:.2f} h"),
+            ('Total heures supplémentaires', f"{stats['total_heures_sup']:.2f} h"),
+            ('Journées avec retard', stats['total_retards']),
+            ('Absences', stats['total_absences']),
+        ])
+    
+    periode = f"Du {date_debut.strftime('%d/%m/%Y')} au {date_fin.strftime('%d/%m/%Y')}"
+    return rapport_pdf(
+        f'rapport_presences_{date_debut.strftime("%Y%m%d")}.pdf',
+        'Rapport de présence',
+        ['Employé', 'Date', 'Arrivée', 'Départ', 'Heures', 'Heures sup.', 'Retard (min)', 'Statut'],
+        lignes_rapport(),
+        largeurs=[5, 2, 1.5, 1.5, 1.5, 1.5, 1.5, 2],
+        sous_titre=f"{periode} - généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}",
+        paysage=True,
+        pied=synthese
+    )
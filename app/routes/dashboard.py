@@ -4,6 +4,7 @@ from app import db
 from datetime import date, datetime, timedelta
 from flask_login import login_required, current_user
 from sqlalchemy import func, extract, desc
+from sqlalchemy.orm import contains_eager
 from collections import defaultdict
 import json
 import io
@@ -12,9 +13,25 @@ from matplotlib import pyplot as plt
 import seaborn as sns
 import base64
 from app.utils.permissions import permission_requise
+from app.utils.database import lecture_replica
+from app.utils.instantanes_analytiques import lire_instantane
+from app.utils.rapports_pdf import rapport_pdf
+from app.utils.cache_rapports import rapport_en_cache
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+TAILLE_LOT_PDF = 1000  # lignes chargées par lot pour les rapports PDF
+
+# Tables lues par chaque rapport (jeton de version du cache des rapports)
+SOURCES_RAPPORTS = {
+    'employes': [Employee],
+    'conges': [Conge, Employee],
+    'absences': [Absence, Employee],
+    'paie': [BulletinPaie, Employee],
+    'evaluations': [Evaluation, Employee],
+    'presences': [Presence, Employee],
+}
+
 @dashboard_bp.route('/')
 @dashboard_bp.route('/dashboard')
 @login_required
@@ -85,6 +102,7 @@ def dashboard():
 
 @dashboard_bp.route('/api/dashboard/stats')
 @login_required
+@lecture_replica
 def dashboard_stats_api():
     """API pour les statistiques du dashboard"""
     
@@ -124,6 +142,7 @@ def dashboard_stats_api():
 @dashboard_bp.route('/dashboard/reports')
 @login_required
 @permission_requise('rapports')
+@lecture_replica
 def reports_dashboard():
     """Dashboard des rapports"""
     
@@ -221,6 +240,7 @@ def generate_dashboard_charts():
 @dashboard_bp.route('/reports/<report_type>')
 @login_required
 @permission_requise('rapports')
+@lecture_replica
 def generate_report(report_type):
     """Génère un rapport spécifique"""
     
@@ -230,21 +250,25 @@ def generate_report(report_type):
     date_fin = request.args.get('date_fin')
     departement = request.args.get('departement')
     
+    generateurs = {
+        'employes': generate_employees_report,
+        'conges': generate_leaves_report,
+        'absences': generate_absences_report,
+        'paie': generate_payroll_report,
+        'evaluations': generate_evaluations_report,
+        'presences': generate_attendance_report,
+    }
+    if report_type not in generateurs:
+        return jsonify({'error': 'Type de rapport non supporté'}), 400
+    
     try:
-        if report_type == 'employes':
-            return generate_employees_report(format_type, date_debut, date_fin, departement)
-        elif report_type == 'conges':
-            return generate_leaves_report(format_type, date_debut, date_fin, departement)
-        elif report_type == 'absences':
-            return generate_absences_report(format_type, date_debut, date_fin, departement)
-        elif report_type == 'paie':
-            return generate_payroll_report(format_type, date_debut, date_fin, departement)
-        elif report_type == 'evaluations':
-            return generate_evaluations_report(format_type, date_debut, date_fin, departement)
-        elif report_type == 'presences':
-            return generate_attendance_report(format_type, date_debut, date_fin, departement)
-        else:
-            return jsonify({'error': 'Type de rapport non supporté'}), 400
+        # Rapport resservi depuis le cache disque tant que ses tables sources n'ont pas changé
+        return rapport_en_cache(
+            f'dashboard.{report_type}',
+            {'format': format_type, 'date_debut': date_debut, 'date_fin': date_fin, 'departement': departement},
+            SOURCES_RAPPORTS[report_type],
+            lambda: generateurs[report_type](format_type, date_debut, date_fin, departement)
+        )
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -262,19 +286,17 @@ def generate_employees_report(format_type, date_debut, date_fin, departement):
             Employee.date_embauche.between(date_debut, date_fin)
         )
     
-    employees = query.all()
-    
     if format_type == 'excel':
-        return generate_excel_report(employees, 'Rapport_Employes')
+        return generate_excel_report(query.all(), 'Rapport_Employes')
     elif format_type == 'csv':
-        return generate_csv_report(employees, 'Rapport_Employes')
+        return generate_csv_report(query.all(), 'Rapport_Employes')
     else:
-        return generate_pdf_report(employees, 'Rapport des Employés')
+        return generate_pdf_report(query.yield_per(TAILLE_LOT_PDF), 'Rapport des Employés')
 
 def generate_leaves_report(format_type, date_debut, date_fin, departement):
     """Génère le rapport des congés"""
     
-    query = Conge.query.join(Employee)
+    query = Conge.query.join(Employee, Conge.employe_id == Employee.id)
     
     if departement:
         query = query.filter(Employee.departement == departement)
@@ -284,11 +306,11 @@ def generate_leaves_report(format_type, date_debut, date_fin, departement):
             Conge.date_debut.between(date_debut, date_fin)
         )
     
-    leaves = query.all()
-    
     if format_type == 'excel':
-        return generate_excel_report(leaves, 'Rapport_Conges', 'conges')
+        return generate_excel_report(query.all(), 'Rapport_Conges', 'conges')
     else:
+        # Employé chargé par la jointure, lignes lues par lots pendant le rendu
+        leaves = query.options(contains_eager(Conge.employe)).yield_per(TAILLE_LOT_PDF)
         return generate_pdf_report(leaves, 'Rapport des Congés', 'conges')
 
 def generate_absences_report(format_type, date_debut, date_fin, departement):
@@ -304,11 +326,11 @@ def generate_absences_report(format_type, date_debut, date_fin, departement):
             Absence.date_absence.between(date_debut, date_fin)
         )
     
-    absences = query.all()
-    
     if format_type == 'excel':
-        return generate_excel_report(absences, 'Rapport_Absences', 'absences')
+        return generate_excel_report(query.all(), 'Rapport_Absences', 'absences')
     else:
+        # Employé chargé par la jointure, lignes lues par lots pendant le rendu
+        absences = query.options(contains_eager(Absence.employe)).yield_per(TAILLE_LOT_PDF)
         return generate_pdf_report(absences, 'Rapport des Absences', 'absences')
 
 def generate_payroll_report(format_type, date_debut, date_fin, departement):
@@ -324,11 +346,11 @@ def generate_payroll_report(format_type, date_debut, date_fin, departement):
             BulletinPaie.periode_debut.between(date_debut, date_fin)
         )
     
-    bulletins = query.all()
-    
     if format_type == 'excel':
-        return generate_excel_report(bulletins, 'Rapport_Paie', 'paie')
+        return generate_excel_report(query.all(), 'Rapport_Paie', 'paie')
     else:
+        # Employé chargé par la jointure, lignes lues par lots pendant le rendu
+        bulletins = query.options(contains_eager(BulletinPaie.employe)).yield_per(TAILLE_LOT_PDF)
         return generate_pdf_report(bulletins, 'Rapport de Paie', 'paie')
 
 def generate_evaluations_report(format_type, date_debut, date_fin, departement):
@@ -344,11 +366,11 @@ def generate_evaluations_report(format_type, date_debut, date_fin, departement):
             Evaluation.date_evaluation.between(date_debut, date_fin)
         )
     
-    evaluations = query.all()
-    
     if format_type == 'excel':
-        return generate_excel_report(evaluations, 'Rapport_Evaluations', 'evaluations')
+        return generate_excel_report(query.all(), 'Rapport_Evaluations', 'evaluations')
     else:
+        # Employé chargé par la jointure, lignes lues par lots pendant le rendu
+        evaluations = query.options(contains_eager(Evaluation.employe)).yield_per(TAILLE_LOT_PDF)
         return generate_pdf_report(evaluations, 'Rapport des Évaluations', 'evaluations')
 
 def generate_attendance_report(format_type, date_debut, date_fin, departement):
@@ -364,11 +386,11 @@ def generate_attendance_report(format_type, date_debut, date_fin, departement):
             Presence.date.between(date_debut, date_fin)
         )
     
-    presences = query.all()
-    
     if format_type == 'excel':
-        return generate_excel_report(presences, 'Rapport_Presences', 'presences')
+        return generate_excel_report(query.all(), 'Rapport_Presences', 'presences')
     else:
+        # Employé chargé par la jointure, lignes lues par lots pendant le rendu
+        presences = query.options(contains_eager(Presence.employe)).yield_per(TAILLE_LOT_PDF)
         return generate_pdf_report(presences, 'Rapport des Présences', 'presences')
 
 def generate_excel_report(data, filename, report_type='employees'):
@@ -484,75 +506,81 @@ def generate_csv_report(data, filename):
         mimetype='text/csv'
     )
 
+# Colonnes (en-têtes, largeurs relatives) et ligne de chaque type de rapport PDF
+COLONNES_RAPPORTS_PDF = {
+    'employees': (['Nom', 'Prénom', 'Poste', 'Département'], [3, 3, 3, 3],
+                  lambda item: (item.nom, item.prenom, item.poste, item.departement)),
+    'conges': (['Employé', 'Type de congé', 'Début', 'Fin'], [4, 3, 2, 2],
+               lambda item: (item.employe.nom, item.type_conge,
+                             item.date_debut.strftime('%d/%m/%Y'), item.date_fin.strftime('%d/%m/%Y'))),
+    'absences': (['Employé', 'Motif', 'Date'], [4, 5, 2],
+                 lambda item: (item.employe.nom, item.motif, item.date_absence.strftime('%d/%m/%Y'))),
+    'paie': (['Employé', 'Période', 'Salaire net'], [5, 2, 3],
+             lambda item: (item.employe.nom, item.periode_debut.strftime('%m/%Y'), f"{item.salaire_net:,.2f} FCFA")),
+    'evaluations': (['Employé', 'Date', 'Note'], [5, 2, 3],
+                    lambda item: (item.employe.nom, item.date_evaluation.strftime('%d/%m/%Y'), item.note_finale or 'N/A')),
+    'presences': (['Employé', 'Date', 'Arrivée', 'Départ', 'Retard (min)'], [4, 2, 2, 2, 2],
+                  lambda item: (item.employe.nom, item.date.strftime('%d/%m/%Y'),
+                                item.heure_arrivee.strftime('%H:%M') if item.heure_arrivee else '-',
+                                item.heure_depart.strftime('%H:%M') if item.heure_depart else '-',
+                                item.retard_minutes or 0)),
+}
+
 def generate_pdf_report(data, title, report_type='employees'):
-    """Génère un rapport PDF générique"""
-    
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.units import inch
-    
-    output = io.BytesIO()
-    
-    # Créer le PDF
-    p = canvas.Canvas(output, pagesize=A4)
-    width, height = A4
-    
-    # Titre
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(100, height - 100, title)
-    
-    # Date de génération
-    p.setFont("Helvetica", 10)
-    p.drawString(100, height - 120, f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}")
-    
-    # Données
-    y = height - 160
-    p.setFont("Helvetica", 10)
-    
-    for item in data:
-        if y < 100:  # Nouvelle page si nécessaire
-            p.showPage()
-            y = height - 100
-        
-        if report_type == 'employees':
-            text = f"{item.nom} {item.prenom or ''} - {item.poste or ''} ({item.departement or ''})"
-        elif report_type == 'conges':
-            text = f"{item.employee.nom} - {item.type_conge} ({item.date_debut.strftime('%d/%m/%Y')} - {item.date_fin.strftime('%d/%m/%Y')})"
-        elif report_type == 'absences':
-            text = f"{item.employe.nom} - {item.motif} ({item.date_absence.strftime('%d/%m/%Y')})"
-        elif report_type == 'paie':
-            text = f"{item.employe.nom} - {item.periode_debut.strftime('%m/%Y')} - {item.salaire_net:,.2f} FCFA"
-        elif report_type == 'evaluations':
-            text = f"{item.employe.nom} - {item.date_evaluation.strftime('%d/%m/%Y')} - Note: {item.note_finale or 'N/A'}"
-        elif report_type == 'presences':
-            text = f"{item.employe.nom} - {item.date.strftime('%d/%m/%Y')} - {item.heures_travaillees or 0}h"
-        else:
-            text = str(item)
-        
-        p.drawString(100, y, text)
-        y -= 15
-    
-    p.save()
-    output.seek(0)
+    """Génère un rapport PDF générique (data : requête ou itérable, consommé au fil de l'eau)"""
     
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=f'{title.replace(" ", "_")}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf',
-        mimetype='application/pdf'
+    colonnes, largeurs, ligne = COLONNES_RAPPORTS_PDF[report_type]
+    return rapport_pdf(
+        f'{title.replace(" ", "_")}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf',
+        title, colonnes, (ligne(item) for item in data), largeurs=largeurs
     )
 
+def _mois_glissants(today):
+    """Les 12 mois des tendances, du plus récent au plus ancien"""
+    return [today - timedelta(days=30*i) for i in range(12)]
+
+def _comptes_par_mois(dates):
+    """Nombre de lignes par (année, mois) d'une colonne de dates de l'instantané"""
+    dates = dates.dropna()
+    return dates.groupby([dates.dt.year, dates.dt.month]).size().to_dict()
+
 @dashboard_bp.route('/api/dashboard/analytics')
 @login_required
+@lecture_replica
 def analytics_api():
     """API pour les données d'analytics avancées"""
     
     today = date.today()
     
+    # Taux de présence (données du jour, toujours lues en base)
+    total_employees = Employee.query.filter_by(statut='Actif').count()
+    presents_aujourd_hui = total_employees - Absence.query.filter_by(date_absence=today).count()
+    taux_presence = (presents_aujourd_hui / total_employees * 100) if total_employees > 0 else 0
+    
+    employes = lire_instantane('employes', ['employe_id', 'departement', 'date_embauche', 'salaire_base'])
+    absences = lire_instantane('absences', ['employe_id', 'departement'])
+    if employes is not None and absences is not None:
+        # Instantané analytique : regroupements pandas sans objets ORM
+        embauches = _comptes_par_mois(employes['date_embauche'])
+        embauches_trend = [{
+            'month': month_date.strftime('%b %Y'),
+            'count': int(embauches.get((month_date.year, month_date.month), 0))
+        } for month_date in _mois_glissants(today)]
+        
+        absences = absences[absences['employe_id'].isin(employes['employe_id'])]
+        absences_dept = list(absences.groupby('departement', dropna=False).size().items())
+        salaires_dept = list(employes.dropna(subset=['salaire_base'])
+                             .groupby('departement', dropna=False)['salaire_base'].mean().items())
+        return jsonify({
+            'embauches_trend': embauches_trend,
+            'absences_dept': [{'dept': None if pd.isna(d) else d, 'count': int(c)} for d, c in absences_dept],
+            'taux_presence': round(taux_presence, 2),
+            'salaires_dept': [{'dept': None if pd.isna(d) else d, 'salaire_moyen': float(m)} for d, m in salaires_dept]
+        })
+    
     # Tendances des embauches
     embauches_trend = []
-    for i in range(12):
-        month_date = today - timedelta(days=30*i)
+    for month_date in _mois_glissants(today):
         count = Employee.query.filter(
             extract('month', Employee.date_embauche) == month_date.month,
             extract('year', Employee.date_embauche) == month_date.year
@@ -568,11 +596,6 @@ def analytics_api():
         func.count(Absence.id).label('absences_count')
     ).join(Absence).group_by(Employee.departement).all()
     
-    # Taux de présence
-    total_employees = Employee.query.filter_by(statut='Actif').count()
-    presents_aujourd_hui = total_employees - Absence.query.filter_by(date_absence=today).count()
-    taux_presence = (presents_aujourd_hui / total_employees * 100) if total_employees > 0 else 0
-    
     # Coût moyen des salaires par département
     salaires_dept = db.session.query(
         Employee.departement,
@@ -592,6 +615,7 @@ def analytics_api():
 
 @dashboard_bp.route('/api/dashboard/kpi')
 @login_required
+@lecture_replica
 def dashboard_kpi():
     """API pour les KPI avancés du dashboard"""
     
@@ -646,6 +670,7 @@ def dashboard_kpi():
 
 @dashboard_bp.route('/api/dashboard/departement-stats')
 @login_required
+@lecture_replica
 def department_stats():
     """Statistiques détaillées par département"""
     
@@ -673,14 +698,37 @@ def department_stats():
 
 @dashboard_bp.route('/api/dashboard/trends')
 @login_required
+@lecture_replica
 def dashboard_trends():
     """Tendances sur 12 mois"""
     
     today = date.today()
     trends = []
     
-    for i in range(12):
-        month_date = today - timedelta(days=30*i)
+    employes = lire_instantane('employes', ['statut', 'date_embauche', 'date_modification'])
+    absences = lire_instantane('absences', ['date_absence'])
+    bulletins = lire_instantane('bulletins', ['annee', 'mois'])
+    if employes is not None and absences is not None and bulletins is not None:
+        # Instantané analytique : un regroupement par jeu au lieu de 48 requêtes
+        embauches = _comptes_par_mois(employes['date_embauche'])
+        departs = employes[employes['statut'].isin(['Démissionné', 'Licencié'])]
+        demissions = _comptes_par_mois(departs['date_modification'])
+        absences = _comptes_par_mois(absences['date_absence'])
+        bulletins = bulletins.groupby(['annee', 'mois']).size().to_dict()
+        for month_date in _mois_glissants(today):
+            cle = (month_date.year, month_date.month)
+            trends.append({
+                'month': f"{month_date.year}-{month_date.month:02d}",
+                'month_name': month_date.strftime('%B %Y'),
+                'embauches': int(embauches.get(cle, 0)),
+                'demissions': int(demissions.get(cle, 0)),
+                'absences': int(absences.get(cle, 0)),
+                'bulletins': int(bulletins.get(cle, 0))
+            })
+        trends.reverse()
+        return jsonify(trends)
+    
+    for month_date in _mois_glissants(today):
         month_year = f"{month_date.year}-{month_date.month:02d}"
         
         # Embauches
@@ -723,6 +771,7 @@ def dashboard_trends():
 @dashboard_bp.route('/dashboard/advanced')
 @login_required
 @permission_requise('rapports')
+@lecture_replica
 def advanced_dashboard():
     """Dashboard avancé avec analytics détaillées"""
     
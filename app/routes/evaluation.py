@@ -7,6 +7,13 @@ from app.models import (Employee, Evaluation, TemplateEvaluation, CritereEvaluat
 from app.forms import (EvaluationForm, TemplateEvaluationForm, CritereEvaluationForm, 
                       ObjectifEmployeForm, RapportEvaluationForm)
 from app.utils.permissions import permission_requise
+from app.utils.database import lecture_replica
+from app.utils.instantanes_analytiques import lire_instantane
+from app.utils.cache_rapports import rapport_en_cache
+from app.utils.scores_evaluation import recalculer_score
+from app.utils.campagnes_evaluation import (lancer_campagne, criteres_modele, criteres_en_texte,
+                                            enregistrer_criteres)
+from app.utils.analytique_evaluations import distribution, evolutions, calibration, percentile_employe
 from flask_login import login_required, current_user
 import json
 import io
@@ -16,43 +23,12 @@ from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 import pandas as pd
+import pyarrow.compute as pc
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 
 evaluation_bp = Blueprint('evaluation', __name__)
 
-# ============================================================================
-# FONCTIONS UTILITAIRES
-# ============================================================================
-
-def _recalculer_score_global(evaluation):
-    """Recalcule le score global d'une évaluation basé sur ses critères"""
-    
-    criteres = CritereEvaluation.query.filter_by(evaluation_id=evaluation.id).all()
-    
-    if not criteres:
-        return
-    
-    # Calcul pondéré
-    total_points = sum(c.score_obtenu * c.poids for c in criteres)
-    total_max = sum(c.score_max * c.poids for c in criteres)
-    
-    if total_max > 0:
-        score_global = (total_points / total_max) * 100
-        evaluation.score_global = round(score_global, 2)
-        
-        # Mise à jour automatique de la note finale
-        if score_global >= 90:
-            evaluation.note_finale = 'Excellent'
-        elif score_global >= 80:
-            evaluation.note_finale = 'Très Bien'
-        elif score_global >= 70:
-            evaluation.note_finale = 'Bien'
-        elif score_global >= 60:
-            evaluation.note_finale = 'Satisfaisant'
-        else:
-            evaluation.note_finale = 'Insuffisant'
-
 # ============================================================================
 # DASHBOARD ET VUE PRINCIPALE
 # ============================================================================
@@ -394,7 +370,7 @@ def add_critere(evaluation_id):
         db.session.add(critere)
         
         # Recalculer le score global
-        _recalculer_score_global(evaluation)
+        recalculer_score(evaluation)
         
         db.session.commit()
         
@@ -419,7 +395,7 @@ def edit_critere(id):
         form.populate_obj(critere)
         
         # Recalculer le score global
-        _recalculer_score_global(critere.evaluation)
+        recalculer_score(critere.evaluation)
         
         db.session.commit()
         
@@ -445,7 +421,7 @@ def delete_critere(id):
     db.session.delete(critere)
     
     # Recalculer le score global
-    _recalculer_score_global(evaluation)
+    recalculer_score(evaluation)
     
     db.session.commit()
     
@@ -601,7 +577,28 @@ def list_templates():
     
     templates = TemplateEvaluation.query.order_by(TemplateEvaluation.nom).all()
     
-    return render_template('evaluations/templates.html', templates=templates)
+    # Nombre d'évaluations et de critères par modèle (une requête GROUP BY)
+    nb_evaluations = dict(db.session.query(
+        Evaluation.template_id, func.count(Evaluation.id)
+    ).filter(Evaluation.template_id.isnot(None)).group_by(Evaluation.template_id).all())
+    nb_criteres = {}
+    for template in templates:
+        try:
+            nb_criteres[template.id] = len(criteres_modele(template))
+        except ValueError:
+            nb_criteres[template.id] = 0
+    
+    # Population proposée pour les campagnes
+    departements = db.session.query(Employee.departement.distinct()).filter(
+        Employee.departement.isnot(None)
+    ).order_by(Employee.departement).all()
+    
+    return render_template('evaluations/templates.html',
+                         templates=templates,
+                         nb_evaluations=nb_evaluations,
+                         nb_criteres=nb_criteres,
+                         departements=[d[0] for d in departements if d[0]],
+                         annee_courante=datetime.now().year)
 
 @evaluation_bp.route('/templates/new', methods=['GET', 'POST'])
 @login_required
@@ -628,6 +625,7 @@ def create_template():
             par_defaut=form.par_defaut.data,
             created_by=current_user.id
         )
+        enregistrer_criteres(template, form.criteres_analyses)
         
         db.session.add(template)
         db.session.commit()
@@ -648,6 +646,12 @@ def edit_template(id):
     template = TemplateEvaluation.query.get_or_404(id)
     form = TemplateEvaluationForm(obj=template)
     
+    if request.method == 'GET':
+        try:
+            form.criteres.data = criteres_en_texte(criteres_modele(template))
+        except ValueError as e:
+            flash(str(e), 'warning')
+    
     if form.validate_on_submit():
         # Si marqué comme par défaut, désactiver les autres
         if form.par_defaut.data and not template.par_defaut:
@@ -657,6 +661,7 @@ def edit_template(id):
             ).update({'par_defaut': False})
         
         form.populate_obj(template)
+        enregistrer_criteres(template, form.criteres_analyses)
         template.updated_at = datetime.utcnow()
         
         db.session.commit()
@@ -690,6 +695,38 @@ def delete_template(id):
     flash('Modèle d\'évaluation supprimé avec succès', 'success')
     return redirect(url_for('evaluation.list_templates'))
 
+@evaluation_bp.route('/templates/<int:id>/campagne', methods=['POST'])
+@login_required
+@permission_requise('administrer_evaluations')
+def lancer_campagne_template(id):
+    """Lancer une campagne d'évaluation à partir d'un modèle"""
+
+    template = TemplateEvaluation.query.get_or_404(id)
+    annee = request.form.get('annee', datetime.now().year, type=int)
+    departement = request.form.get('departement', '').strip() or None
+
+    try:
+        bilan = lancer_campagne(
+            template, annee, current_user.id,
+            departement=departement,
+            statut=request.form.get('statut', 'Actif').strip() or None,
+            periode=request.form.get('periode', '').strip() or None,
+            created_by=current_user.id
+        )
+        db.session.commit()
+        flash(f"Campagne lancée : {bilan['evaluations']} évaluation(s) créée(s), "
+              f"{bilan['employes_ignores']} employé(s) déjà évalué(s)", 'success')
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+        return redirect(url_for('evaluation.list_templates'))
+    except Exception as e:
+        db.session.rollback()
+        flash(f'Erreur lors du lancement de la campagne : {str(e)}', 'error')
+        return redirect(url_for('evaluation.list_templates'))
+
+    return redirect(url_for('evaluation.list_evaluations', annee=annee, departement=departement or ''))
+
 # ============================================================================
 # RAPPORTS ET ANALYSES
 # ============================================================================
@@ -697,6 +734,7 @@ def delete_template(id):
 @evaluation_bp.route('/rapports', methods=['GET', 'POST'])
 @login_required
 @permission_requise('voir_evaluations')
+@lecture_replica
 def rapports():
     """Interface de génération de rapports"""
     
@@ -716,6 +754,7 @@ def rapports():
 @evaluation_bp.route('/rapports/generer', methods=['POST'])
 @login_required
 @permission_requise('voir_evaluations')
+@lecture_replica
 def generer_rapport():
     """Générer et télécharger un rapport d'évaluation"""
     
@@ -725,6 +764,13 @@ def generer_rapport():
         flash('Données du formulaire invalides', 'error')
         return redirect(url_for('evaluation.rapports'))
     
+    # Rapport resservi depuis le cache disque tant que les évaluations n'ont pas changé
+    return rapport_en_cache('evaluation.rapport', form.data, [Evaluation, Employee],
+                            lambda: _construire_rapport(form))
+
+def _construire_rapport(form):
+    """Construit le rapport d'évaluation demandé par le formulaire"""
+    
     # Construction de la requête
     query = Evaluation.query.join(Employee)
     
@@ -986,11 +1032,35 @@ def _generer_rapport_csv(evaluations, form):
 @evaluation_bp.route('/api/evaluations/stats')
 @login_required
 @permission_requise('voir_evaluations')
+@lecture_replica
 def api_evaluation_stats():
     """API pour les statistiques d'évaluations"""
     
     annee = request.args.get('annee', datetime.now().year, type=int)
     
+    evaluations = lire_instantane('evaluations', ['score_global', 'note_finale', 'date_evaluation'],
+                                  filtre=pc.field('annee') == annee)
+    if evaluations is not None:
+        # Instantané analytique : agrégats pandas sur le fichier Parquet
+        repartition_notes = evaluations.groupby('note_finale', dropna=False).size()
+        evolution_mensuelle = evaluations.groupby(evaluations['date_evaluation'].dt.month)['score_global'].agg(['count', 'mean'])
+        score_moyen = evaluations['score_global'].mean()
+        return jsonify({
+            'total_evaluations': len(evaluations),
+            'score_moyen': round(float(score_moyen), 2) if pd.notna(score_moyen) else 0,
+            'repartition_notes': [
+                {'note': None if pd.isna(note) else note, 'count': int(count)}
+                for note, count in repartition_notes.items()
+            ],
+            'evolution_mensuelle': [
+                {
+                    'mois': int(mois),
+                    'nombre': int(ligne['count']),
+                    'score_moyen': round(float(ligne['mean']), 2) if pd.notna(ligne['mean']) else 0
+                } for mois, ligne in evolution_mensuelle.iterrows()
+            ]
+        })
+    
     # Statistiques générales
     total = Evaluation.query.filter_by(annee=annee).count()
     avg_score = db.session.query(func.avg(Evaluation.score_global)).filter_by(annee=annee).scalar() or 0
@@ -1028,6 +1098,7 @@ def api_evaluation_stats():
 @evaluation_bp.route('/api/employes/<int:employe_id>/evaluations')
 @login_required
 @permission_requise('voir_evaluations')
+@lecture_replica
 def api_employe_evaluations(employe_id):
     """API pour récupérer les évaluations d'un employé"""
     
@@ -1061,3 +1132,68 @@ def api_employe_evaluations(employe_id):
         'evaluations': data,
         'total': len(data)
     })
+
+# ============================================================================
+# ANALYTIQUE DES ÉVALUATIONS
+# ============================================================================
+
+def _parametres_analytique():
+    return (request.args.get('annee', datetime.now().year, type=int),
+            request.args.get('departement', '').strip() or None,
+            request.args.get('brouillons', 0, type=int) == 1)
+
+@evaluation_bp.route('/api/evaluations/analytique/distribution')
+@login_required
+@permission_requise('voir_evaluations')
+@lecture_replica
+def api_analytique_distribution():
+    """API : distribution et percentiles des scores d'une année"""
+    
+    annee, departement, brouillons = _parametres_analytique()
+    return jsonify(distribution(annee, departement, inclure_brouillons=brouillons))
+
+@evaluation_bp.route('/api/evaluations/analytique/evolution')
+@login_required
+@permission_requise('voir_evaluations')
+@lecture_replica
+def api_analytique_evolution():
+    """API : évolution des scores par employé par rapport à l'année précédente"""
+    
+    annee, departement, brouillons = _parametres_analytique()
+    limite = min(max(request.args.get('limite', 10, type=int), 0), 100)
+    resultat = evolutions(annee, departement, limite=limite, inclure_brouillons=brouillons)
+    
+    # Noms des employés des classements (une requête)
+    lignes = resultat.get('plus_fortes_progressions', []) + resultat.get('plus_fortes_regressions', [])
+    noms = dict(db.session.query(Employee.id, Employee.nom + ' ' + func.coalesce(Employee.prenom, '')).filter(
+        Employee.id.in_({ligne['employe_id'] for ligne in lignes})
+    ).all()) if lignes else {}
+    
+    return jsonify({
+        **resultat,
+        **{cle: [dict(ligne, nom=noms.get(ligne['employe_id'], '').strip()) for ligne in resultat[cle]]
+           for cle in ('plus_fortes_progressions', 'plus_fortes_regressions') if cle in resultat}
+    })
+
+@evaluation_bp.route('/api/evaluations/analytique/calibration')
+@login_required
+@permission_requise('voir_evaluations')
+@lecture_replica
+def api_analytique_calibration():
+    """API : calibration des scores par département"""
+    
+    annee, _, brouillons = _parametres_analytique()
+    return jsonify(calibration(annee, inclure_brouillons=brouillons))
+
+@evaluation_bp.route('/api/employes/<int:employe_id>/evaluations/percentile')
+@login_required
+@permission_requise('voir_evaluations')
+@lecture_replica
+def api_employe_percentile(employe_id):
+    """API : position du score d'un employé dans l'entreprise et son département"""
+    
+    annee, _, brouillons = _parametres_analytique()
+    resultat = percentile_employe(employe_id, annee, inclure_brouillons=brouillons)
+    if resultat is None:
+        return jsonify({'error': f'Aucune évaluation pour cet employé en {annee}'}), 404
+    return jsonify(resultat)
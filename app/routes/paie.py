@@ -4,7 +4,7 @@ Routes pour la gestion complète des bulletins de paie, calculs salariaux,
 cotisations et rapports de paie.
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, current_app
 from flask_login import login_required, current_user
 from sqlalchemy import func, desc, asc, extract, and_, or_
 from datetime import datetime, date, timedelta
@@ -14,6 +14,7 @@ import json
 import pandas as pd
 from io import BytesIO
 import os
+import tempfile
 
 from app import db
 from app.models import (Employee, BulletinPaie, ElementPaie, ParametresPaie, CotisationSociale,
@@ -23,7 +24,11 @@ from app.forms import (BulletinPaieForm, ElementPaieForm, AvanceSalaireForm, Typ
                       ParametreCalculPaieForm, RapportPaieForm, CalculPaieForm,
                       FormParametresPaie, FormAjouterCotisation)
 from app.utils.permissions import permission_requise
+from app.utils.database import lecture_replica
 from app.utils.email_service import email_service
+from app.utils.heures_hebdomadaires import heures_periode
+from app.utils.paie_presences import calculer_elements_temps_paie
+from app.utils.bulletins_pdf import generer_bulletins_lot
 
 # Blueprint pour les routes de paie
 paie_bp = Blueprint('paie', __name__)
@@ -181,6 +186,20 @@ def nouveau_bulletin():
             employe = Employee.query.get(form.employe_id.data)
             parametres_employe = ParametreCalculPaie.query.filter_by(employe_id=employe.id, actif=True).first()
             
+            # Éléments de temps issus des présences, congés et absences pour les champs non saisis
+            elements_temps = calculer_elements_temps_paie(
+                form.periode_debut.data, form.periode_fin.data, [employe.id]
+            )[employe.id]
+            nb_jours_ouvres = form.nb_jours_ouvres.data
+            nb_jours_travailles = form.nb_jours_travailles.data
+            if nb_jours_travailles is None:
+                nb_jours_ouvres = elements_temps['nb_jours_ouvres'] or nb_jours_ouvres
+                nb_jours_travailles = elements_temps['nb_jours_travailles']
+            
+            def saisie_ou_calcul(champ):
+                valeur = getattr(form, champ).data
+                return elements_temps[champ] if valeur is None else valeur
+            
             # Créer le bulletin
             bulletin = BulletinPaie(
                 employe_id=form.employe_id.data,
@@ -190,12 +209,12 @@ def nouveau_bulletin():
                 annee=form.annee.data,
                 numero_bulletin=numero_bulletin,
                 salaire_base=parametres_employe.salaire_base_mensuel if parametres_employe else employe.salaire_base,
-                nb_jours_ouvres=form.nb_jours_ouvres.data,
-                nb_jours_travailles=form.nb_jours_travailles.data,
-                nb_heures_normales=form.nb_heures_normales.data or 0,
-                nb_heures_supplementaires=form.nb_heures_supplementaires.data or 0,
-                nb_jours_conges=form.nb_jours_conges.data or 0,
-                nb_jours_absences=form.nb_jours_absences.data or 0,
+                nb_jours_ouvres=nb_jours_ouvres,
+                nb_jours_travailles=nb_jours_travailles,
+                nb_heures_normales=saisie_ou_calcul('nb_heures_normales'),
+                nb_heures_supplementaires=saisie_ou_calcul('nb_heures_supplementaires'),
+                nb_jours_conges=saisie_ou_calcul('nb_jours_conges'),
+                nb_jours_absences=saisie_ou_calcul('nb_jours_absences'),
                 primes_bonus=form.primes_bonus.data or 0,
                 indemnites=form.indemnites.data or 0,
                 avantages_nature=form.avantages_nature.data or 0,
@@ -253,13 +272,10 @@ def detail_bulletin(id):
         HistoriquePaie.date_action.desc()
     ).all()
     
-    # Éléments de paie groupés par catégorie
-    elements_gains = ElementPaie.query.filter_by(bulletin_id=id, type_element='gain').order_by(
-        ElementPaie.ordre_affichage
-    ).all()
-    elements_retenues = ElementPaie.query.filter_by(bulletin_id=id, type_element='retenue').order_by(
-        ElementPaie.ordre_affichage
-    ).all()
+    # Éléments de paie groupés par catégorie (une seule requête)
+    elements = ElementPaie.query.filter_by(bulletin_id=id).order_by(ElementPaie.ordre_affichage).all()
+    elements_gains = [e for e in elements if e.type_element == 'gain']
+    elements_retenues = [e for e in elements if e.type_element == 'retenue']
     
     # Remboursements d'avances pour ce bulletin
     remboursements = RemboursementAvance.query.filter_by(bulletin_id=id).all()
@@ -428,6 +444,43 @@ def marquer_paye(id):
     
     return redirect(url_for('paie.detail_bulletin', id=id))
 
+@paie_bp.route('/paie/bulletins/pdf-lot')
+@login_required
+@permission_requise('gestion_paie')
+@lecture_replica
+def bulletins_pdf_lot():
+    """Archive ZIP des bulletins PDF d'une période"""
+    mois = request.args.get('mois', type=int)
+    annee = request.args.get('annee', type=int)
+    statut = request.args.get('statut')
+    if not mois or not annee or not 1 <= mois <= 12:
+        flash('Choisissez le mois et l\'année des bulletins à générer', 'error')
+        return redirect(url_for('paie.liste_bulletins'))
+    
+    archive = tempfile.TemporaryFile(prefix='bulletins_', suffix='.zip')
+    try:
+        # Rendu dans le processus du worker : pas de fork d'un serveur multithreadé pendant
+        # la requête ; le pool de processus est réservé à 'flask generate-payslips'
+        metriques = generer_bulletins_lot(
+            mois, annee, archive,
+            processus=1,
+            statuts=[statut] if statut else None,
+            entreprise=current_app.config.get('ENTREPRISE_NOM', 'RH Manager')
+        )
+    except Exception as e:
+        archive.close()
+        flash(f'Erreur lors de la génération des bulletins: {e}', 'error')
+        return redirect(url_for('paie.liste_bulletins', mois=mois, annee=annee))
+    
+    if not metriques['bulletins']:
+        archive.close()
+        flash('Aucun bulletin pour cette période', 'warning')
+        return redirect(url_for('paie.liste_bulletins', mois=mois, annee=annee))
+    
+    archive.seek(0)
+    return send_file(archive, as_attachment=True, download_name=f'bulletins_{annee}_{mois:02d}.zip',
+                     mimetype='application/zip')
+
 # ============= GESTION DES AVANCES =============
 
 @paie_bp.route('/paie/avances')
@@ -528,6 +581,21 @@ def generer_numero_bulletin(employe_id, mois, annee):
     code_employe = f"{employe.nom[:3].upper()}{employe.id:03d}"
     return f"PAY{annee}{mois:02d}{code_employe}"
 
+def calculer_montant_heures_sup(bulletin, parametres, taux_horaire):
+    """Montant des HS : tranches 25 %/50 % des cumuls hebdomadaires, ou taux hs_25 si saisie manuelle"""
+    if not bulletin.nb_heures_supplementaires:
+        return 0
+    
+    heures = None
+    if bulletin.periode_debut and bulletin.periode_fin:
+        heures = heures_periode(bulletin.periode_debut, bulletin.periode_fin, [bulletin.employe_id]).get(bulletin.employe_id)
+    
+    if heures and abs(heures['heures_supplementaires'] - bulletin.nb_heures_supplementaires) < 0.01:
+        return (heures['heures_sup_25'] * taux_horaire * (1 + parametres.hs_25 / 100) +
+                heures['heures_sup_50'] * taux_horaire * (1 + parametres.hs_50 / 100))
+    
+    return bulletin.nb_heures_supplementaires * taux_horaire * (1 + parametres.hs_25 / 100)
+
 def calculer_bulletin_paie(bulletin):
     """Calcule tous les éléments d'un bulletin de paie"""
     try:
@@ -547,7 +615,7 @@ def calculer_bulletin_paie(bulletin):
         
         # Calculer les heures supplémentaires
         taux_horaire = bulletin.salaire_base / (parametres.heures_hebdo * 52 / 12)
-        montant_hs = bulletin.nb_heures_supplementaires * taux_horaire * (1 + parametres.hs_25 / 100)
+        montant_hs = calculer_montant_heures_sup(bulletin, parametres, taux_horaire)
         
         # Calculer le salaire brut
         bulletin.salaire_brut = (salaire_base_prorata + montant_hs + 
@@ -760,9 +828,34 @@ def calculer_bulletin_paie(bulletin):
 
 # ============= ROUTES API =============
 
+@paie_bp.route('/api/paie/elements-temps')
+@login_required
+@permission_requise('gestion_paie')
+@lecture_replica
+def api_elements_temps_paie():
+    """API des éléments de temps (jours, heures, congés, absences) d'une période de paie"""
+    try:
+        mois = request.args.get('mois', date.today().month, type=int)
+        annee = request.args.get('annee', date.today().year, type=int)
+        date_debut = date(annee, mois, 1)
+        date_fin = date_debut + relativedelta(months=1) - timedelta(days=1)
+        
+        employe_ids = request.args.getlist('employe_id', type=int) or None
+        elements = calculer_elements_temps_paie(date_debut, date_fin, employe_ids)
+        
+        return jsonify({
+            'periode_debut': date_debut.isoformat(),
+            'periode_fin': date_fin.isoformat(),
+            'employes': {str(employe_id): valeurs for employe_id, valeurs in elements.items()}
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @paie_bp.route('/api/paie/stats')
 @login_required
 @permission_requise('gestion_paie')
+@lecture_replica
 def api_stats_paie():
     """API pour récupérer les statistiques de paie"""
     try:
@@ -6,11 +6,11 @@ from app import db, mail
 from app.models import OffreEmploi, Candidat, Conge, Employee, Utilisateur, TypeConge
 from app.forms import DemandeCongeForm
 from flask_login import current_user
+from werkzeug.exceptions import RequestEntityTooLarge
+from app.utils.candidatures import deposer_candidature, taille_max_fichier
 
 public_bp = Blueprint('public', __name__)
 
-# Dossier pour stocker CV + lettres
-UPLOAD_FOLDER = 'app/static/uploads'
 ALLOWED_EXTENSIONS = {'pdf'}
 
 # Vérifie l'extension (PDF only)
@@ -22,39 +22,31 @@ def postuler(offre_id):
     offre = OffreEmploi.query.get_or_404(offre_id)
 
     if request.method == 'POST':
-        nom = request.form['nom']
-        email = request.form['email']
-        telephone = request.form['telephone']
-        cv_file = request.files['cv']
-        lettre_file = request.files['lettre']
+        # Limite de la requête entière : deux fichiers plus les champs du formulaire
+        request.max_content_length = 2 * taille_max_fichier() + 64 * 1024
+        try:
+            nom = request.form['nom']
+            email = request.form['email']
+            telephone = request.form['telephone']
+            cv_file = request.files['cv']
+            lettre_file = request.files['lettre']
+        except RequestEntityTooLarge:
+            flash(f"Les fichiers envoyés dépassent la taille autorisée ({taille_max_fichier() // (1024 * 1024)} Mo par fichier).", "danger")
+            return redirect(request.url)
 
         # Vérifie les fichiers
         if not (cv_file and allowed_file(cv_file.filename)) or not (lettre_file and allowed_file(lettre_file.filename)):
             flash("Veuillez télécharger des fichiers PDF valides.", "danger")
             return redirect(request.url)
 
-        # Renomme et sauvegarde fichiers
-        timestamp = int(datetime.utcnow().timestamp())
-        cv_filename = secure_filename(f"{timestamp}_CV_{cv_file.filename}")
-        lettre_filename = secure_filename(f"{timestamp}_Lettre_{lettre_file.filename}")
-
-        os.makedirs(UPLOAD_FOLDER, exist_ok=True)  # Crée dossier si pas présent
-        cv_file.save(os.path.join(UPLOAD_FOLDER, cv_filename))
-        lettre_file.save(os.path.join(UPLOAD_FOLDER, lettre_filename))
-
-        # Crée le candidat en base
-        candidat = Candidat(
-            nom=nom,
-            email=email,
-            telephone=telephone,
-            cv=cv_filename,
-            lettre_motivation=lettre_filename,
-            date_soumission=datetime.utcnow().date(),
-            statut='en cours d\'examen',
-            offre_emploi_id=offre.id
-        )
-        db.session.add(candidat)
-        db.session.commit()
+        # Fichiers copiés par morceaux et dédupliqués, une candidature par email et par offre
+        try:
+            deposer_candidature(offre, nom, email, telephone, cv_file, lettre_file)
+            db.session.commit()
+        except ValueError as e:
+            db.session.rollback()
+            flash(str(e), "danger")
+            return redirect(request.url)
 
         # Envoie un mail interne sans pièce jointe
 #        subject = f"Nouvelle candidature pour {offre.titre}"
@@ -1,9 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from datetime import datetime
+from datetime import datetime, date, timedelta
 from app import db
-from app.models import OffreEmploi, Candidat, Entretien
+from app.models import OffreEmploi, Candidat, Entretien, Employee
 from flask_login import login_required
 from app.utils.permissions import permission_requise
+from app.utils.pipeline_recrutement import apercu_pipeline, candidats_offre, entretiens_offre
+from app.utils.recherche_candidats import rechercher_candidats
+from app.utils.planification_entretiens import planifier_entretien as planifier, creneaux_libres, duree_max, \
+    DUREE_DEFAUT
 
 recrutement_bp = Blueprint('recrutement', __name__)
 
@@ -11,28 +15,81 @@ recrutement_bp = Blueprint('recrutement', __name__)
 @login_required
 @permission_requise('recrutement')
 def list_offres():
-    # Récupère toutes les offres
-    offres = OffreEmploi.query.filter(OffreEmploi.statut != 'Supprimée').all()
-    liste = []
-    for offre in offres:
-        nb_candidats = len(offre.candidats)
-        nb_entretiens = len(offre.entretiens)
-        jours_restants = max(0, (offre.date_cloture - datetime.utcnow().date()).days)
-        liste.append({
-            'id': offre.id,
-            'titre': offre.titre,
-            'departement': offre.departement,
-            'description': offre.description,
-            'statut': offre.statut,
-            'nb_candidats': nb_candidats,
-            'nb_entretiens': nb_entretiens,
-            'jours_restants': jours_restants,
-            'date_publication': offre.date_publication,
-            'date_cloture': offre.date_cloture,
-            'candidats': offre.candidats,
-            'entretiens': offre.entretiens
-        })
-    return render_template('recrutement/list.html', offres=liste)
+    # Offres paginées avec leurs comptages ; candidats et entretiens chargés à l'ouverture du détail
+    page = request.args.get('page', 1, type=int)
+    recherche = request.args.get('q', '').strip()
+    pagination, liste = apercu_pipeline(page=page, recherche=recherche or None)
+    return render_template('recrutement/list.html', offres=liste, pagination=pagination, recherche=recherche)
+
+@recrutement_bp.route('/recrutement/<int:offre_id>/candidats')
+@login_required
+@permission_requise('recrutement')
+def panneau_candidats(offre_id):
+    """Fragment HTML paginé des candidats d'une offre (onglet du détail)"""
+    offre = OffreEmploi.query.get_or_404(offre_id)
+    page = request.args.get('page', 1, type=int)
+    statut = request.args.get('statut') or None
+    candidats = candidats_offre(offre.id, page=page, statut=statut)
+    # Participants proposés pour la planification des entretiens
+    employes = db.session.query(Employee.id, Employee.nom, Employee.prenom).filter(
+        Employee.statut == 'Actif').order_by(Employee.nom, Employee.prenom).all()
+    return render_template('recrutement/_candidats.html', offre=offre, candidats=candidats, statut=statut,
+                           employes=employes)
+
+@recrutement_bp.route('/recrutement/<int:offre_id>/entretiens')
+@login_required
+@permission_requise('recrutement')
+def panneau_entretiens(offre_id):
+    """Fragment HTML paginé des entretiens d'une offre (onglet du détail)"""
+    offre = OffreEmploi.query.get_or_404(offre_id)
+    page = request.args.get('page', 1, type=int)
+    entretiens = entretiens_offre(offre.id, page=page)
+    return render_template('recrutement/_entretiens.html', offre=offre, entretiens=entretiens)
+
+@recrutement_bp.route('/recrutement/recherche')
+@login_required
+@permission_requise('recrutement')
+def api_recherche_candidats():
+    """Recherche plein texte des candidats (CV, nom, email, offre), sur une offre ou toutes"""
+    texte = request.args.get('q', '').strip()
+    offre_id = request.args.get('offre_id', type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    par_page = min(request.args.get('par_page', 20, type=int), 100)
+    resultat = rechercher_candidats(texte, offre_id=offre_id, limite=par_page + 1,
+                                    decalage=(page - 1) * par_page)
+    return jsonify({
+        'resultats': resultat['resultats'][:par_page],
+        'page': page,
+        'has_next': len(resultat['resultats']) > par_page,
+        'duree_ms': resultat['duree_ms'],
+    })
+
+@recrutement_bp.route('/recrutement/entretiens/creneaux')
+@login_required
+@permission_requise('recrutement')
+def api_creneaux_entretien():
+    """Prochains créneaux où tous les participants sont libres (entretiens et congés approuvés)"""
+    employe_ids = [int(i) for i in request.args.get('participants', '').split(',') if i.strip().isdigit()]
+    try:
+        date_debut = datetime.strptime(request.args['date_debut'], '%Y-%m-%d').date() \
+            if request.args.get('date_debut') else date.today()
+        date_fin = datetime.strptime(request.args['date_fin'], '%Y-%m-%d').date() \
+            if request.args.get('date_fin') else date_debut + timedelta(days=14)
+    except ValueError:
+        return jsonify({'error': 'Dates invalides (AAAA-MM-JJ)'}), 400
+    if date_fin < date_debut or (date_fin - date_debut).days > 92:
+        return jsonify({'error': 'Période invalide (92 jours maximum)'}), 400
+    duree = request.args.get('duree', DUREE_DEFAUT, type=int)
+    minutes_max = int(duree_max().total_seconds() // 60)
+    if not 1 <= duree <= minutes_max:
+        return jsonify({'error': f"Durée d'entretien invalide (1 à {minutes_max} minutes)"}), 400
+    nombre = min(max(request.args.get('nombre', 5, type=int), 1), 50)
+
+    creneaux = creneaux_libres(employe_ids, date_debut, date_fin, duree, nombre=nombre)
+    return jsonify({
+        'creneaux': [{'debut': d.isoformat(timespec='minutes'), 'fin': f.isoformat(timespec='minutes')}
+                     for d, f in creneaux]
+    })
 
 @recrutement_bp.route('/recrutement/publier/<int:id>')
 def publier_offre(id):
@@ -68,26 +125,24 @@ def creer_offre():
 
 @recrutement_bp.route('/recrutement/<int:offre_id>/planifier_entretien/<int:candidat_id>', methods=['POST'])
 def planifier_entretien(offre_id, candidat_id):
+    candidat = Candidat.query.filter_by(id=candidat_id, offre_emploi_id=offre_id).first_or_404()
     titre = request.form.get('titre')
     datetime_str = request.form.get('datetime')
-    duree = int(request.form.get('duree'))
+    duree = request.form.get('duree', type=int)
     participants = request.form.get('participants')
     notes = request.form.get('notes')
+    employe_ids = request.form.getlist('participants_ids', type=int)
 
-    entretien = Entretien(
-        candidat_id=candidat_id,
-        offre_emploi_id=offre_id,
-        titre=titre,
-        datetime=datetime.strptime(datetime_str, '%Y-%m-%dT%H:%M'),
-        duree=duree,
-        participants=participants,
-        notes=notes
-    )
-    db.session.add(entretien)
-
-    candidat = Candidat.query.get_or_404(candidat_id)
-    candidat.statut = 'entretien planifié'
-    db.session.commit()
+    try:
+        # Refusé si un participant a déjà un entretien ou un congé approuvé sur le créneau
+        planifier(candidat, titre, datetime.strptime(datetime_str, '%Y-%m-%dT%H:%M'), duree,
+                  employe_ids, participants=participants, notes=notes)
+        candidat.statut = 'entretien planifié'
+        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'danger')
+        return redirect(url_for('recrutement.list_offres'))
 
     flash('Entretien planifié avec succès.', 'success')
     return redirect(url_for('recrutement.list_offres'))
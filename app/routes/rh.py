@@ -7,6 +7,7 @@ from app.models import Employee, Absence, EmployeeHistory, EmployeeDocument, Uti
 from app.forms import EmployeeForm, AbsenceForm, EmployeeDocumentForm, EmployeeSearchForm
 from flask_login import login_required, current_user
 from app.utils.permissions import permission_requise
+from app.utils.database import lecture_replica
 from werkzeug.utils import secure_filename
 import os
 from datetime import datetime
@@ -476,10 +477,20 @@ def delete_employe(id):
         
         # 7. Supprimer les heures de travail
         from app.models import HeuresTravail
+        from app.utils.archivage_presences import heures_travail_periode
+        # Jours dont les agrégats de présence comptent l'employé (archives comprises)
+        heures_periode = heures_travail_periode()
+        jours_travailles = [jour for (jour,) in db.session.query(heures_periode.date_travail).filter(
+            heures_periode.employe_id == id
+        ).distinct().all()]
         heures_travail = HeuresTravail.query.filter_by(employe_id=id).all()
         for heure in heures_travail:
             db.session.delete(heure)
         
+        # Pointages et heures des mois archivés
+        from app.utils.archivage_presences import supprimer_archives_employe
+        supprimer_archives_employe(id)
+        
         # 8. Gérer les relations manager/subordonné
         # Retirer les références de manager pour les subordonnés
         subordonnés = Employee.query.filter_by(manager_id=id).all()
@@ -496,6 +507,12 @@ def delete_employe(id):
         
         # Maintenant supprimer l'employé
         db.session.delete(employe)
+        
+        # 10. Recalculer les agrégats journaliers de présence sans l'employé
+        from app.utils.statistiques_presence import actualiser_statistiques_presence
+        for jour in jours_travailles:
+            actualiser_statistiques_presence(jour)
+        
         db.session.commit()
         
         flash(f"L'employé {employe_nom} a été supprimé avec succès.", "success")
@@ -543,6 +560,7 @@ def detail_employe(id):
 @rh_bp.route('/employes/export/excel')
 @login_required
 @permission_requise('employes')
+@lecture_replica
 def export_employes_excel():
     employes = Employee.query.all()
     data = [{
@@ -565,6 +583,7 @@ def export_employes_excel():
 @rh_bp.route('/employes/export/pdf')
 @login_required
 @permission_requise('employes')
+@lecture_replica
 def export_employes_pdf():
     employes = Employee.query.all()
     rendered = render_template('employes/employes_pdf.html', employes=employes)
@@ -578,6 +597,7 @@ def export_employes_pdf():
 @rh_bp.route('/absences/export/excel')
 @login_required
 @permission_requise('absences_conges')
+@lecture_replica
 def export_absences_excel():
     absences = Absence.query.all()
     data = [{
@@ -600,6 +620,7 @@ def export_absences_excel():
 @rh_bp.route('/absences/export/pdf')
 @login_required
 @permission_requise('absences_conges')
+@lecture_replica
 def export_absences_pdf():
     absences = Absence.query.all()
     rendered = render_template('absences/absences_pdf.html', absences=absences)
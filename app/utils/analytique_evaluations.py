@@ -0,0 +1,329 @@
+"""
+Analytique des évaluations (distributions, percentiles, évolutions, calibration)
+
+Les évaluations sont gardées en mémoire sous forme de tableaux NumPy compacts triés par
+identifiant : employé, département (code), année, score, brouillon. Chaque lecture compare
+le nombre d'évaluations et leur dernière mise à jour à ceux du cache ; seules les évaluations
+modifiées depuis sont relues et fusionnées (rechargement complet après une suppression, un
+changement de département ou ANALYTIQUE_EVALUATIONS_RECHARGEMENT secondes). Les résultats
+calculés sont mémorisés jusqu'au prochain changement des données.
+"""
+
+from app import db
+from app.models import Evaluation, Employee
+from app.utils.database import SessionRoutage
+from app.utils.scores_evaluation import SEUILS_NOTES, NOTE_INSUFFISANTE
+from flask import current_app
+from sqlalchemy import select, func, event, inspect
+from sqlalchemy.orm import object_session
+import numpy as np
+import threading
+import time
+
+PERCENTILES = (10, 25, 50, 75, 90)
+BORNES_HISTOGRAMME = np.arange(0, 101, 10)
+# Seuils croissants pour np.searchsorted : indice 0 = Insuffisant
+SEUILS_CROISSANTS = np.array([seuil for seuil, _ in reversed(SEUILS_NOTES)], dtype=np.float32)
+NOTES_CROISSANTES = [NOTE_INSUFFISANTE] + [note for _, note in reversed(SEUILS_NOTES)]
+
+COLONNES = {
+    'id': np.int64,
+    'employe': np.int32,
+    'departement': np.int16,
+    'annee': np.int16,
+    'score': np.float32,
+    'brouillon': np.bool_,
+}
+
+
+# ============= CHARGEMENT =============
+
+def _lire(condition=None):
+    requete = (
+        select(Evaluation.id, Evaluation.employe_id, Employee.departement, Evaluation.annee,
+               Evaluation.score_global, Evaluation.statut)
+        .outerjoin(Employee, Evaluation.employe_id == Employee.id)
+        .order_by(Evaluation.id)
+    )
+    if condition is not None:
+        requete = requete.where(condition)
+    return db.session.execute(requete).all()
+
+
+def _tableaux(lignes, departements):
+    """Colonnes NumPy des lignes lues ; departements (libellé -> code) est complété au besoin"""
+    codes = [departements.setdefault(ligne[2], len(departements)) for ligne in lignes]
+    return {
+        'id': np.fromiter((ligne[0] for ligne in lignes), COLONNES['id'], len(lignes)),
+        'employe': np.fromiter((ligne[1] for ligne in lignes), COLONNES['employe'], len(lignes)),
+        'departement': np.array(codes, dtype=COLONNES['departement']),
+        'annee': np.fromiter((ligne[3] for ligne in lignes), COLONNES['annee'], len(lignes)),
+        'score': np.fromiter((ligne[4] or 0.0 for ligne in lignes), COLONNES['score'], len(lignes)),
+        'brouillon': np.fromiter((ligne[5] == 'Brouillon' for ligne in lignes), COLONNES['brouillon'], len(lignes)),
+    }
+
+
+def _charger(version):
+    departements = {}
+    donnees = _tableaux(_lire(), departements)
+    donnees.update(version=version, departements=departements, charge_le=time.monotonic(), resultats={})
+    return donnees
+
+
+def _completer(donnees, version):
+    """Fusionne les évaluations mises à jour depuis la version du cache, ou None si impossible"""
+    derniere_maj = donnees['version'][1]
+    if derniere_maj is None or version[1] is None:
+        return None
+    departements = dict(donnees['departements'])
+    # >= : évaluations de même horodatage écrites après la lecture précédente
+    nouveaux = _tableaux(_lire(Evaluation.updated_at >= derniere_maj), departements)
+
+    ids = donnees['id']
+    position = np.searchsorted(ids, nouveaux['id'])
+    existe = position < len(ids)
+    existe[existe] = ids[position[existe]] == nouveaux['id'][existe]
+
+    fusion = {}
+    for colonne in COLONNES:
+        valeurs = donnees[colonne].copy()
+        valeurs[position[existe]] = nouveaux[colonne][existe]
+        fusion[colonne] = np.concatenate([valeurs, nouveaux[colonne][~existe]])
+    if (~existe).any() and len(ids) and nouveaux['id'][~existe].min() < ids[-1]:
+        ordre = np.argsort(fusion['id'], kind='stable')
+        fusion = {colonne: valeurs[ordre] for colonne, valeurs in fusion.items()}
+
+    if len(fusion['id']) != version[0]:
+        return None  # évaluations supprimées
+    fusion.update(version=version, departements=departements, charge_le=donnees['charge_le'], resultats={})
+    return fusion
+
+
+_verrou = threading.Lock()
+_cache = {'donnees': None, 'recharger': False}
+
+
+def donnees_evaluations():
+    """Tableaux des évaluations à jour (une requête de contrôle si rien n'a changé)"""
+    version = tuple(db.session.execute(
+        select(func.count(Evaluation.id), func.max(Evaluation.updated_at))
+    ).one())
+    delai = current_app.config.get('ANALYTIQUE_EVALUATIONS_RECHARGEMENT', 3600)
+
+    donnees = _cache['donnees']
+    perime = (donnees is None or _cache['recharger']
+              or time.monotonic() - donnees['charge_le'] > delai)
+    if not perime and donnees['version'] == version:
+        return donnees
+
+    with _verrou:
+        donnees = _cache['donnees']
+        if not perime and donnees is not None and donnees['version'] == version:
+            return donnees
+        if not perime:
+            donnees = _completer(donnees, version)
+        if perime or donnees is None:
+            _cache['recharger'] = False
+            donnees = _charger(version)
+        _cache['donnees'] = donnees
+    return donnees
+
+
+def invalider_analytique():
+    _cache['recharger'] = True
+
+
+def _marquer_changement_departement(mapper, connection, cible):
+    session = object_session(cible)
+    if session is not None and inspect(cible).attrs.departement.history.has_changes():
+        session.info['analytique_evaluations_modifiee'] = True
+
+
+def _marquer_suppression(mapper, connection, cible):
+    session = object_session(cible)
+    if session is not None:
+        session.info['analytique_evaluations_modifiee'] = True
+
+
+event.listen(Employee, 'after_update', _marquer_changement_departement)
+event.listen(Employee, 'after_delete', _marquer_suppression)
+
+
+@event.listens_for(SessionRoutage, 'after_commit')
+def _invalider_apres_commit(session):
+    if session.info.pop('analytique_evaluations_modifiee', False):
+        invalider_analytique()
+
+
+# ============= CALCULS =============
+
+def _memoriser(donnees, cle, calcul):
+    resultats = donnees['resultats']
+    if cle not in resultats:
+        resultats[cle] = calcul()
+    return resultats[cle]
+
+
+def _code_departement(donnees, departement):
+    return donnees['departements'].get(departement, -1)
+
+
+def _masque(donnees, annee, departement=None, inclure_brouillons=False):
+    masque = donnees['annee'] == annee
+    if departement:
+        masque &= donnees['departement'] == _code_departement(donnees, departement)
+    if not inclure_brouillons:
+        masque &= ~donnees['brouillon']
+    return masque
+
+
+def _moyennes_employes(donnees, masque):
+    """Score moyen par employé sur la sélection : (employés triés, moyennes, codes département)"""
+    employes, premier, inverse = np.unique(donnees['employe'][masque], return_index=True, return_inverse=True)
+    sommes = np.bincount(inverse, weights=donnees['score'][masque])
+    nombres = np.bincount(inverse)
+    return employes, sommes / nombres, donnees['departement'][masque][premier]
+
+
+def _arrondi(valeur):
+    return round(float(valeur), 2)
+
+
+def _statistiques(scores):
+    if not len(scores):
+        return {'nombre': 0}
+    percentiles = np.percentile(scores, PERCENTILES)
+    notes = np.bincount(np.searchsorted(SEUILS_CROISSANTS, scores, side='right'),
+                        minlength=len(NOTES_CROISSANTES))
+    return {
+        'nombre': int(len(scores)),
+        'moyenne': _arrondi(scores.mean()),
+        'ecart_type': _arrondi(scores.std()),
+        'minimum': _arrondi(scores.min()),
+        'maximum': _arrondi(scores.max()),
+        'percentiles': {f'p{p}': _arrondi(v) for p, v in zip(PERCENTILES, percentiles)},
+        'repartition_notes': {note: int(n) for note, n in zip(NOTES_CROISSANTES, notes)},
+    }
+
+
+def distribution(annee, departement=None, inclure_brouillons=False):
+    """Statistiques, percentiles, histogramme (pas de 10) et répartition des notes d'une année"""
+    donnees = donnees_evaluations()
+
+    def calcul():
+        scores = donnees['score'][_masque(donnees, annee, departement, inclure_brouillons)].astype(np.float64)
+        resultat = {'annee': annee, 'departement': departement, **_statistiques(scores)}
+        if len(scores):
+            effectifs, _ = np.histogram(np.clip(scores, 0, 100), bins=BORNES_HISTOGRAMME)
+            resultat['histogramme'] = [
+                {'de': int(debut), 'a': int(debut) + 10, 'nombre': int(n)}
+                for debut, n in zip(BORNES_HISTOGRAMME[:-1], effectifs)
+            ]
+        return resultat
+
+    return _memoriser(donnees, ('distribution', annee, departement, inclure_brouillons), calcul)
+
+
+def _rang_percentile(moyennes_triees, score):
+    """Part (en %) des employés sous le score, ex æquo comptés pour moitié"""
+    dessous = np.searchsorted(moyennes_triees, score, side='left')
+    egaux = np.searchsorted(moyennes_triees, score, side='right') - dessous
+    return _arrondi(100.0 * (dessous + egaux / 2) / len(moyennes_triees))
+
+
+def percentile_employe(employe_id, annee, inclure_brouillons=False):
+    """Position du score moyen d'un employé dans l'entreprise et dans son département, ou None"""
+    donnees = donnees_evaluations()
+
+    def moyennes_annee():
+        employes, moyennes, codes = _moyennes_employes(donnees, _masque(donnees, annee, None, inclure_brouillons))
+        ordre = np.lexsort((moyennes, codes))
+        return employes, moyennes, codes, np.sort(moyennes), codes[ordre], moyennes[ordre]
+
+    employes, moyennes, codes, triees, codes_tries, triees_par_departement = _memoriser(
+        donnees, ('moyennes', annee, inclure_brouillons), moyennes_annee)
+    i = np.searchsorted(employes, employe_id)
+    if i >= len(employes) or employes[i] != employe_id:
+        return None
+
+    score, code = moyennes[i], codes[i]
+    debut, fin = np.searchsorted(codes_tries, code, side='left'), np.searchsorted(codes_tries, code, side='right')
+    libelles = {code: libelle for libelle, code in donnees['departements'].items()}
+    return {
+        'employe_id': int(employe_id),
+        'annee': annee,
+        'score': _arrondi(score),
+        'percentile': _rang_percentile(triees, score),
+        'effectif': int(len(triees)),
+        'departement': libelles.get(int(code)),
+        'percentile_departement': _rang_percentile(triees_par_departement[debut:fin], score),
+        'effectif_departement': int(fin - debut),
+    }
+
+
+def evolutions(annee, departement=None, limite=10, inclure_brouillons=False):
+    """Écarts de score moyen par employé entre annee - 1 et annee : synthèse et plus fortes variations"""
+    donnees = donnees_evaluations()
+
+    def calcul():
+        employes, actuels, _ = _moyennes_employes(donnees, _masque(donnees, annee, departement, inclure_brouillons))
+        precedents_employes, precedents, _ = _moyennes_employes(
+            donnees, _masque(donnees, annee - 1, departement, inclure_brouillons))
+        communs, i, j = np.intersect1d(employes, precedents_employes, assume_unique=True, return_indices=True)
+        ecarts = actuels[i] - precedents[j]
+
+        resultat = {'annee': annee, 'annee_precedente': annee - 1, 'departement': departement,
+                    'nombre': int(len(communs))}
+        if not len(communs):
+            return resultat
+        ordre = np.argsort(ecarts, kind='stable')
+
+        def lignes(indices):
+            return [{'employe_id': int(communs[k]), 'score_precedent': _arrondi(precedents[j[k]]),
+                     'score': _arrondi(actuels[i[k]]), 'ecart': _arrondi(ecarts[k])} for k in indices]
+
+        resultat.update({
+            'ecart_moyen': _arrondi(ecarts.mean()),
+            'ecart_median': _arrondi(np.median(ecarts)),
+            'progressions': int(np.count_nonzero(ecarts > 0)),
+            'regressions': int(np.count_nonzero(ecarts < 0)),
+            'stables': int(np.count_nonzero(ecarts == 0)),
+            'plus_fortes_progressions': lignes(ordre[::-1][:limite]),
+            'plus_fortes_regressions': lignes(ordre[:limite]),
+        })
+        return resultat
+
+    return _memoriser(donnees, ('evolutions', annee, departement, limite, inclure_brouillons), calcul)
+
+
+def calibration(annee, inclure_brouillons=False):
+    """Statistiques par département comparées à l'entreprise : écart de moyenne et écart réduit
+    (écart / erreur type) pour repérer les départements qui notent systématiquement haut ou bas"""
+    donnees = donnees_evaluations()
+
+    def calcul():
+        masque = _masque(donnees, annee, None, inclure_brouillons)
+        scores = donnees['score'][masque].astype(np.float64)
+        codes = donnees['departement'][masque]
+        resultat = {'annee': annee, 'entreprise': _statistiques(scores), 'departements': []}
+        if not len(scores):
+            return resultat
+
+        moyenne, ecart_type = scores.mean(), scores.std()
+        ordre = np.argsort(codes, kind='stable')
+        codes_tries, scores_tries = codes[ordre], scores[ordre]
+        valeurs, debuts = np.unique(codes_tries, return_index=True)
+        libelles = {code: libelle for libelle, code in donnees['departements'].items()}
+        for code, groupe in zip(valeurs, np.split(scores_tries, debuts[1:])):
+            ecart = groupe.mean() - moyenne
+            erreur_type = ecart_type / np.sqrt(len(groupe))
+            resultat['departements'].append({
+                'departement': libelles.get(int(code)),
+                **_statistiques(groupe),
+                'ecart_moyenne': _arrondi(ecart),
+                'ecart_reduit': _arrondi(ecart / erreur_type) if erreur_type > 0 else 0.0,
+            })
+        resultat['departements'].sort(key=lambda d: d['ecart_moyenne'], reverse=True)
+        return resultat
+
+    return _memoriser(donnees, ('calibration', annee, inclure_brouillons), calcul)
@@ -0,0 +1,171 @@
+"""
+Archivage des mois clos de pointages et d'heures de travail dans des tables annuelles
+
+Les tables chaudes ne conservent que le mois en cours et le mois précédent ; les lectures
+sur une période plus ancienne passent par heures_travail_periode / pointages_periode qui
+ajoutent les tables d'archive concernées (UNION ALL) d'après le manifeste ArchivePresence.
+"""
+
+from app import db
+from app.models import Pointage, HeuresTravail, BulletinPaie, ArchivePresence
+from sqlalchemy import Table, Column, Index, MetaData, select, insert, delete, union_all, extract, and_, func, case
+from sqlalchemy.orm import aliased
+from datetime import date, datetime, timedelta
+from calendar import monthrange
+
+# Tables archivées et leur colonne de date
+SOURCES = {
+    'pointage': (Pointage, 'date_pointage'),
+    'heures_travail': (HeuresTravail, 'date_travail'),
+}
+
+_metadata_archives = MetaData()
+
+
+def debut_zone_chaude(reference=None):
+    """Premier jour du mois précédent : rien n'est archivé à partir de cette date"""
+    reference = reference or date.today()
+    return (reference.replace(day=1) - timedelta(days=1)).replace(day=1)
+
+
+def nom_table_archive(source, annee):
+    return f"{source}_archive_{annee}"
+
+
+def table_archive(source, annee):
+    """Table d'archive annuelle (mêmes colonnes que la table chaude, sans clés étrangères)"""
+    nom = nom_table_archive(source, annee)
+    if nom in _metadata_archives.tables:
+        return _metadata_archives.tables[nom]
+
+    modele, colonne_date = SOURCES[source]
+    colonnes = [
+        Column(colonne.name, colonne.type, primary_key=colonne.primary_key,
+               nullable=colonne.nullable, autoincrement=False)
+        for colonne in modele.__table__.columns
+    ]
+    return Table(
+        nom, _metadata_archives, *colonnes,
+        Index(f"idx_{nom}_employe_date", 'employe_id', colonne_date),
+        Index(f"idx_{nom}_date", colonne_date)
+    )
+
+
+# ============= LECTURE TRANSPARENTE =============
+
+def _entite_periode(source, date_debut=None, date_fin=None):
+    modele, colonne_date = SOURCES[source]
+    # Période entièrement dans la zone chaude : aucune archive possible, pas de requête au manifeste
+    if date_debut is not None and date_debut >= debut_zone_chaude():
+        return modele
+
+    query = db.session.query(ArchivePresence.annee).filter(ArchivePresence.source == source)
+    if date_debut is not None:
+        query = query.filter(ArchivePresence.annee >= date_debut.year)
+    if date_fin is not None:
+        query = query.filter(ArchivePresence.annee <= date_fin.year)
+    annees = sorted({annee for (annee,) in query.distinct().all()})
+    if not annees:
+        return modele
+
+    table = modele.__table__
+    noms = [colonne.name for colonne in table.columns]
+    parties = []
+    for source_table in [table] + [table_archive(source, annee) for annee in annees]:
+        partie = select(*[source_table.c[nom] for nom in noms])
+        # Filtre répété dans chaque branche pour profiter des index de chaque table
+        if date_debut is not None:
+            partie = partie.where(source_table.c[colonne_date] >= date_debut)
+        if date_fin is not None:
+            partie = partie.where(source_table.c[colonne_date] <= date_fin)
+        parties.append(partie)
+    return aliased(modele, union_all(*parties).subquery(f"{source}_periode"))
+
+
+def heures_travail_periode(date_debut=None, date_fin=None):
+    """Entité HeuresTravail à interroger pour la période (table chaude et archives utiles)"""
+    return _entite_periode('heures_travail', date_debut, date_fin)
+
+
+def pointages_periode(date_debut=None, date_fin=None):
+    """Entité Pointage à interroger pour la période (table chaude et archives utiles)"""
+    return _entite_periode('pointage', date_debut, date_fin)
+
+
+def mois_archive(jour):
+    """Le mois de cette date a-t-il déjà été archivé"""
+    if jour >= debut_zone_chaude():
+        return False
+    return db.session.query(ArchivePresence.id).filter_by(annee=jour.year, mois=jour.month).first() is not None
+
+
+# ============= ARCHIVAGE =============
+
+def mois_clos(annee, mois, reference=None):
+    """Mois antérieur à la zone chaude dont la paie a été faite et entièrement payée"""
+    if date(annee, mois, 1) >= debut_zone_chaude(reference):
+        return False
+    nb_bulletins, nb_payes = db.session.query(
+        func.count(BulletinPaie.id),
+        func.sum(case((BulletinPaie.statut == 'payé', 1), else_=0))
+    ).filter(
+        BulletinPaie.annee == annee,
+        BulletinPaie.mois == mois
+    ).one()
+    # Sans bulletin, la paie du mois n'est pas encore faite : le mois reste ouvert
+    return nb_bulletins > 0 and nb_payes == nb_bulletins
+
+
+def mois_a_archiver(reference=None):
+    """Mois (annee, mois) encore présents dans les tables chaudes et archivables"""
+    limite = debut_zone_chaude(reference)
+    mois = set()
+    for modele, colonne_date in SOURCES.values():
+        colonne = getattr(modele, colonne_date)
+        mois |= {
+            (int(annee), int(numero)) for annee, numero in db.session.query(
+                extract('year', colonne), extract('month', colonne)
+            ).filter(colonne < limite).distinct().all()
+        }
+    return [m for m in sorted(mois) if mois_clos(m[0], m[1], reference)]
+
+
+def archiver_mois(annee, mois):
+    """Déplace les lignes d'un mois clos vers les tables d'archive et met à jour le manifeste (sans commit)"""
+    if not mois_clos(annee, mois):
+        raise ValueError(f"Le mois {mois:02d}/{annee} n'est pas clos (zone chaude ou paie non payée)")
+
+    debut = date(annee, mois, 1)
+    fin = date(annee, mois, monthrange(annee, mois)[1])
+    connexion = db.session.connection()
+    bilan = {}
+
+    for source, (modele, colonne_date) in SOURCES.items():
+        table = modele.__table__
+        archive = table_archive(source, annee)
+        archive.create(bind=connexion, checkfirst=True)
+
+        noms = [colonne.name for colonne in table.columns]
+        filtre = and_(table.c[colonne_date] >= debut, table.c[colonne_date] <= fin)
+        resultat = db.session.execute(
+            insert(archive).from_select(noms, select(*[table.c[nom] for nom in noms]).where(filtre))
+        )
+        db.session.execute(delete(table).where(filtre))
+
+        entree = ArchivePresence.query.filter_by(source=source, annee=annee, mois=mois).first()
+        if entree is None:
+            entree = ArchivePresence(source=source, annee=annee, mois=mois,
+                                     table_archive=archive.name, nb_lignes=0)
+            db.session.add(entree)
+        entree.nb_lignes += max(resultat.rowcount, 0)
+        entree.date_archivage = datetime.utcnow()
+        bilan[source] = max(resultat.rowcount, 0)
+
+    return bilan
+
+
+def supprimer_archives_employe(employe_id):
+    """Supprime les lignes archivées d'un employé dans toutes les tables d'archive (sans commit)"""
+    for source, annee in db.session.query(ArchivePresence.source, ArchivePresence.annee).distinct().all():
+        archive = table_archive(source, annee)
+        db.session.execute(delete(archive).where(archive.c.employe_id == employe_id))
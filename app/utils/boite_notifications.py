@@ -0,0 +1,132 @@
+"""
+Boîte de réception des notifications de présence (destinataires RH)
+"""
+
+from app import db
+from app.models import NotificationPresence, NotificationPresenceArchive, CompteurNotification
+from sqlalchemy import insert, update, delete, select
+from datetime import datetime
+
+CLE_NON_LUES = 'notifications_non_lues_rh'
+STATUTS_NON_LUS = ('nouvelle', 'envoyee')
+STATUTS_TRAITES = ('lue', 'traitee')
+
+
+def _filtre_boite():
+    """Notifications adressées aux RH"""
+    return NotificationPresence.destinataire_rh == True
+
+
+def _compter_non_lues():
+    return NotificationPresence.query.filter(
+        _filtre_boite(), NotificationPresence.statut.in_(STATUTS_NON_LUS)
+    ).count()
+
+
+def recalculer_non_lues():
+    """Recalcule et enregistre le compteur de notifications non lues (sans commit)"""
+    valeur = _compter_non_lues()
+    compteur = CompteurNotification.query.filter_by(cle=CLE_NON_LUES).first()
+    if compteur is None:
+        compteur = CompteurNotification(cle=CLE_NON_LUES)
+        db.session.add(compteur)
+    compteur.valeur = valeur
+    return valeur
+
+
+def ajuster_non_lues(delta):
+    """Incrémente atomiquement le compteur de non lues, ou l'initialise s'il n'existe pas (sans commit)"""
+    if not delta:
+        return
+    resultat = db.session.execute(
+        update(CompteurNotification)
+        .where(CompteurNotification.cle == CLE_NON_LUES)
+        .values(valeur=CompteurNotification.valeur + delta, date_mise_a_jour=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if resultat.rowcount == 0:
+        recalculer_non_lues()
+
+
+def compter_non_lues():
+    """Nombre de notifications non lues, lu depuis le compteur"""
+    valeur = db.session.query(CompteurNotification.valeur).filter_by(cle=CLE_NON_LUES).scalar()
+    return _compter_non_lues() if valeur is None else max(valeur, 0)
+
+
+def lister_notifications(curseur=None, limite=50, statut=None, type_notification=None):
+    """Page de notifications triées par id décroissant ; retourne (notifications, curseur_suivant)"""
+    query = NotificationPresence.query.filter(_filtre_boite())
+    if statut == 'non_lues':
+        query = query.filter(NotificationPresence.statut.in_(STATUTS_NON_LUS))
+    elif statut:
+        query = query.filter(NotificationPresence.statut == statut)
+    if type_notification:
+        query = query.filter(NotificationPresence.type_notification == type_notification)
+    if curseur:
+        query = query.filter(NotificationPresence.id < curseur)
+
+    notifications = query.order_by(NotificationPresence.id.desc()).limit(limite + 1).all()
+    curseur_suivant = None
+    if len(notifications) > limite:
+        notifications = notifications[:limite]
+        curseur_suivant = notifications[-1].id
+    return notifications, curseur_suivant
+
+
+def mettre_a_jour_statut(statut, ids=None, jusqu_a=None):
+    """Passe en 'lue' ou 'traitee' une liste d'ids ou toutes les notifications jusqu'à un id (sans commit)"""
+    if statut not in STATUTS_TRAITES:
+        raise ValueError(f"Statut invalide : {statut}")
+    if ids:
+        cible = NotificationPresence.id.in_(ids)
+    elif jusqu_a is not None:
+        cible = NotificationPresence.id <= int(jusqu_a)
+    else:
+        raise ValueError("Indiquer une liste d'ids ou un curseur")
+
+    resultat = db.session.execute(
+        update(NotificationPresence)
+        .where(_filtre_boite(), cible, NotificationPresence.statut.in_(STATUTS_NON_LUS))
+        .values(statut=statut, date_lecture=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    modifiees = resultat.rowcount
+    ajuster_non_lues(-modifiees)
+
+    if statut == 'traitee':
+        resultat = db.session.execute(
+            update(NotificationPresence)
+            .where(_filtre_boite(), cible, NotificationPresence.statut == 'lue')
+            .values(statut='traitee')
+            .execution_options(synchronize_session=False)
+        )
+        modifiees += resultat.rowcount
+
+    return modifiees
+
+
+def archiver_notifications(avant, taille_lot=500):
+    """Déplace par lots vers la table d'archive les notifications lues/traitées antérieures à une date"""
+    table = NotificationPresence.__table__
+    colonnes = [colonne.name for colonne in table.columns]
+    total = 0
+
+    while True:
+        ids = [notif_id for (notif_id,) in db.session.query(NotificationPresence.id).filter(
+            NotificationPresence.statut.in_(STATUTS_TRAITES),
+            NotificationPresence.date_reference < avant
+        ).order_by(NotificationPresence.id).limit(taille_lot).all()]
+        if not ids:
+            break
+
+        db.session.execute(
+            insert(NotificationPresenceArchive.__table__).from_select(
+                colonnes, select(*[table.c[nom] for nom in colonnes]).where(table.c.id.in_(ids))
+            )
+        )
+        db.session.execute(delete(table).where(table.c.id.in_(ids)))
+        db.session.commit()
+        total += len(ids)
+
+    return total
@@ -0,0 +1,289 @@
+"""
+Génération en lot des bulletins de paie PDF d'une période
+
+Les bulletins, employés, éléments de paie et remboursements d'avances sont chargés en trois
+requêtes ensemblistes et convertis en dictionnaires, rendus avec ReportLab par un pool de
+processus (modèle de mise en page construit une fois par processus) puis regroupés dans
+une archive ZIP écrite sur disque.
+"""
+
+from app import db
+from app.models import BulletinPaie, ElementPaie, RemboursementAvance, AvanceSalaire, Employee
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+from sqlalchemy import select
+from werkzeug.utils import secure_filename
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict
+from functools import lru_cache
+from itertools import repeat
+from io import BytesIO
+import os
+import time
+import zipfile
+
+TAILLE_LOT = 25  # bulletins rendus par tâche du pool
+MOIS = ['', 'Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin',
+        'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre']
+
+
+# ============= CHARGEMENT =============
+
+def _filtres_periode(requete, mois, annee, statuts=None, employe_ids=None):
+    requete = requete.where(BulletinPaie.mois == mois, BulletinPaie.annee == annee)
+    if statuts:
+        requete = requete.where(BulletinPaie.statut.in_(statuts))
+    if employe_ids:
+        requete = requete.where(BulletinPaie.employe_id.in_(employe_ids))
+    return requete
+
+
+def charger_bulletins(mois, annee, statuts=None, employe_ids=None):
+    """Bulletins de la période sous forme de dictionnaires (sérialisables pour le pool de processus)"""
+    colonnes_bulletin = [c for c in BulletinPaie.__table__.columns]
+    requete = select(
+        *colonnes_bulletin,
+        Employee.nom.label('employe_nom'), Employee.prenom.label('employe_prenom'),
+        Employee.poste.label('employe_poste'), Employee.departement.label('employe_departement'),
+        Employee.type_contrat.label('employe_type_contrat'), Employee.date_embauche.label('employe_date_embauche'),
+        Employee.numero_cnps.label('employe_numero_cnps'),
+    ).join(Employee, Employee.id == BulletinPaie.employe_id)
+    requete = _filtres_periode(requete, mois, annee, statuts, employe_ids).order_by(
+        Employee.nom, Employee.prenom, BulletinPaie.id
+    )
+    bulletins = [dict(ligne._mapping) for ligne in db.session.execute(requete)]
+    for bulletin in bulletins:
+        bulletin.update(gains=[], retenues=[], remboursements=[])
+    par_id = {bulletin['id']: bulletin for bulletin in bulletins}
+    if not bulletins:
+        return bulletins
+
+    # Éléments de tous les bulletins de la période en une requête (même filtre, sans liste d'ids)
+    elements = select(
+        ElementPaie.bulletin_id, ElementPaie.libelle, ElementPaie.code, ElementPaie.type_element,
+        ElementPaie.base_calcul, ElementPaie.taux, ElementPaie.quantite, ElementPaie.montant,
+        ElementPaie.part_salariale, ElementPaie.part_patronale
+    ).join(BulletinPaie, BulletinPaie.id == ElementPaie.bulletin_id)
+    elements = _filtres_periode(elements, mois, annee, statuts, employe_ids).order_by(
+        ElementPaie.bulletin_id, ElementPaie.ordre_affichage, ElementPaie.id
+    )
+    for element in db.session.execute(elements):
+        bulletin = par_id.get(element.bulletin_id)
+        if bulletin is not None:
+            cle = 'gains' if element.type_element == 'gain' else 'retenues'
+            bulletin[cle].append(dict(element._mapping))
+
+    remboursements = select(
+        RemboursementAvance.bulletin_id, RemboursementAvance.montant, RemboursementAvance.numero_echeance,
+        RemboursementAvance.date_remboursement, AvanceSalaire.nb_mensualites, AvanceSalaire.solde_restant
+    ).join(BulletinPaie, BulletinPaie.id == RemboursementAvance.bulletin_id).join(
+        AvanceSalaire, AvanceSalaire.id == RemboursementAvance.avance_id
+    )
+    remboursements = _filtres_periode(remboursements, mois, annee, statuts, employe_ids).order_by(
+        RemboursementAvance.bulletin_id, RemboursementAvance.numero_echeance
+    )
+    for remboursement in db.session.execute(remboursements):
+        bulletin = par_id.get(remboursement.bulletin_id)
+        if bulletin is not None:
+            bulletin['remboursements'].append(dict(remboursement._mapping))
+
+    return bulletins
+
+
+# ============= RENDU =============
+
+def _montant(valeur):
+    return f"{valeur or 0:,.0f}".replace(',', ' ')
+
+
+class ModeleBulletin:
+    """Mise en page d'un bulletin : styles et tableaux préparés une fois, réutilisés pour chaque PDF"""
+
+    def __init__(self, entreprise):
+        self.entreprise = entreprise
+        styles = getSampleStyleSheet()
+        self.titre = ParagraphStyle('TitreBulletin', parent=styles['Heading1'], fontSize=15, spaceAfter=4)
+        self.normal = ParagraphStyle('TexteBulletin', parent=styles['Normal'], fontSize=8.5, leading=11)
+        self.droite = ParagraphStyle('TexteDroite', parent=self.normal, alignment=TA_RIGHT)
+        self.section = ParagraphStyle('SectionBulletin', parent=styles['Heading3'], fontSize=10,
+                                      spaceBefore=8, spaceAfter=3)
+        self.entete_texte = Paragraph(f"<b>{entreprise}</b>", self.normal)
+
+        grille = [
+            ('FONT', (0, 0), (-1, -1), 'Helvetica', 8),
+            ('FONT', (0, 0), (-1, 0), 'Helvetica-Bold', 8),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.HexColor('#bdc3c7')),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f4f6f7')]),
+        ]
+        self.style_lignes = TableStyle(grille)
+        self.style_identite = TableStyle([
+            ('FONT', (0, 0), (-1, -1), 'Helvetica', 8.5),
+            ('FONT', (0, 0), (0, -1), 'Helvetica-Bold', 8.5),
+            ('FONT', (2, 0), (2, -1), 'Helvetica-Bold', 8.5),
+            ('BOX', (0, 0), (-1, -1), 0.5, colors.HexColor('#7f8c8d')),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+        self.style_totaux = TableStyle(grille + [
+            ('FONT', (0, -1), (-1, -1), 'Helvetica-Bold', 9),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#d5f5e3')),
+        ])
+        largeur = A4[0] - 3 * cm
+        self.largeurs_identite = [largeur * 0.18, largeur * 0.32, largeur * 0.18, largeur * 0.32]
+        self.largeurs_gains = [largeur * 0.46, largeur * 0.18, largeur * 0.12, largeur * 0.24]
+        self.largeurs_retenues = [largeur * 0.40, largeur * 0.18, largeur * 0.10, largeur * 0.16, largeur * 0.16]
+        self.largeurs_totaux = [largeur * 0.70, largeur * 0.30]
+
+    def flowables(self, b):
+        periode = f"{MOIS[b['mois']]} {b['annee']}"
+        elements = [
+            self.entete_texte,
+            Paragraph(f"Bulletin de paie - {periode}", self.titre),
+            Paragraph(f"N° {b['numero_bulletin']} - du {b['periode_debut']:%d/%m/%Y} au {b['periode_fin']:%d/%m/%Y}",
+                      self.normal),
+            Spacer(1, 0.3 * cm),
+            Table([
+                ['Employé', f"{b['employe_nom']} {b['employe_prenom'] or ''}", 'Poste', b['employe_poste'] or '-'],
+                ['Département', b['employe_departement'] or '-', 'Contrat', b['employe_type_contrat'] or '-'],
+                ['Embauche', f"{b['employe_date_embauche']:%d/%m/%Y}" if b['employe_date_embauche'] else '-',
+                 'N° CNPS', b['employe_numero_cnps'] or '-'],
+                ['Jours travaillés', f"{b['nb_jours_travailles'] or 0:g} / {b['nb_jours_ouvres'] or 0}",
+                 'Heures sup.', f"{b['nb_heures_supplementaires'] or 0:g} h"],
+            ], colWidths=self.largeurs_identite, style=self.style_identite),
+        ]
+
+        gains = b['gains'] or [{'libelle': 'Salaire de base', 'base_calcul': None, 'taux': None,
+                                'montant': b['salaire_base']}]
+        elements += [
+            Paragraph('Gains', self.section),
+            Table([['Libellé', 'Base', 'Taux', 'Montant']] + [
+                [g['libelle'], _montant(g['base_calcul']) if g['base_calcul'] else '',
+                 f"{g['taux']:g} %" if g['taux'] else '', _montant(g['montant'])]
+                for g in gains
+            ], colWidths=self.largeurs_gains, style=self.style_lignes, repeatRows=1),
+        ]
+        if b['retenues']:
+            elements += [
+                Paragraph('Retenues et cotisations', self.section),
+                Table([['Libellé', 'Base', 'Taux', 'Part salariale', 'Part patronale']] + [
+                    [r['libelle'], _montant(r['base_calcul']) if r['base_calcul'] else '',
+                     f"{r['taux']:g} %" if r['taux'] else '',
+                     _montant(r['part_salariale'] or r['montant']), _montant(r['part_patronale'])]
+                    for r in b['retenues']
+                ], colWidths=self.largeurs_retenues, style=self.style_lignes, repeatRows=1),
+            ]
+        if b['remboursements']:
+            elements += [
+                Paragraph("Remboursements d'avances", self.section),
+                Table([['Échéance', 'Montant']] + [
+                    [f"{r['numero_echeance']} / {r['nb_mensualites'] or 1}", _montant(r['montant'])]
+                    for r in b['remboursements']
+                ], colWidths=self.largeurs_totaux, style=self.style_lignes),
+            ]
+
+        elements += [
+            Paragraph('Récapitulatif', self.section),
+            Table([
+                ['Rubrique', 'Montant (FCFA)'],
+                ['Salaire brut', _montant(b['salaire_brut'])],
+                ['Cotisations salariales', _montant(b['total_cotisations_salariales'])],
+                ['Salaire imposable', _montant(b['salaire_imposable'])],
+                ['Impôt sur salaire', _montant(b['impot_sur_salaire'])],
+                ['Retenues diverses', _montant(b['retenues_diverses'])],
+                ['Net à payer', _montant(b['salaire_net'])],
+            ], colWidths=self.largeurs_totaux, style=self.style_totaux),
+            Spacer(1, 0.3 * cm),
+            Paragraph(f"Cotisations patronales : {_montant(b['total_cotisations_patronales'])} FCFA - "
+                      f"Paiement : {b['mode_paiement'] or 'virement'}", self.normal),
+        ]
+        return elements
+
+    def rendre(self, bulletin):
+        """PDF d'un bulletin (octets)"""
+        sortie = BytesIO()
+        doc = SimpleDocTemplate(sortie, pagesize=A4, leftMargin=1.5 * cm, rightMargin=1.5 * cm,
+                                topMargin=1.5 * cm, bottomMargin=1.5 * cm,
+                                title=f"Bulletin {bulletin['numero_bulletin']}", pageCompression=1)
+        doc.build(self.flowables(bulletin))
+        return sortie.getvalue()
+
+
+@lru_cache(maxsize=4)
+def modele_bulletin(entreprise):
+    """Modèle de mise en page mis en cache dans chaque processus"""
+    return ModeleBulletin(entreprise)
+
+
+def nom_fichier_bulletin(bulletin):
+    nom = secure_filename(f"{bulletin['numero_bulletin']}_{bulletin['employe_nom']}_{bulletin['employe_prenom'] or ''}")
+    return f"{nom or bulletin['id']}.pdf"
+
+
+def _rendre_lot(lot, entreprise):
+    """Tâche du pool : rend un lot de bulletins, retourne [(nom de fichier, PDF)]"""
+    modele = modele_bulletin(entreprise)
+    return [(nom_fichier_bulletin(bulletin), modele.rendre(bulletin)) for bulletin in lot]
+
+
+def generer_bulletins_lot(mois, annee, sortie, processus=None, statuts=None, employe_ids=None,
+                          entreprise='RH Manager'):
+    """Écrit les bulletins PDF de la période dans l'archive ZIP sortie (chemin ou fichier) et
+    retourne les métriques de débit. processus=1 rend dans le processus courant."""
+    debut = time.perf_counter()
+    bulletins = charger_bulletins(mois, annee, statuts, employe_ids)
+    duree_chargement = time.perf_counter() - debut
+
+    lots = [bulletins[i:i + TAILLE_LOT] for i in range(0, len(bulletins), TAILLE_LOT)]
+    processus = min(processus or os.cpu_count() or 1, max(len(lots), 1))
+    ecriture_atomique = isinstance(sortie, (str, os.PathLike))
+    cible = f"{sortie}.tmp" if ecriture_atomique else sortie
+
+    debut_rendu = time.perf_counter()
+    taille_pdf = 0
+    noms = defaultdict(int)
+    try:
+        # Les PDF sont déjà compressés : archive sans recompression
+        with zipfile.ZipFile(cible, 'w', compression=zipfile.ZIP_STORED) as archive:
+            if processus > 1:
+                with ProcessPoolExecutor(max_workers=processus) as pool:
+                    resultats = pool.map(_rendre_lot, lots, repeat(entreprise))
+                    taille_pdf = _ecrire_archive(archive, resultats, noms, mois, annee)
+            else:
+                resultats = (_rendre_lot(lot, entreprise) for lot in lots)
+                taille_pdf = _ecrire_archive(archive, resultats, noms, mois, annee)
+        if ecriture_atomique:
+            os.replace(cible, sortie)
+    except Exception:
+        if ecriture_atomique and os.path.exists(cible):
+            os.remove(cible)
+        raise
+
+    duree_rendu = time.perf_counter() - debut_rendu
+    duree = time.perf_counter() - debut
+    return {
+        'bulletins': len(bulletins),
+        'processus': processus,
+        'duree_chargement': duree_chargement,
+        'duree_rendu': duree_rendu,
+        'duree': duree,
+        'bulletins_par_seconde': len(bulletins) / duree_rendu if duree_rendu else 0,
+        'taille_pdf': taille_pdf,
+    }
+
+
+def _ecrire_archive(archive, resultats, noms, mois, annee):
+    taille = 0
+    for lot in resultats:
+        for nom, pdf in lot:
+            noms[nom] += 1
+            if noms[nom] > 1:
+                nom = f"{nom[:-4]}_{noms[nom]}.pdf"
+            archive.writestr(f"bulletins_{annee}_{mois:02d}/{nom}", pdf)
+            taille += len(pdf)
+    return taille
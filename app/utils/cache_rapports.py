@@ -0,0 +1,171 @@
+"""
+Cache disque des rapports générés (Excel, PDF, CSV), adressé par leur contenu logique
+
+La clé d'un rapport combine son type, ses paramètres normalisés et un jeton de version des
+tables sources (nombre de lignes, identifiant et horodatages maximaux). Tant que ce jeton
+ne change pas, le fichier déjà produit est renvoyé directement. Les fichiers les moins
+récemment servis sont supprimés au-delà de CACHE_RAPPORTS_TAILLE_MO.
+"""
+
+from app import db
+from flask import current_app, send_file
+from sqlalchemy import select, func
+from werkzeug.http import parse_options_header
+from datetime import date, datetime
+from hashlib import sha256
+import json
+import os
+import tempfile
+
+# Colonnes d'horodatage suivies par modèle (en plus du nombre de lignes et de l'identifiant maximal)
+HORODATAGES = {
+    'Employee': ('date_modification',),
+    'Conge': ('date_modification',),
+    'Absence': ('date_modification',),
+    'Presence': ('date_modification',),
+    'BulletinPaie': ('date_modification',),
+    'Evaluation': ('updated_at',),
+    'HeuresTravail': ('date_modification',),
+    'ArchivePresence': ('date_archivage',),
+}
+
+
+def _normaliser(valeur):
+    if isinstance(valeur, dict):
+        return {str(k): _normaliser(v) for k, v in sorted(valeur.items())
+                if k not in ('csrf_token', 'submit') and v not in (None, '', [], ())}
+    if isinstance(valeur, (list, tuple, set)):
+        return sorted((_normaliser(v) for v in valeur), key=str)
+    if isinstance(valeur, (date, datetime)):
+        return valeur.isoformat()
+    if isinstance(valeur, str):
+        return valeur.strip()
+    return valeur
+
+
+def jeton_version(modeles):
+    """Jeton de version des tables sources, calculé en une seule requête.
+
+    Les rapports lisant les tables d'archive incluent ArchivePresence dans leurs sources :
+    un archivage déplace des lignes sans modifier leurs horodatages. Une table source sans
+    horodatage de mise à jour dans HORODATAGES rend le rapport non cachable (voir rapport_en_cache).
+    """
+    modeles = sorted(set(modeles), key=lambda m: m.__name__)
+    colonnes = []
+    for modele in modeles:
+        colonnes.append(select(func.count()).select_from(modele).scalar_subquery())
+        colonnes.append(select(func.max(modele.id)).scalar_subquery())
+        for nom in HORODATAGES.get(modele.__name__, ()):
+            colonnes.append(select(func.max(getattr(modele, nom))).scalar_subquery())
+    valeurs = db.session.execute(select(*colonnes)).one()
+    return sha256(json.dumps([m.__name__ for m in modeles] + list(valeurs), default=str).encode()).hexdigest()
+
+
+def cle_rapport(type_rapport, parametres, modeles):
+    contenu = json.dumps({
+        'type': type_rapport,
+        'parametres': _normaliser(parametres or {}),
+        'version': jeton_version(modeles),
+    }, sort_keys=True, default=str)
+    return sha256(contenu.encode()).hexdigest()
+
+
+def repertoire_cache():
+    return current_app.config.get('CACHE_RAPPORTS_REPERTOIRE') or os.path.join(current_app.instance_path, 'cache_rapports')
+
+
+def _chemins(cle):
+    dossier = os.path.join(repertoire_cache(), cle[:2])
+    return dossier, os.path.join(dossier, f"{cle}.bin"), os.path.join(dossier, f"{cle}.json")
+
+
+def _servir(chemin, meta):
+    # La date d'accès sert à l'éviction LRU
+    os.utime(chemin)
+    return send_file(chemin, as_attachment=True, download_name=meta['nom_fichier'], mimetype=meta['mimetype'])
+
+
+def lire_rapport(cle):
+    """Réponse servant le rapport en cache, ou None"""
+    _, chemin, chemin_meta = _chemins(cle)
+    try:
+        with open(chemin_meta, encoding='utf-8') as fichier:
+            meta = json.load(fichier)
+        return _servir(chemin, meta)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def enregistrer_rapport(cle, reponse):
+    """Copie le corps d'une réponse de téléchargement dans le cache et la sert depuis le disque"""
+    disposition, options = parse_options_header(reponse.headers.get('Content-Disposition', ''))
+    if reponse.status_code != 200 or disposition != 'attachment' or not options.get('filename'):
+        return reponse
+
+    dossier, chemin, chemin_meta = _chemins(cle)
+    os.makedirs(dossier, exist_ok=True)
+    descripteur, temporaire = tempfile.mkstemp(dir=dossier, suffix='.tmp')
+    try:
+        # Copie en flux : le rapport n'est jamais entièrement chargé en mémoire
+        reponse.direct_passthrough = False
+        with os.fdopen(descripteur, 'wb') as fichier:
+            for morceau in reponse.iter_encoded():
+                fichier.write(morceau)
+        reponse.close()
+        meta = {'nom_fichier': options['filename'], 'mimetype': reponse.mimetype,
+                'date_creation': datetime.now().isoformat(timespec='seconds')}
+        with open(chemin_meta, 'w', encoding='utf-8') as fichier:
+            json.dump(meta, fichier)
+        os.replace(temporaire, chemin)
+    except Exception:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+        raise
+
+    evincer_rapports()
+    return _servir(chemin, meta)
+
+
+def evincer_rapports(taille_max=None):
+    """Supprime les rapports les moins récemment servis au-delà de la taille maximale du cache"""
+    taille_max = taille_max if taille_max is not None else current_app.config.get('CACHE_RAPPORTS_TAILLE_MO', 500) * 1024 * 1024
+    fichiers = []
+    racine = repertoire_cache()
+    for dossier in os.scandir(racine) if os.path.isdir(racine) else ():
+        if not dossier.is_dir():
+            continue
+        for entree in os.scandir(dossier.path):
+            if entree.name.endswith('.bin'):
+                try:
+                    statistiques = entree.stat()
+                except FileNotFoundError:
+                    continue
+                fichiers.append((statistiques.st_mtime, statistiques.st_size, entree.path))
+
+    total = sum(taille for _, taille, _ in fichiers)
+    supprimes = 0
+    for _, taille, chemin in sorted(fichiers):
+        if total <= taille_max:
+            break
+        for cible in (chemin, chemin[:-4] + '.json'):
+            try:
+                os.remove(cible)
+            except FileNotFoundError:
+                pass
+        total -= taille
+        supprimes += 1
+    return supprimes
+
+
+def rapport_en_cache(type_rapport, parametres, modeles, generer):
+    """Sert le rapport depuis le cache si les données sources n'ont pas changé, sinon le génère
+    avec generer() (réponse Flask de téléchargement) et le conserve"""
+    # Modifications indétectables sans horodatage de mise à jour : pas de cache plutôt qu'un rapport périmé
+    if not current_app.config.get('CACHE_RAPPORTS_ACTIF', True) or any(
+            m.__name__ not in HORODATAGES for m in modeles):
+        return generer()
+    cle = cle_rapport(type_rapport, parametres, modeles)
+    reponse = lire_rapport(cle)
+    if reponse is not None:
+        return reponse
+    return enregistrer_rapport(cle, generer())
@@ -0,0 +1,187 @@
+"""
+Campagnes d'évaluation
+
+Une campagne crée, pour un modèle et une année, une évaluation en brouillon par employé de la
+population ciblée (département, statut) avec les critères du modèle. Le JSON du modèle est lu
+une seule fois ; les évaluations puis leurs critères sont écrits par lots d'INSERT multi-lignes.
+Les employés ayant déjà une évaluation de ce modèle pour l'année sont ignorés : relancer une
+campagne ne complète que les nouveaux arrivants.
+
+Les critères d'un modèle se saisissent dans son formulaire, un par ligne :
+
+    Section | Critère | score max | poids | description
+
+Score max (5 par défaut), poids (1 par défaut) et description sont facultatifs ; les lignes
+vides ou commençant par # sont ignorées. Ils sont enregistrés dans criteres_json (liste
+d'objets section, critere, description, score_max, poids, ordre) et l'ordre des sections
+dans sections_json (liste de noms).
+"""
+
+from app import db
+from app.models import Employee, Evaluation, CritereEvaluation
+from sqlalchemy import select, insert
+from datetime import date, datetime
+import json
+
+TAILLE_LOT = 1000
+SCORE_MAX_DEFAUT = 5.0
+SEPARATEUR = '|'
+
+
+def _nombre(valeur, defaut, libelle):
+    if valeur in (None, ''):
+        return defaut
+    try:
+        nombre = float(str(valeur).replace(',', '.'))
+    except ValueError:
+        raise ValueError(f"{libelle} invalide : « {valeur} »")
+    if nombre <= 0:
+        raise ValueError(f"{libelle} doit être positif : « {valeur} »")
+    return nombre
+
+
+def _critere(section, nom, score_max=None, poids=None, description=None, ordre=1):
+    section, nom = (section or '').strip(), (nom or '').strip()
+    if not section or not nom:
+        raise ValueError("Chaque critère doit avoir une section et un nom")
+    return {
+        'section': section[:100],
+        'critere': nom[:200],
+        'description': (description or '').strip() or None,
+        'score_max': _nombre(score_max, SCORE_MAX_DEFAUT, f"Score maximal du critère « {nom} »"),
+        'poids': _nombre(poids, 1.0, f"Poids du critère « {nom} »"),
+        'ordre': int(ordre),
+    }
+
+
+def _numeroter(criteres):
+    """Ordre des critères dans leur section, dans l'ordre de saisie"""
+    compteurs = {}
+    for critere in criteres:
+        compteurs[critere['section']] = critere['ordre'] = compteurs.get(critere['section'], 0) + 1
+    return criteres
+
+
+def analyser_criteres(texte):
+    """Critères saisis (une ligne par critère) -> liste de dicts. Lève ValueError avec le numéro de ligne."""
+    criteres = []
+    for numero, ligne in enumerate((texte or '').splitlines(), start=1):
+        ligne = ligne.strip()
+        if not ligne or ligne.startswith('#'):
+            continue
+        colonnes = [colonne.strip() for colonne in ligne.split(SEPARATEUR, 4)]
+        if len(colonnes) < 2:
+            raise ValueError(f"Ligne {numero} : format attendu « Section | Critère | score max | poids »")
+        colonnes += [None] * (5 - len(colonnes))
+        try:
+            criteres.append(_critere(*colonnes))
+        except ValueError as e:
+            raise ValueError(f"Ligne {numero} : {e}")
+    return _numeroter(criteres)
+
+
+def criteres_en_texte(criteres):
+    """Liste de critères -> texte éditable dans le formulaire du modèle"""
+    lignes = []
+    for critere in criteres:
+        colonnes = [critere['section'], critere['critere'], f"{critere['score_max']:g}", f"{critere['poids']:g}"]
+        if critere.get('description'):
+            colonnes.append(critere['description'])
+        lignes.append(f' {SEPARATEUR} '.join(colonnes))
+    return '\n'.join(lignes)
+
+
+def enregistrer_criteres(template, criteres):
+    """Écrit les critères et l'ordre des sections dans le modèle"""
+    template.criteres_json = json.dumps(criteres, ensure_ascii=False)
+    template.sections_json = json.dumps(list(dict.fromkeys(c['section'] for c in criteres)), ensure_ascii=False)
+
+
+def criteres_modele(template):
+    """Critères enregistrés d'un modèle (liste vide si aucun). Lève ValueError si le JSON est invalide."""
+    try:
+        contenu = json.loads(template.criteres_json or '[]')
+    except ValueError:
+        raise ValueError(f"Critères du modèle « {template.nom} » : JSON invalide")
+    if not isinstance(contenu, list) or not all(isinstance(c, dict) for c in contenu):
+        raise ValueError(f"Critères du modèle « {template.nom} » : liste de critères attendue")
+    return _numeroter([_critere(c.get('section'), c.get('critere'), c.get('score_max'), c.get('poids'),
+                                c.get('description')) for c in contenu])
+
+
+def criteres_template(template):
+    """Critères à créer pour chaque évaluation de la campagne. Lève ValueError si le modèle n'en a pas."""
+    criteres = criteres_modele(template)
+    if not criteres:
+        raise ValueError(f"Le modèle « {template.nom} » ne définit aucun critère : "
+                         "saisissez-les dans le formulaire du modèle")
+    return [dict(critere, score_obtenu=0.0) for critere in criteres]
+
+
+def employes_cibles(template_id, annee, departement=None, statut='Actif'):
+    """Population de la campagne : (employés à évaluer, nombre déjà évalués pour ce modèle et l'année)"""
+    deja_evalue = select(Evaluation.id).where(
+        Evaluation.employe_id == Employee.id,
+        Evaluation.annee == annee,
+        Evaluation.template_id == template_id,
+    ).exists()
+    requete = select(Employee.id, deja_evalue).order_by(Employee.id)
+    if departement:
+        requete = requete.where(Employee.departement == departement)
+    if statut:
+        requete = requete.where(Employee.statut == statut)
+    a_evaluer, ignores = [], 0
+    for employe_id, evalue in db.session.execute(requete):
+        if evalue:
+            ignores += 1
+        else:
+            a_evaluer.append(employe_id)
+    return a_evaluer, ignores
+
+
+def lancer_campagne(template, annee, evaluateur_id, departement=None, statut='Actif',
+                    periode=None, date_evaluation=None, created_by=None):
+    """Crée les évaluations et critères de la campagne (sans commit).
+
+    Retourne {'evaluations': n, 'criteres': n, 'employes_ignores': n}.
+    """
+    if not template.actif:
+        raise ValueError(f"Le modèle « {template.nom} » est inactif")
+    criteres = criteres_template(template)
+    employe_ids, ignores = employes_cibles(template.id, annee, departement, statut)
+    periode = periode or f"{(template.type_evaluation or '').capitalize()} {annee}".strip()
+    date_evaluation = date_evaluation or date.today()
+    maintenant = datetime.utcnow()
+
+    bilan = {'evaluations': 0, 'criteres': 0, 'employes_ignores': ignores}
+    for i in range(0, len(employe_ids), TAILLE_LOT):
+        lot = employe_ids[i:i + TAILLE_LOT]
+        db.session.execute(insert(Evaluation), [{
+            'employe_id': employe_id,
+            'evaluateur_id': evaluateur_id,
+            'template_id': template.id,
+            'periode': periode,
+            'type_evaluation': template.type_evaluation,
+            'annee': annee,
+            'score_global': 0.0,
+            'score_max': template.score_max or 100.0,
+            'statut': 'Brouillon',
+            'date_creation': maintenant,
+            'date_evaluation': date_evaluation,
+            'created_by': created_by,
+            'updated_at': maintenant,
+        } for employe_id in lot])
+
+        # Identifiants relus par (employé, année, modèle) : portable sans RETURNING
+        evaluation_ids = db.session.execute(
+            select(Evaluation.id).where(Evaluation.employe_id.in_(lot), Evaluation.annee == annee,
+                                        Evaluation.template_id == template.id)
+        ).scalars().all()
+        # render_nulls : descriptions vides écrites en NULL, sans scinder le lot par jeu de colonnes
+        db.session.execute(insert(CritereEvaluation).execution_options(render_nulls=True), [
+            dict(critere, evaluation_id=evaluation_id, created_at=maintenant)
+            for evaluation_id in evaluation_ids for critere in criteres
+        ])
+        bilan['evaluations'] += len(evaluation_ids)
+        bilan['criteres'] += len(evaluation_ids) * len(criteres)
+    return bilan
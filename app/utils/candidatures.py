@@ -0,0 +1,159 @@
+"""
+Réception des candidatures publiques
+
+Les fichiers sont recopiés par morceaux vers static/uploads/candidatures en calculant leur
+empreinte SHA-256 et en refusant ceux qui dépassent la taille maximale : un contenu déjà
+reçu (même CV envoyé pour plusieurs offres) n'est stocké qu'une fois. Une seule candidature
+est acceptée par email et par offre. L'extraction du texte des PDF est différée : les
+nouveaux fichiers restent en_attente jusqu'au passage de la commande extract-cv-texts.
+"""
+
+from app import db
+from app.models import Candidat, FichierCandidature
+from flask import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+from hashlib import sha256
+import os
+import tempfile
+
+TAILLE_MORCEAU = 64 * 1024
+SIGNATURE_PDF = b'%PDF-'
+DOSSIER_CANDIDATURES = 'candidatures'
+
+
+def repertoire_uploads():
+    return os.path.join(current_app.root_path, 'static', 'uploads')
+
+
+def taille_max_fichier():
+    return current_app.config.get('CANDIDATURE_TAILLE_MAX_MO', 5) * 1024 * 1024
+
+
+def normaliser_email(email):
+    return (email or '').strip().lower()
+
+
+def candidature_existante(offre_id, email):
+    """Candidature déjà déposée pour cette offre avec cet email (index offre / email)"""
+    return db.session.execute(
+        select(Candidat.id).where(Candidat.offre_emploi_id == offre_id,
+                                  Candidat.email == normaliser_email(email)).limit(1)
+    ).scalar() is not None
+
+
+def enregistrer_fichier(fichier, libelle):
+    """Copie un fichier déposé sur le disque par morceaux et retourne son FichierCandidature.
+
+    Lève ValueError si le fichier est vide, n'est pas un PDF ou dépasse la taille maximale.
+    """
+    taille_max = taille_max_fichier()
+    dossier_temp = os.path.join(repertoire_uploads(), DOSSIER_CANDIDATURES)
+    os.makedirs(dossier_temp, exist_ok=True)
+
+    empreinte = sha256()
+    taille = 0
+    descripteur, temporaire = tempfile.mkstemp(dir=dossier_temp, suffix='.tmp')
+    try:
+        with os.fdopen(descripteur, 'wb') as sortie:
+            while True:
+                morceau = fichier.stream.read(TAILLE_MORCEAU)
+                if not morceau:
+                    break
+                if taille == 0 and not morceau.startswith(SIGNATURE_PDF):
+                    raise ValueError(f"{libelle} : le fichier n'est pas un PDF valide")
+                taille += len(morceau)
+                if taille > taille_max:
+                    raise ValueError(f"{libelle} : le fichier dépasse {taille_max // (1024 * 1024)} Mo")
+                empreinte.update(morceau)
+                sortie.write(morceau)
+        if taille == 0:
+            raise ValueError(f"{libelle} : le fichier est vide")
+
+        empreinte = empreinte.hexdigest()
+        existant = FichierCandidature.query.filter_by(empreinte=empreinte).first()
+        if existant is not None:
+            os.remove(temporaire)
+            return existant
+
+        chemin = f"{DOSSIER_CANDIDATURES}/{empreinte[:2]}/{empreinte}.pdf"
+        destination = os.path.join(repertoire_uploads(), *chemin.split('/'))
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        # Même contenu, même nom : remplacer un fichier déposé en parallèle est sans effet
+        os.replace(temporaire, destination)
+    except Exception:
+        if os.path.exists(temporaire):
+            os.remove(temporaire)
+        raise
+
+    nouveau = FichierCandidature(empreinte=empreinte, chemin=chemin, taille=taille)
+    try:
+        with db.session.begin_nested():
+            db.session.add(nouveau)
+    except IntegrityError:
+        # Même fichier enregistré entre-temps par une autre requête
+        return FichierCandidature.query.filter_by(empreinte=empreinte).one()
+    return nouveau
+
+
+def deposer_candidature(offre, nom, email, telephone, cv, lettre):
+    """Crée la candidature (sans commit). Lève ValueError si elle est refusée."""
+    email = normaliser_email(email)
+    if candidature_existante(offre.id, email):
+        raise ValueError("Une candidature a déjà été envoyée pour cette offre avec cette adresse email.")
+
+    fichier_cv = enregistrer_fichier(cv, 'CV')
+    fichier_lettre = enregistrer_fichier(lettre, 'Lettre de motivation')
+
+    candidat = Candidat(
+        nom=nom,
+        email=email,
+        telephone=telephone,
+        cv=fichier_cv.chemin,
+        lettre_motivation=fichier_lettre.chemin,
+        cv_fichier=fichier_cv,
+        lettre_fichier=fichier_lettre,
+        date_soumission=datetime.utcnow().date(),
+        statut='en cours d\'examen',
+        offre_emploi_id=offre.id
+    )
+    db.session.add(candidat)
+    return candidat
+
+
+# ============= EXTRACTION DIFFEREE =============
+
+def extraire_texte_pdf(chemin):
+    """Texte brut d'un PDF (pypdf n'est nécessaire qu'au worker d'extraction)"""
+    from pypdf import PdfReader
+
+    lecteur = PdfReader(chemin)
+    return '\n'.join(page.extract_text() or '' for page in lecteur.pages).strip()
+
+
+def extraire_textes_en_attente(limite=100):
+    """Extrait le texte des fichiers en attente, les plus anciens d'abord, un commit par fichier"""
+    ids = db.session.execute(
+        select(FichierCandidature.id)
+        .where(FichierCandidature.statut_extraction == 'en_attente')
+        .order_by(FichierCandidature.id)
+        .limit(limite)
+    ).scalars().all()
+
+    bilan = {'terminee': 0, 'erreur': 0}
+    for fichier_id in ids:
+        fichier = db.session.get(FichierCandidature, fichier_id)
+        try:
+            fichier.texte = extraire_texte_pdf(os.path.join(repertoire_uploads(), *fichier.chemin.split('/')))
+            fichier.statut_extraction = 'terminee'
+            fichier.erreur_extraction = None
+        except ImportError:
+            raise
+        except Exception as e:
+            fichier.statut_extraction = 'erreur'
+            fichier.erreur_extraction = str(e)[:255]
+        fichier.date_extraction = datetime.utcnow()
+        db.session.commit()
+        bilan[fichier.statut_extraction] += 1
+    return bilan
@@ -3,12 +3,25 @@ Commandes CLI pour les tâches automatisées
 """
 
 import click
+from flask import current_app
 from flask.cli import with_appcontext
 from app.utils.email_service import email_service
-from app.models import NotificationPresence, Conge, BulletinPaie, Employee
+from app.utils.statistiques_presence import reconstruire_statistiques_presence
+from app.utils.heures_hebdomadaires import reconstruire_heures_semaine
+from app.utils.detection_absences import detecter_absences_jour
+from app.utils.boite_notifications import recalculer_non_lues, archiver_notifications
+from app.utils.archivage_presences import mois_a_archiver, archiver_mois
+from app.utils.instantanes_analytiques import exporter_instantane, purger_instantanes
+from app.utils.bulletins_pdf import generer_bulletins_lot
+from app.utils.candidatures import extraire_textes_en_attente
+from app.utils.recherche_candidats import synchroniser_index, reconstruire_index
+from app.utils.scores_evaluation import recalculer_scores
+from app.utils.campagnes_evaluation import lancer_campagne
+from app.models import NotificationPresence, Conge, BulletinPaie, Employee, TemplateEvaluation, Utilisateur
 from app import db
 from datetime import date, timedelta
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -85,6 +98,8 @@ def cleanup_old_notifications():
         count = len(old_notifications)
         for notification in old_notifications:
             db.session.delete(notification)
+        db.session.flush()
+        recalculer_non_lues()
         
         db.session.commit()
         click.echo(f"Supprimé {count} anciennes notifications")
@@ -92,8 +107,236 @@ def cleanup_old_notifications():
     except Exception as e:
         click.echo(f"Erreur lors du nettoyage: {e}")
 
+@click.command()
+@click.option('--debut', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help="Date de début (AAAA-MM-JJ)")
+@click.option('--fin', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help="Date de fin (AAAA-MM-JJ)")
+@with_appcontext
+def rebuild_attendance_stats(debut, fin):
+    """Reconstruit les agrégats journaliers de présence par département"""
+    try:
+        nb_lignes = reconstruire_statistiques_presence(
+            debut.date() if debut else None,
+            fin.date() if fin else None
+        )
+        db.session.commit()
+        click.echo(f"{nb_lignes} agrégats journaliers reconstruits")
+        
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"Erreur lors de la reconstruction des statistiques: {e}")
+
+@click.command()
+@click.option('--debut', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help="Date de début (AAAA-MM-JJ)")
+@click.option('--fin', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help="Date de fin (AAAA-MM-JJ)")
+@with_appcontext
+def rebuild_weekly_hours(debut, fin):
+    """Reconstruit les cumuls hebdomadaires d'heures et d'heures supplémentaires"""
+    try:
+        nb_semaines = reconstruire_heures_semaine(
+            debut.date() if debut else None,
+            fin.date() if fin else None
+        )
+        db.session.commit()
+        click.echo(f"{nb_semaines} cumuls hebdomadaires reconstruits")
+        
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"Erreur lors de la reconstruction des cumuls hebdomadaires: {e}")
+
+@click.command()
+@click.option('--date', 'date_travail', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+              help="Jour à traiter (AAAA-MM-JJ), aujourd'hui par défaut")
+@click.option('--inclure-weekend', is_flag=True, help="Traiter aussi le samedi et le dimanche")
+@with_appcontext
+def detect_absences(date_travail, inclure_weekend):
+    """Détecte en fin de journée les employés actifs sans pointage ni congé"""
+    try:
+        jour = date_travail.date() if date_travail else date.today()
+        resultat = detecter_absences_jour(jour, inclure_weekend=inclure_weekend)
+        db.session.commit()
+        click.echo(f"{resultat['absents']} absences enregistrées et "
+                   f"{resultat['notifications']} notifications créées pour le {jour.strftime('%d/%m/%Y')}")
+        
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"Erreur lors de la détection des absences: {e}")
+
+@click.command()
+@click.option('--jours', type=int, default=90, show_default=True,
+              help="Archiver les notifications lues ou traitées plus anciennes que ce nombre de jours")
+@click.option('--taille-lot', type=int, default=500, show_default=True, help="Nombre de notifications par lot")
+@with_appcontext
+def archive_notifications(jours, taille_lot):
+    """Déplace les anciennes notifications lues ou traitées vers la table d'archive"""
+    try:
+        nb_archivees = archiver_notifications(date.today() - timedelta(days=jours), taille_lot=taille_lot)
+        click.echo(f"{nb_archivees} notifications archivées")
+        
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"Erreur lors de l'archivage des notifications: {e}")
+
+@click.command()
+@click.option('--mois', 'mois_cible', type=click.DateTime(formats=['%Y-%m']), default=None,
+              help="Mois à archiver (AAAA-MM), tous les mois clos par défaut")
+@click.option('--simulation', is_flag=True, help="Lister les mois archivables sans rien déplacer")
+@with_appcontext
+def archive_presences(mois_cible, simulation):
+    """Déplace les pointages et heures des mois clos vers les tables d'archive annuelles"""
+    try:
+        mois_liste = [(mois_cible.year, mois_cible.month)] if mois_cible else mois_a_archiver()
+        if not mois_liste:
+            click.echo("Aucun mois à archiver")
+            return
+        
+        for annee, mois in mois_liste:
+            if simulation:
+                click.echo(f"{mois:02d}/{annee} archivable")
+                continue
+            # Un mois par transaction
+            bilan = archiver_mois(annee, mois)
+            db.session.commit()
+            click.echo(f"{mois:02d}/{annee} : {bilan['pointage']} pointages et "
+                       f"{bilan['heures_travail']} journées archivés")
+        
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"Erreur lors de l'archivage des présences: {e}")
+
+@click.command()
+@with_appcontext
+def export_analytics_snapshot():
+    """Exporte l'instantané analytique Parquet (à planifier chaque nuit)"""
+    try:
+        manifeste = exporter_instantane()
+        for nom, nb_lignes in manifeste['jeux'].items():
+            click.echo(f"{nom} : {nb_lignes} lignes")
+        supprimes = purger_instantanes()
+        click.echo(f"Instantané du {manifeste['date_generation']} publié, {len(supprimes)} ancien(s) supprimé(s)")
+        
+    except Exception as e:
+        click.echo(f"Erreur lors de l'export de l'instantané analytique: {e}")
+
+@click.command()
+@click.option('--mois', 'mois_cible', type=click.DateTime(formats=['%Y-%m']), required=True,
+              help="Période des bulletins (AAAA-MM)")
+@click.option('--sortie', type=click.Path(dir_okay=False), default=None,
+              help="Archive ZIP à écrire (bulletins_AAAA_MM.zip par défaut)")
+@click.option('--processus', type=int, default=None, help="Processus de rendu (un par cœur par défaut)")
+@click.option('--statut', 'statuts', multiple=True, help="Statut des bulletins à inclure (répétable)")
+@with_appcontext
+def generate_payslips(mois_cible, sortie, processus, statuts):
+    """Génère les bulletins PDF d'une période dans une archive ZIP"""
+    try:
+        sortie = sortie or f"bulletins_{mois_cible.year}_{mois_cible.month:02d}.zip"
+        metriques = generer_bulletins_lot(
+            mois_cible.month, mois_cible.year, sortie,
+            processus=processus or current_app.config.get('BULLETINS_PDF_PROCESSUS'),
+            statuts=list(statuts),
+            entreprise=current_app.config.get('ENTREPRISE_NOM', 'RH Manager')
+        )
+        click.echo(f"{metriques['bulletins']} bulletins écrits dans {sortie} "
+                   f"({metriques['processus']} processus)")
+        click.echo(f"Chargement {metriques['duree_chargement']:.2f}s, rendu {metriques['duree_rendu']:.2f}s, "
+                   f"{metriques['bulletins_par_seconde']:.1f} bulletins/s")
+        
+    except Exception as e:
+        click.echo(f"Erreur lors de la génération des bulletins: {e}")
+
+@click.command()
+@click.option('--limite', type=int, default=100, show_default=True, help="Fichiers traités par passage")
+@click.option('--boucle', type=int, default=0,
+              help="Secondes d'attente entre deux passages (0 : un seul passage)")
+@with_appcontext
+def extract_cv_texts(limite, boucle):
+    """Extrait le texte des CV et lettres déposés avec les candidatures (worker d'arrière-plan)"""
+    try:
+        while True:
+            bilan = extraire_textes_en_attente(limite=limite)
+            # Nouvelles candidatures et CV extraits ajoutés à l'index de recherche
+            indexes = synchroniser_index()
+            if bilan['terminee'] or bilan['erreur'] or indexes:
+                click.echo(f"{bilan['terminee']} fichiers extraits, {bilan['erreur']} en erreur, "
+                           f"{indexes} candidats indexés")
+            if not boucle:
+                break
+            # File vide : attendre ; sinon enchaîner le lot suivant
+            if bilan['terminee'] + bilan['erreur'] < limite:
+                time.sleep(boucle)
+        
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"Erreur lors de l'extraction des textes: {e}")
+
+@click.command()
+@click.option('--reconstruire', is_flag=True, help="Vider l'index et réindexer toutes les candidatures")
+@with_appcontext
+def index_candidates(reconstruire):
+    """Met à jour l'index de recherche plein texte des candidats"""
+    try:
+        nombre = reconstruire_index() if reconstruire else synchroniser_index()
+        click.echo(f"{nombre} candidats indexés")
+        
+    except Exception as e:
+        click.echo(f"Erreur lors de l'indexation des candidats: {e}")
+
+@click.command()
+@click.option('--annee', type=int, default=None, help="Année des évaluations (toutes par défaut)")
+@click.option('--template', 'template_id', type=int, default=None, help="Modèle d'évaluation (après un changement de pondération)")
+@with_appcontext
+def recompute_evaluation_scores(annee, template_id):
+    """Recalcule les scores globaux et notes finales des évaluations à partir de leurs critères"""
+    try:
+        nombre = recalculer_scores(annee=annee, template_id=template_id)
+        db.session.commit()
+        click.echo(f"{nombre} évaluations recalculées")
+        
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"Erreur lors du recalcul des scores: {e}")
+
+@click.command()
+@click.option('--template', 'template_id', type=int, required=True, help="Modèle d'évaluation")
+@click.option('--annee', type=int, required=True, help="Année de la campagne")
+@click.option('--evaluateur', 'evaluateur_id', type=int, required=True, help="Utilisateur évaluateur")
+@click.option('--departement', default=None, help="Département ciblé (tous par défaut)")
+@click.option('--statut', default='Actif', show_default=True, help="Statut des employés ciblés")
+@click.option('--periode', default=None, help="Libellé de la période (type et année du modèle par défaut)")
+@with_appcontext
+def launch_evaluation_campaign(template_id, annee, evaluateur_id, departement, statut, periode):
+    """Crée les évaluations d'un modèle pour tous les employés ciblés"""
+    try:
+        template = db.session.get(TemplateEvaluation, template_id)
+        if template is None:
+            click.echo(f"Modèle d'évaluation {template_id} introuvable")
+            return
+        if db.session.get(Utilisateur, evaluateur_id) is None:
+            click.echo(f"Utilisateur {evaluateur_id} introuvable")
+            return
+        
+        bilan = lancer_campagne(template, annee, evaluateur_id, departement=departement, statut=statut,
+                                periode=periode, created_by=evaluateur_id)
+        db.session.commit()
+        click.echo(f"{bilan['evaluations']} évaluations et {bilan['criteres']} critères créés, "
+                   f"{bilan['employes_ignores']} employés déjà évalués")
+        
+    except Exception as e:
+        db.session.rollback()
+        click.echo(f"Erreur lors du lancement de la campagne: {e}")
+
 def register_commands(app):
     """Enregistre les commandes CLI"""
     app.cli.add_command(send_daily_summary)
     app.cli.add_command(send_overdue_reminders)
     app.cli.add_command(cleanup_old_notifications)
+    app.cli.add_command(rebuild_attendance_stats)
+    app.cli.add_command(rebuild_weekly_hours)
+    app.cli.add_command(detect_absences)
+    app.cli.add_command(archive_notifications)
+    app.cli.add_command(archive_presences)
+    app.cli.add_command(export_analytics_snapshot)
+    app.cli.add_command(generate_payslips)
+    app.cli.add_command(extract_cv_texts)
+    app.cli.add_command(index_candidates)
+    app.cli.add_command(recompute_evaluation_scores)
+    app.cli.add_command(launch_evaluation_campaign)
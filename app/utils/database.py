@@ -0,0 +1,139 @@
+"""
+Réglages du moteur de base de données
+"""
+
+from functools import wraps
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def pragmas_sqlite(config):
+    """Construit la liste des PRAGMA SQLite à partir de la configuration"""
+    pragmas = [
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE')),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS')),
+        ('busy_timeout', config.get('SQLITE_BUSY_TIMEOUT')),
+        ('mmap_size', config.get('SQLITE_MMAP_SIZE')),
+    ]
+    return [(nom, valeur) for nom, valeur in pragmas if valeur not in (None, '')]
+
+
+def activer_pragmas_sqlite(engine, config):
+    """Applique WAL, synchronous, busy_timeout et mmap_size à chaque nouvelle connexion SQLite"""
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    _ecouter_connexions_sqlite(engine, pragmas_sqlite(config))
+    return True
+
+
+def _ecouter_connexions_sqlite(engine, pragmas):
+    """Exécute les PRAGMA donnés à l'ouverture de chaque connexion du moteur"""
+    @event.listens_for(engine, 'connect')
+    def _appliquer_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for nom, valeur in pragmas:
+                cursor.execute(f"PRAGMA {nom}={valeur}")
+        finally:
+            cursor.close()
+
+
+def configurer_base_de_donnees(app, db):
+    """Installe les réglages de connexion sur tous les moteurs de l'application"""
+    with app.app_context():
+        for bind, engine in db.engines.items():
+            if activer_pragmas_sqlite(engine, app.config):
+                logger.info("PRAGMA SQLite activés pour le moteur %s", bind or 'principal')
+    configurer_replica(app, db)
+
+
+# ============= ROUTAGE DES LECTURES VERS LA RÉPLIQUE =============
+
+def url_sqlite_lecture_seule(engine):
+    """URL d'une connexion SQLite en lecture seule sur le même fichier que le moteur principal"""
+    chemin = engine.url.database
+    if engine.dialect.name != 'sqlite' or not chemin or chemin == ':memory:':
+        return None
+    return f"sqlite:///file:{chemin}?mode=ro&uri=true"
+
+
+def configurer_replica(app, db):
+    """Crée le moteur de lecture (réplique ou SQLite en lecture seule) si configuré"""
+    uri = app.config.get('SQLALCHEMY_REPLICA_URI')
+    if not uri and app.config.get('SQLITE_LECTURE_SEULE'):
+        with app.app_context():
+            uri = url_sqlite_lecture_seule(db.engine)
+    if not uri:
+        return None
+
+    options = dict(app.config.get('SQLALCHEMY_REPLICA_ENGINE_OPTIONS') or {})
+    engine = create_engine(uri, **options)
+    if engine.dialect.name == 'sqlite':
+        # Le mode WAL est porté par le fichier : la connexion de lecture n'écrit aucun PRAGMA persistant
+        pragmas = [('query_only', 1)] + [(nom, valeur) for nom, valeur in pragmas_sqlite(app.config)
+                                         if nom in ('busy_timeout', 'mmap_size')]
+        _ecouter_connexions_sqlite(engine, pragmas)
+
+    app.extensions['replica_lecture'] = {
+        'engine': engine,
+        'disponible': True,
+        'verifie_le': 0.0,
+        'intervalle': app.config.get('REPLICA_HEALTHCHECK_INTERVAL', 30),
+    }
+    logger.info("Moteur de lecture configuré : %s", engine.url.render_as_string(hide_password=True))
+    return engine
+
+
+def moteur_lecture():
+    """Retourne le moteur de lecture s'il est disponible, sinon None (repli sur le principal)"""
+    if not has_app_context():
+        return None
+    replica = current_app.extensions.get('replica_lecture')
+    if replica is None:
+        return None
+
+    maintenant = time.monotonic()
+    if maintenant - replica['verifie_le'] >= replica['intervalle']:
+        replica['verifie_le'] = maintenant
+        try:
+            with replica['engine'].connect() as connection:
+                connection.exec_driver_sql('SELECT 1')
+            if not replica['disponible']:
+                logger.info("Réplique de lecture de nouveau disponible")
+            replica['disponible'] = True
+        except Exception as e:
+            if replica['disponible']:
+                logger.warning(f"Réplique de lecture indisponible, repli sur la base principale : {e}")
+            replica['disponible'] = False
+
+    return replica['engine'] if replica['disponible'] else None
+
+
+def lecture_replica(f):
+    """Décorateur : exécute les requêtes de lecture de la vue sur la réplique"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        precedent = g.get('lecture_replica', False)
+        g.lecture_replica = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            g.lecture_replica = precedent
+    return decorated_function
+
+
+class SessionRoutage(Session):
+    """Session qui envoie les lectures des vues marquées @lecture_replica vers la réplique"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('lecture_replica'):
+            engine = moteur_lecture()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
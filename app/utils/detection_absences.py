@@ -0,0 +1,99 @@
+"""
+Détection de fin de journée des employés absents (aucun pointage, pas en congé)
+"""
+
+from app import db
+from app.models import Employee, Pointage, Conge, Absence, HeuresTravail, ParametrePresence
+from app.utils.statistiques_presence import actualiser_statistiques_presence, statistiques_presence_periode
+from app.utils.notifications_presence import creer_notifications_presence
+from app.utils.flux_presences import publier_evenement
+from app.utils.archivage_presences import mois_archive
+from sqlalchemy import insert, or_
+from datetime import datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def requete_employes_absents(date_travail):
+    """Employés actifs sans pointage valide, sans congé approuvé et sans heures déjà calculées ce jour"""
+    a_pointe = db.session.query(Pointage.id).filter(
+        Pointage.employe_id == Employee.id,
+        Pointage.date_pointage == date_travail,
+        Pointage.valide == True
+    ).exists()
+    en_conge = db.session.query(Conge.id).filter(
+        Conge.employe_id == Employee.id,
+        Conge.statut == 'Approuvé',
+        Conge.date_debut <= date_travail,
+        Conge.date_fin >= date_travail
+    ).exists()
+    deja_calcule = db.session.query(HeuresTravail.id).filter(
+        HeuresTravail.employe_id == Employee.id,
+        HeuresTravail.date_travail == date_travail
+    ).exists()
+    absence_declaree = db.session.query(Absence.id).filter(
+        Absence.employe_id == Employee.id,
+        Absence.date_absence == date_travail
+    ).exists()
+
+    return db.session.query(Employee.id, absence_declaree).filter(
+        Employee.statut == 'Actif',
+        or_(Employee.date_embauche.is_(None), Employee.date_embauche <= date_travail),
+        ~a_pointe,
+        ~en_conge,
+        ~deja_calcule
+    )
+
+
+def detecter_absences_jour(date_travail, inclure_weekend=False):
+    """Enregistre en masse les absences du jour et leurs notifications ; relançable sans doublon"""
+    resultat = {'date': date_travail, 'absents': 0, 'notifications': 0}
+    if date_travail.weekday() >= 5 and not inclure_weekend:
+        return resultat
+    if mois_archive(date_travail):
+        return resultat
+
+    absents = requete_employes_absents(date_travail).all()
+    if not absents:
+        return resultat
+
+    maintenant = datetime.utcnow()
+    db.session.execute(insert(HeuresTravail), [
+        {
+            'employe_id': employe_id,
+            'date_travail': date_travail,
+            'heures_travaillees': 0.0,
+            'heures_normales': 0.0,
+            'heures_supplementaires': 0.0,
+            'statut': 'absent',
+            'calcule_automatiquement': True,
+            'date_creation': maintenant,
+            'date_modification': maintenant,
+        }
+        for employe_id, absence_declaree in absents
+    ])
+    resultat['absents'] = len(absents)
+
+    # Notifications uniquement pour les absences non déclarées
+    params = ParametrePresence.query.first()
+    if params is None or params.notifier_absence:
+        resultat['notifications'] = creer_notifications_presence(
+            (employe_id, 'absence', date_travail, {})
+            for employe_id, absence_declaree in absents
+            if not absence_declaree
+        )
+
+    actualiser_statistiques_presence(date_travail)
+    faits = statistiques_presence_periode(date_travail, date_travail)
+    publier_evenement('statistiques', {
+        'date': date_travail.isoformat(),
+        'stats_jour': {
+            'presents': faits['nb_presents'],
+            'absents': faits['nb_absents'],
+            'retards': faits['nb_retards']
+        }
+    })
+    logger.info("Absences du %s : %s employés, %s notifications",
+                date_travail, resultat['absents'], resultat['notifications'])
+    return resultat
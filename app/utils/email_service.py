@@ -8,6 +8,7 @@ from flask_mail import Message
 from app import db, mail
 from app.models import Employee, Utilisateur, NotificationPresence, Conge, Absence, BulletinPaie
 from datetime import datetime, date, timedelta
+from sqlalchemy.orm import joinedload
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -172,6 +173,57 @@ class EmailNotificationService:
         subject = f"Congé {decision.lower()} - {demande.employe.nom}"
         return self.send_email(subject, recipients, html_body)
     
+    def notify_leave_decisions(self, demande_conge_ids, decision):
+        """Notifie en un seul lot les décisions sur plusieurs demandes de congé"""
+        demandes = Conge.query.options(joinedload(Conge.employe)).filter(
+            Conge.id.in_(demande_conge_ids)
+        ).all()
+        
+        template_key = 'conge_approuve' if decision == 'Approuvé' else 'conge_rejete'
+        
+        messages = []
+        for demande in demandes:
+            if not demande.employe or not demande.employe.email:
+                continue
+            
+            context = {
+                'demande': demande,
+                'employee': demande.employe,
+                'decision': decision,
+                'company_name': 'RH Manager'
+            }
+            
+            html_body = self.generate_html_content(template_key, context)
+            messages.append(Message(
+                subject=f"Congé {decision.lower()} - {demande.employe.nom}",
+                recipients=[demande.employe.email],
+                html=html_body,
+                body=html_body
+            ))
+        
+        return self.send_bulk_email(messages)
+    
+    def send_async_bulk_email(self, app, messages):
+        """Envoie un lot d'emails sur une seule connexion SMTP"""
+        with app.app_context():
+            try:
+                with mail.connect() as connection:
+                    for msg in messages:
+                        connection.send(msg)
+                logger.info(f"{len(messages)} emails envoyés en lot")
+            except Exception as e:
+                logger.error(f"Erreur envoi emails groupés: {e}")
+    
+    def send_bulk_email(self, messages):
+        """Envoie un lot de messages dans un seul thread d'arrière-plan"""
+        if not messages:
+            return False
+        
+        thread = Thread(target=self.send_async_bulk_email, args=(current_app._get_current_object(), messages))
+        thread.start()
+        
+        return True
+    
     def notify_payslip_available(self, bulletin_paie_id):
         """Notifie qu'un bulletin de paie est disponible"""
         bulletin = BulletinPaie.query.get(bulletin_paie_id)
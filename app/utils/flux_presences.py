@@ -0,0 +1,131 @@
+"""
+Diffusion en direct des événements de présence (Server-Sent Events)
+
+Les écritures (pointages, heures, notifications) déposent leurs événements dans la session ;
+ils ne sont diffusés qu'après le commit, une seule fois pour tous les tableaux de bord connectés.
+Le bus est propre au processus : chaque worker diffuse les écritures qu'il a lui-même validées.
+"""
+
+from app import db
+from app.utils.database import SessionRoutage
+from sqlalchemy import event
+from collections import deque, namedtuple
+import threading
+import queue
+import json
+import time
+
+TAILLE_HISTORIQUE = 500   # Événements conservés pour la reprise via Last-Event-ID
+TAILLE_FILE_ABONNE = 200  # Au-delà, l'abonné trop lent est déconnecté et doit se resynchroniser
+DELAI_RECONNEXION_MS = 3000
+
+Evenement = namedtuple('Evenement', ['id', 'type', 'donnees'])
+
+
+class Abonnement:
+    """File d'événements d'un tableau de bord connecté"""
+
+    def __init__(self):
+        self.file = queue.Queue(maxsize=TAILLE_FILE_ABONNE)
+        self.rattrapage = []
+        self.resynchroniser = False
+        self.deborde = False
+
+
+class DiffuseurPresences:
+    """Pub/sub en mémoire avec historique borné pour la reprise après reconnexion"""
+
+    def __init__(self, taille_historique=TAILLE_HISTORIQUE):
+        self._verrou = threading.Lock()
+        self._abonnes = set()
+        self._historique = deque(maxlen=taille_historique)
+        # Identifiants croissants d'un redémarrage à l'autre : un Last-Event-ID antérieur
+        # au démarrage tombe hors de l'historique et déclenche une resynchronisation
+        self._dernier_id = int(time.time() * 1000)
+
+    @property
+    def nb_abonnes(self):
+        return len(self._abonnes)
+
+    def publier(self, type_evenement, donnees):
+        """Diffuse un événement à tous les abonnés"""
+        with self._verrou:
+            self._dernier_id += 1
+            evenement = Evenement(self._dernier_id, type_evenement, json.dumps(donnees, default=str))
+            self._historique.append(evenement)
+            abonnes = list(self._abonnes)
+
+        for abonnement in abonnes:
+            try:
+                abonnement.file.put_nowait(evenement)
+            except queue.Full:
+                abonnement.deborde = True
+                self.desabonner(abonnement)
+        return evenement.id
+
+    def abonner(self, dernier_id=None):
+        """Enregistre un abonné ; rejoue les événements postérieurs à dernier_id s'ils sont encore en mémoire"""
+        abonnement = Abonnement()
+        with self._verrou:
+            if dernier_id is not None:
+                premier_id = self._historique[0].id if self._historique else self._dernier_id + 1
+                if dernier_id < premier_id - 1 or dernier_id > self._dernier_id:
+                    abonnement.resynchroniser = True
+                else:
+                    abonnement.rattrapage = [e for e in self._historique if e.id > dernier_id]
+            self._abonnes.add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self._verrou:
+            self._abonnes.discard(abonnement)
+
+    def flux(self, abonnement, intervalle_heartbeat=15):
+        """Générateur SSE : rattrapage, puis événements en direct et commentaires de maintien"""
+        try:
+            yield f"retry: {DELAI_RECONNEXION_MS}\n\n"
+            if abonnement.resynchroniser:
+                yield formater_evenement(Evenement(self._dernier_id, 'resynchroniser', '{}'))
+            for evenement in abonnement.rattrapage:
+                yield formater_evenement(evenement)
+
+            while True:
+                try:
+                    evenement = abonnement.file.get(timeout=intervalle_heartbeat)
+                except queue.Empty:
+                    if abonnement.deborde:
+                        yield formater_evenement(Evenement(self._dernier_id, 'resynchroniser', '{}'))
+                        return
+                    yield ": heartbeat\n\n"
+                    continue
+                yield formater_evenement(evenement)
+        finally:
+            self.desabonner(abonnement)
+
+
+def formater_evenement(evenement):
+    return f"id: {evenement.id}\nevent: {evenement.type}\ndata: {evenement.donnees}\n\n"
+
+
+diffuseur_presences = DiffuseurPresences()
+
+
+# ============= PUBLICATION APRES COMMIT =============
+
+CLE_EVENEMENTS = 'evenements_presence'
+
+
+def publier_evenement(type_evenement, donnees):
+    """Prépare un événement diffusé seulement si la transaction en cours est validée"""
+    db.session.info.setdefault(CLE_EVENEMENTS, []).append((type_evenement, donnees))
+
+
+@event.listens_for(SessionRoutage, 'after_commit')
+def _diffuser_apres_commit(session):
+    for type_evenement, donnees in session.info.pop(CLE_EVENEMENTS, []):
+        diffuseur_presences.publier(type_evenement, donnees)
+
+
+@event.listens_for(SessionRoutage, 'after_soft_rollback')
+def _abandonner_apres_rollback(session, transaction):
+    session.info.pop(CLE_EVENEMENTS, None)
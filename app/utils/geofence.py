@@ -0,0 +1,262 @@
+"""
+Validation géographique des pointages GPS (sites de travail, index spatial en grille)
+"""
+
+from app.models import Site, ParametrePresence
+from app.utils.database import SessionRoutage
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from collections import defaultdict
+import numpy as np
+import threading
+import time
+
+RAYON_TERRE_METRES = 6371008.8
+METRES_PAR_DEGRE = 111320.0
+TAILLE_CELLULE = 0.01       # degrés (~1,1 km en latitude)
+CELLULES_MAX_PAR_SITE = 10000  # Au-delà, le site est testé pour tous les points
+MOTIF_HORS_ZONE = 'Pointage hors zone géographique'
+
+
+def distances_haversine(lat1, lon1, lat2, lon2):
+    """Distances orthodromiques en mètres (tableaux NumPy diffusables, degrés)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=float)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE_METRES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def points_dans_polygone(latitudes, longitudes, polygone):
+    """Test pair-impair vectorisé : quels points sont dans le polygone [(lat, lon), ...]"""
+    y = np.asarray(latitudes, dtype=float)[:, None]
+    x = np.asarray(longitudes, dtype=float)[:, None]
+    yi, xi = polygone[:, 0], polygone[:, 1]
+    yj, xj = np.roll(yi, 1), np.roll(xi, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        croise = ((yi > y) != (yj > y)) & (x < (xj - xi) * (y - yi) / (yj - yi) + xi)
+    return np.count_nonzero(croise, axis=1) % 2 == 1
+
+
+class IndexSites:
+    """Sites actifs indexés par cellule de grille ; recherche d'appartenance sans accès base"""
+
+    def __init__(self, sites=(), rayon_defaut=100, actif=True, taille_cellule=TAILLE_CELLULE):
+        self.taille_cellule = taille_cellule
+        self.cellules = defaultdict(list)
+        self.globaux = []
+        self.sites = []
+
+        for site in sites:
+            polygone = np.asarray(site.polygone, dtype=float) if site.polygone else None
+            if polygone is not None:
+                lat_min, lon_min = polygone.min(axis=0)
+                lat_max, lon_max = polygone.max(axis=0)
+                rayon = None
+            elif site.latitude is not None and site.longitude is not None:
+                rayon = float(site.rayon_metres or rayon_defaut)
+                delta_lat = rayon / METRES_PAR_DEGRE
+                delta_lon = rayon / (METRES_PAR_DEGRE * max(np.cos(np.radians(site.latitude)), 1e-6))
+                lat_min, lat_max = site.latitude - delta_lat, site.latitude + delta_lat
+                lon_min, lon_max = site.longitude - delta_lon, site.longitude + delta_lon
+            else:
+                continue
+
+            indice = len(self.sites)
+            self.sites.append((site.id, site.latitude, site.longitude, rayon, polygone))
+
+            i_min, j_min = self._cle(lat_min, lon_min)
+            i_max, j_max = self._cle(lat_max, lon_max)
+            if (i_max - i_min + 1) * (j_max - j_min + 1) > CELLULES_MAX_PAR_SITE:
+                self.globaux.append(indice)
+                continue
+            for i in range(i_min, i_max + 1):
+                for j in range(j_min, j_max + 1):
+                    self.cellules[(i, j)].append(indice)
+
+        # Sans site défini, la validation GPS ne peut rien rejeter
+        self.actif = actif and bool(self.sites)
+
+    def _cle(self, latitude, longitude):
+        return int(np.floor(latitude / self.taille_cellule)), int(np.floor(longitude / self.taille_cellule))
+
+    def localiser(self, latitudes, longitudes):
+        """Identifiant du site contenant chaque point (0 si hors zone), traité par cellule de grille"""
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        resultat = np.zeros(len(latitudes), dtype=np.int64)
+        if not len(latitudes):
+            return resultat
+
+        cellules_i = np.floor(latitudes / self.taille_cellule).astype(np.int64)
+        cellules_j = np.floor(longitudes / self.taille_cellule).astype(np.int64)
+        groupes = defaultdict(list)
+        for position, cle in enumerate(zip(cellules_i.tolist(), cellules_j.tolist())):
+            groupes[cle].append(position)
+
+        for cle, positions in groupes.items():
+            candidats = self.cellules.get(cle, []) + self.globaux
+            if not candidats:
+                continue
+            positions = np.asarray(positions)
+            lats, lons = latitudes[positions], longitudes[positions]
+            restants = np.ones(len(positions), dtype=bool)
+            for indice in candidats:
+                site_id, site_lat, site_lon, rayon, polygone = self.sites[indice]
+                if polygone is not None:
+                    dedans = points_dans_polygone(lats, lons, polygone)
+                else:
+                    dedans = distances_haversine(lats, lons, site_lat, site_lon) <= rayon
+                dedans &= restants
+                resultat[positions[dedans]] = site_id
+                restants &= ~dedans
+                if not restants.any():
+                    break
+        return resultat
+
+
+# ============= CACHE DE L'INDEX =============
+
+_verrou = threading.Lock()
+_cache = {'index': None, 'expire': 0.0}
+
+
+def index_sites():
+    """Index en mémoire des sites, reconstruit après expiration ou modification des sites/paramètres"""
+    maintenant = time.monotonic()
+    index = _cache['index']
+    if index is not None and maintenant < _cache['expire']:
+        return index
+
+    with _verrou:
+        if _cache['index'] is not None and maintenant < _cache['expire']:
+            return _cache['index']
+        params = ParametrePresence.query.first()
+        if params is None or not params.validation_gps:
+            index = IndexSites(actif=False)
+        else:
+            index = IndexSites(Site.query.filter_by(actif=True).all(), params.rayon_presence_metres or 100)
+        _cache['index'] = index
+        _cache['expire'] = maintenant + current_app.config.get('GEOFENCE_CACHE_SECONDES', 300)
+    return index
+
+
+def invalider_index_sites():
+    _cache['index'] = None
+
+
+def _marquer_modification(mapper, connection, cible):
+    session = object_session(cible)
+    if session is not None:
+        session.info['geofence_modifie'] = True
+
+
+for _modele in (Site, ParametrePresence):
+    for _evenement in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_modele, _evenement, _marquer_modification)
+
+
+@event.listens_for(SessionRoutage, 'after_commit')
+def _invalider_apres_commit(session):
+    if session.info.pop('geofence_modifie', False):
+        invalider_index_sites()
+
+
+# ============= VALIDATION DES POINTAGES =============
+
+def lire_coordonnee(valeur):
+    """Coordonnée en degrés ou None si absente ou invalide"""
+    try:
+        valeur = float(valeur)
+    except (TypeError, ValueError):
+        return None
+    return valeur if np.isfinite(valeur) else None
+
+
+def valider_positions(positions):
+    """(valide, site_id) pour chaque (latitude, longitude) ; valide si la validation GPS est désactivée,
+    si aucun site n'est défini ou si le pointage n'a pas de coordonnées"""
+    index = index_sites()
+    resultats = [(True, None)] * len(positions)
+    if not index.actif:
+        return resultats
+
+    a_tester = []
+    for position, (latitude, longitude) in enumerate(positions):
+        latitude, longitude = lire_coordonnee(latitude), lire_coordonnee(longitude)
+        if latitude is not None and longitude is not None:
+            a_tester.append((position, latitude, longitude))
+    if not a_tester:
+        return resultats
+
+    site_ids = index.localiser([p[1] for p in a_tester], [p[2] for p in a_tester])
+    for (position, _, _), site_id in zip(a_tester, site_ids.tolist()):
+        resultats[position] = (site_id != 0, site_id or None)
+    return resultats
+
+
+def valider_position(latitude, longitude):
+    """(valide, site_id) pour un pointage unique"""
+    return valider_positions([(latitude, longitude)])[0]
+
+
+def appliquer_geofence(pointage):
+    """Renseigne le site et invalide un pointage hors zone (sans commit)"""
+    valide, site_id = valider_position(pointage.latitude, pointage.longitude)
+    pointage.site_id = site_id
+    if not valide:
+        pointage.valide = False
+        pointage.commentaire = ((pointage.commentaire + ' ') if pointage.commentaire else '') + MOTIF_HORS_ZONE
+    return valide
+
+
+def _polygone_valide(polygone):
+    if not isinstance(polygone, list) or len(polygone) < 3:
+        return None
+    sommets = []
+    for sommet in polygone:
+        if not isinstance(sommet, (list, tuple)) or len(sommet) != 2:
+            return None
+        latitude, longitude = lire_coordonnee(sommet[0]), lire_coordonnee(sommet[1])
+        if latitude is None or longitude is None or abs(latitude) > 90 or abs(longitude) > 180:
+            return None
+        sommets.append([latitude, longitude])
+    return sommets
+
+
+def lire_definition_site(data, site=None):
+    """Champs d'un site à partir d'un JSON (création, ou mise à jour partielle si site est fourni) ; (champs, erreur)"""
+    champs = {}
+    if 'nom' in data or site is None:
+        nom = (data.get('nom') or '').strip()
+        if not nom:
+            return None, 'Nom du site obligatoire'
+        champs['nom'] = nom[:100]
+    if 'adresse' in data:
+        champs['adresse'] = (data.get('adresse') or '')[:200] or None
+    for champ, limite in (('latitude', 90), ('longitude', 180)):
+        if champ in data:
+            valeur = lire_coordonnee(data.get(champ)) if data.get(champ) is not None else None
+            if data.get(champ) is not None and (valeur is None or abs(valeur) > limite):
+                return None, f'{champ.capitalize()} invalide'
+            champs[champ] = valeur
+    if 'rayon_metres' in data:
+        rayon = data.get('rayon_metres')
+        if rayon is not None and (not isinstance(rayon, (int, float)) or isinstance(rayon, bool) or rayon <= 0):
+            return None, 'Rayon invalide'
+        champs['rayon_metres'] = int(rayon) if rayon is not None else None
+    if 'polygone' in data:
+        polygone = data.get('polygone')
+        if polygone:
+            polygone = _polygone_valide(polygone)
+            if polygone is None:
+                return None, 'Polygone invalide : au moins trois sommets [latitude, longitude]'
+        champs['polygone'] = polygone or None
+    if 'actif' in data:
+        champs['actif'] = bool(data.get('actif'))
+
+    def valeur(champ):
+        return champs[champ] if champ in champs else getattr(site, champ, None)
+
+    if not valeur('polygone') and (valeur('latitude') is None or valeur('longitude') is None):
+        return None, 'Définir un polygone ou un centre (latitude, longitude)'
+    return champs, None
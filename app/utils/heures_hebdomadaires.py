@@ -0,0 +1,154 @@
+"""
+Cumuls hebdomadaires et mensuels des heures de travail (table HeuresSemaine)
+"""
+
+from app import db
+from app.models import HeuresSemaine, ParametrePresence
+from app.utils.archivage_presences import heures_travail_periode
+from sqlalchemy import func
+from collections import defaultdict
+from datetime import timedelta
+
+# Nombre d'heures supplémentaires hebdomadaires majorées au taux hs_25, le reste au taux hs_50
+PLAFOND_HS_25_HEBDOMADAIRE = 8.0
+
+
+def debut_semaine(jour):
+    """Lundi de la semaine contenant le jour donné"""
+    return jour - timedelta(days=jour.weekday())
+
+
+def ventiler_heures_supplementaires(heures_sup):
+    """Répartit des heures supplémentaires hebdomadaires entre les tranches 25 % et 50 %"""
+    heures_sup_25 = min(heures_sup, PLAFOND_HS_25_HEBDOMADAIRE)
+    return heures_sup_25, max(0.0, heures_sup - heures_sup_25)
+
+
+def _appliquer_cumul(semaine, nb_jours, heures, heures_sup_jours, seuil_hebdomadaire):
+    """Calcule les heures normales/supplémentaires d'une semaine à partir des cumuls journaliers"""
+    # Les HS sont le maximum entre le dépassement hebdomadaire et la somme des dépassements quotidiens
+    heures_sup = max(heures - seuil_hebdomadaire, heures_sup_jours, 0.0)
+    heures_sup_25, heures_sup_50 = ventiler_heures_supplementaires(heures_sup)
+
+    semaine.nb_jours = nb_jours
+    semaine.heures_travaillees = heures
+    semaine.heures_normales = heures - heures_sup
+    semaine.heures_supplementaires = heures_sup
+    semaine.heures_sup_25 = heures_sup_25
+    semaine.heures_sup_50 = heures_sup_50
+
+
+def actualiser_heures_semaine(employe_id, date_travail, params=None):
+    """Recalcule le cumul de la semaine d'un employé après mise à jour d'une journée (sans commit)"""
+    params = params or ParametrePresence.query.first()
+    seuil_hebdomadaire = params.seuil_hs_hebdomadaire if params else 40.0
+    lundi = debut_semaine(date_travail)
+    journees = heures_travail_periode(lundi, lundi + timedelta(days=6))
+
+    nb_jours, heures, heures_sup_jours = db.session.query(
+        func.count(journees.id),
+        func.coalesce(func.sum(journees.heures_travaillees), 0.0),
+        func.coalesce(func.sum(journees.heures_supplementaires), 0.0)
+    ).filter(
+        journees.employe_id == employe_id,
+        journees.date_travail >= lundi,
+        journees.date_travail <= lundi + timedelta(days=6)
+    ).one()
+
+    semaine = HeuresSemaine.query.filter_by(employe_id=employe_id, date_debut_semaine=lundi).first()
+    if nb_jours == 0:
+        if semaine:
+            db.session.delete(semaine)
+        return None
+
+    if not semaine:
+        semaine = HeuresSemaine(employe_id=employe_id, date_debut_semaine=lundi)
+        db.session.add(semaine)
+    _appliquer_cumul(semaine, nb_jours, heures, heures_sup_jours, seuil_hebdomadaire)
+    return semaine
+
+
+def reconstruire_heures_semaine(date_debut=None, date_fin=None):
+    """Reconstruit les cumuls hebdomadaires des semaines couvrant la période (sans commit)"""
+    if date_debut is None or date_fin is None:
+        journees = heures_travail_periode(date_debut, date_fin)
+        premiere, derniere = db.session.query(
+            func.min(journees.date_travail), func.max(journees.date_travail)
+        ).one()
+        date_debut = date_debut or premiere
+        date_fin = date_fin or derniere
+    if date_debut is None or date_fin is None:
+        return 0
+
+    params = ParametrePresence.query.first()
+    seuil_hebdomadaire = params.seuil_hs_hebdomadaire if params else 40.0
+    lundi_debut = debut_semaine(date_debut)
+    dimanche_fin = debut_semaine(date_fin) + timedelta(days=6)
+
+    # Lecture en flux des journées et cumul par semaine en Python (calcul de semaine portable entre SGBD)
+    cumuls = defaultdict(lambda: [0, 0.0, 0.0])
+    journees = heures_travail_periode(lundi_debut, dimanche_fin)
+    lignes = db.session.query(
+        journees.employe_id,
+        journees.date_travail,
+        journees.heures_travaillees,
+        journees.heures_supplementaires
+    ).filter(
+        journees.date_travail >= lundi_debut,
+        journees.date_travail <= dimanche_fin
+    ).yield_per(1000)
+    for employe_id, date_travail, heures, heures_sup in lignes:
+        cumul = cumuls[(employe_id, debut_semaine(date_travail))]
+        cumul[0] += 1
+        cumul[1] += heures or 0.0
+        cumul[2] += heures_sup or 0.0
+
+    existants = {
+        (s.employe_id, s.date_debut_semaine): s
+        for s in HeuresSemaine.query.filter(
+            HeuresSemaine.date_debut_semaine >= lundi_debut,
+            HeuresSemaine.date_debut_semaine <= dimanche_fin
+        ).all()
+    }
+    for (employe_id, lundi), (nb_jours, heures, heures_sup_jours) in cumuls.items():
+        semaine = existants.pop((employe_id, lundi), None)
+        if semaine is None:
+            semaine = HeuresSemaine(employe_id=employe_id, date_debut_semaine=lundi)
+            db.session.add(semaine)
+        _appliquer_cumul(semaine, nb_jours, heures, heures_sup_jours, seuil_hebdomadaire)
+
+    for semaine in existants.values():
+        db.session.delete(semaine)
+
+    return len(cumuls)
+
+
+def heures_periode(date_debut, date_fin, employe_ids=None):
+    """Cumuls des semaines commençant dans la période, par employé (une seule requête groupée)"""
+    query = db.session.query(
+        HeuresSemaine.employe_id,
+        func.sum(HeuresSemaine.nb_jours),
+        func.sum(HeuresSemaine.heures_travaillees),
+        func.sum(HeuresSemaine.heures_normales),
+        func.sum(HeuresSemaine.heures_supplementaires),
+        func.sum(HeuresSemaine.heures_sup_25),
+        func.sum(HeuresSemaine.heures_sup_50)
+    ).filter(
+        HeuresSemaine.date_debut_semaine >= date_debut,
+        HeuresSemaine.date_debut_semaine <= date_fin
+    )
+    if employe_ids is not None:
+        query = query.filter(HeuresSemaine.employe_id.in_(employe_ids))
+
+    return {
+        employe_id: {
+            'nb_jours': nb_jours or 0,
+            'heures_travaillees': heures or 0.0,
+            'heures_normales': heures_normales or 0.0,
+            'heures_supplementaires': heures_sup or 0.0,
+            'heures_sup_25': heures_sup_25 or 0.0,
+            'heures_sup_50': heures_sup_50 or 0.0,
+        }
+        for employe_id, nb_jours, heures, heures_normales, heures_sup, heures_sup_25, heures_sup_50
+        in query.group_by(HeuresSemaine.employe_id).all()
+    }
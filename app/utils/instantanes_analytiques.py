@@ -0,0 +1,306 @@
+"""
+Instantanés analytiques en colonnes (Parquet) pour les tableaux de bord et rapports RH
+
+L'export nocturne (commande export-analytics-snapshot) écrit un fichier Parquet typé et
+dénormalisé par jeu de données dans un répertoire horodaté, puis bascule le pointeur
+courant.json. Les endpoints analytiques lisent ces fichiers en mémoire mappée avec
+pyarrow/pandas, sans charger d'objets ORM ni solliciter la base transactionnelle.
+"""
+
+from app import db
+from app.models import Employee, Conge, Absence, BulletinPaie, Evaluation
+from app.utils.archivage_presences import heures_travail_periode
+from app.utils.database import moteur_lecture
+from flask import current_app
+from sqlalchemy import select
+from datetime import datetime, timedelta
+import pyarrow as pa
+import pyarrow.parquet as pq
+import json
+import os
+import shutil
+import threading
+
+FICHIER_COURANT = 'courant.json'
+TAILLE_LOT = 50000  # lignes lues et écrites par lot (un groupe de lignes Parquet par lot)
+FORMAT_REPERTOIRE = '%Y%m%dT%H%M%S_%f'
+
+
+def _colonnes_employe():
+    """Colonnes de l'employé recopiées dans chaque jeu de données (dénormalisation)"""
+    return [
+        ('employe_nom', Employee.nom, pa.string()),
+        ('employe_prenom', Employee.prenom, pa.string()),
+        ('departement', Employee.departement, pa.string()),
+        ('poste', Employee.poste, pa.string()),
+    ]
+
+
+def _jeu_employes():
+    return [
+        ('employe_id', Employee.id, pa.int64()),
+        ('nom', Employee.nom, pa.string()),
+        ('prenom', Employee.prenom, pa.string()),
+        ('sexe', Employee.sexe, pa.string()),
+        ('departement', Employee.departement, pa.string()),
+        ('poste', Employee.poste, pa.string()),
+        ('manager_id', Employee.manager_id, pa.int64()),
+        ('type_contrat', Employee.type_contrat, pa.string()),
+        ('statut', Employee.statut, pa.string()),
+        ('date_embauche', Employee.date_embauche, pa.date32()),
+        ('date_fin_contrat', Employee.date_fin_contrat, pa.date32()),
+        ('salaire_base', Employee.salaire_base, pa.float64()),
+        ('date_modification', Employee.date_modification, pa.timestamp('us')),
+    ], None
+
+
+def _jeu_conges():
+    return [
+        ('conge_id', Conge.id, pa.int64()),
+        ('employe_id', Conge.employe_id, pa.int64()),
+        *_colonnes_employe(),
+        ('type_conge', Conge.type_conge, pa.string()),
+        ('date_debut', Conge.date_debut, pa.date32()),
+        ('date_fin', Conge.date_fin, pa.date32()),
+        ('nombre_jours', Conge.nombre_jours, pa.int32()),
+        ('statut', Conge.statut, pa.string()),
+        ('date_demande', Conge.date_demande, pa.timestamp('us')),
+        ('date_approbation', Conge.date_approbation, pa.timestamp('us')),
+    ], Conge.employe_id
+
+
+def _jeu_absences():
+    return [
+        ('absence_id', Absence.id, pa.int64()),
+        ('employe_id', Absence.employe_id, pa.int64()),
+        *_colonnes_employe(),
+        ('date_absence', Absence.date_absence, pa.date32()),
+        ('motif', Absence.motif, pa.string()),
+        ('etat', Absence.etat, pa.string()),
+        ('impact_paie', Absence.impact_paie, pa.bool_()),
+    ], Absence.employe_id
+
+
+def _jeu_heures_travail():
+    # Tables chaudes et archives annuelles
+    heures = heures_travail_periode()
+    return [
+        ('heures_travail_id', heures.id, pa.int64()),
+        ('employe_id', heures.employe_id, pa.int64()),
+        *_colonnes_employe(),
+        ('date_travail', heures.date_travail, pa.date32()),
+        ('heures_presentes', heures.heures_presentes, pa.float64()),
+        ('heures_travaillees', heures.heures_travaillees, pa.float64()),
+        ('heures_normales', heures.heures_normales, pa.float64()),
+        ('heures_supplementaires', heures.heures_supplementaires, pa.float64()),
+        ('retard_minutes', heures.retard_minutes, pa.int32()),
+        ('depart_anticipe_minutes', heures.depart_anticipe_minutes, pa.int32()),
+        ('statut', heures.statut, pa.string()),
+        ('valide', heures.valide, pa.bool_()),
+    ], heures.employe_id
+
+
+def _jeu_bulletins():
+    return [
+        ('bulletin_id', BulletinPaie.id, pa.int64()),
+        ('employe_id', BulletinPaie.employe_id, pa.int64()),
+        *_colonnes_employe(),
+        ('annee', BulletinPaie.annee, pa.int16()),
+        ('mois', BulletinPaie.mois, pa.int8()),
+        ('periode_debut', BulletinPaie.periode_debut, pa.date32()),
+        ('periode_fin', BulletinPaie.periode_fin, pa.date32()),
+        ('salaire_base', BulletinPaie.salaire_base, pa.float64()),
+        ('salaire_brut', BulletinPaie.salaire_brut, pa.float64()),
+        ('primes_bonus', BulletinPaie.primes_bonus, pa.float64()),
+        ('indemnites', BulletinPaie.indemnites, pa.float64()),
+        ('total_cotisations_salariales', BulletinPaie.total_cotisations_salariales, pa.float64()),
+        ('total_cotisations_patronales', BulletinPaie.total_cotisations_patronales, pa.float64()),
+        ('impot_sur_salaire', BulletinPaie.impot_sur_salaire, pa.float64()),
+        ('salaire_net', BulletinPaie.salaire_net, pa.float64()),
+        ('nb_jours_travailles', BulletinPaie.nb_jours_travailles, pa.float64()),
+        ('nb_jours_absences', BulletinPaie.nb_jours_absences, pa.float64()),
+        ('nb_heures_supplementaires', BulletinPaie.nb_heures_supplementaires, pa.float64()),
+        ('statut', BulletinPaie.statut, pa.string()),
+    ], BulletinPaie.employe_id
+
+
+def _jeu_evaluations():
+    return [
+        ('evaluation_id', Evaluation.id, pa.int64()),
+        ('employe_id', Evaluation.employe_id, pa.int64()),
+        *_colonnes_employe(),
+        ('evaluateur_id', Evaluation.evaluateur_id, pa.int64()),
+        ('template_id', Evaluation.template_id, pa.int64()),
+        ('periode', Evaluation.periode, pa.string()),
+        ('type_evaluation', Evaluation.type_evaluation, pa.string()),
+        ('annee', Evaluation.annee, pa.int16()),
+        ('score_global', Evaluation.score_global, pa.float64()),
+        ('score_max', Evaluation.score_max, pa.float64()),
+        ('note_finale', Evaluation.note_finale, pa.string()),
+        ('statut', Evaluation.statut, pa.string()),
+        ('date_evaluation', Evaluation.date_evaluation, pa.date32()),
+    ], Evaluation.employe_id
+
+
+# Nom du jeu -> définition (colonnes (nom, expression, type Arrow), clé de jointure vers l'employé)
+JEUX = {
+    'employes': _jeu_employes,
+    'conges': _jeu_conges,
+    'absences': _jeu_absences,
+    'heures_travail': _jeu_heures_travail,
+    'bulletins': _jeu_bulletins,
+    'evaluations': _jeu_evaluations,
+}
+
+
+def repertoire_instantanes():
+    return current_app.config.get('INSTANTANES_REPERTOIRE') or os.path.join(current_app.instance_path, 'instantanes')
+
+
+# ============= EXPORT =============
+
+def _requete_jeu(nom):
+    colonnes, cle_employe = JEUX[nom]()
+    requete = select(*[expression.label(colonne) for colonne, expression, _ in colonnes])
+    if cle_employe is not None:
+        requete = requete.outerjoin(Employee, Employee.id == cle_employe)
+    schema = pa.schema([pa.field(colonne, type_arrow) for colonne, _, type_arrow in colonnes])
+    return requete, schema
+
+
+def exporter_jeu(nom, chemin, connexion):
+    """Écrit un jeu de données dans un fichier Parquet, lot par lot ; retourne le nombre de lignes"""
+    requete, schema = _requete_jeu(nom)
+    nb_lignes = 0
+    with pq.ParquetWriter(chemin, schema, compression='zstd') as writer:
+        resultat = connexion.execution_options(yield_per=TAILLE_LOT).execute(requete)
+        for lignes in resultat.partitions():
+            valeurs = list(zip(*lignes))
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(colonne, type=champ.type) for colonne, champ in zip(valeurs, schema)],
+                schema=schema
+            ))
+            nb_lignes += len(lignes)
+    return nb_lignes
+
+
+def exporter_instantane(maintenant=None):
+    """Exporte les jeux de données dans un nouveau répertoire horodaté et en fait l'instantané courant.
+
+    Lecture sur la réplique si elle est disponible, dans une seule transaction pour
+    que les jeux soient cohérents entre eux. Retourne le manifeste de l'instantané.
+    """
+    maintenant = maintenant or datetime.now()
+    racine = repertoire_instantanes()
+    nom_repertoire = maintenant.strftime(FORMAT_REPERTOIRE)
+    repertoire = os.path.join(racine, nom_repertoire)
+    temporaire = repertoire + '.tmp'
+    shutil.rmtree(temporaire, ignore_errors=True)
+    os.makedirs(temporaire)
+
+    manifeste = {'date_generation': maintenant.isoformat(timespec='seconds'), 'jeux': {}}
+    try:
+        moteur = moteur_lecture() or db.engine
+        with moteur.connect() as connexion, connexion.begin():
+            for nom in JEUX:
+                nb_lignes = exporter_jeu(nom, os.path.join(temporaire, f"{nom}.parquet"), connexion)
+                manifeste['jeux'][nom] = nb_lignes
+        with open(os.path.join(temporaire, 'manifeste.json'), 'w', encoding='utf-8') as fichier:
+            json.dump(manifeste, fichier, indent=2)
+        os.replace(temporaire, repertoire)
+    except Exception:
+        shutil.rmtree(temporaire, ignore_errors=True)
+        raise
+
+    # Bascule atomique du pointeur : les lecteurs voient l'ancien ou le nouvel instantané, jamais un mélange
+    pointeur = os.path.join(racine, FICHIER_COURANT)
+    with open(pointeur + '.tmp', 'w', encoding='utf-8') as fichier:
+        json.dump({'repertoire': nom_repertoire, **manifeste}, fichier, indent=2)
+    os.replace(pointeur + '.tmp', pointeur)
+    return manifeste
+
+
+def purger_instantanes(conserver=None):
+    """Supprime les instantanés les plus anciens en gardant les N plus récents et le courant"""
+    conserver = conserver or current_app.config.get('INSTANTANES_CONSERVES', 3)
+    racine = repertoire_instantanes()
+    courant = instantane_courant(age_max=None)
+    repertoires = sorted(
+        nom for nom in os.listdir(racine)
+        if os.path.isdir(os.path.join(racine, nom)) and not nom.endswith('.tmp')
+    )
+    supprimes = []
+    for nom in repertoires[:-conserver]:
+        if courant is None or nom != courant['repertoire']:
+            shutil.rmtree(os.path.join(racine, nom), ignore_errors=True)
+            supprimes.append(nom)
+    return supprimes
+
+
+# ============= LECTURE =============
+
+_verrou = threading.Lock()
+_tables = {}
+_pointeur = {'chemin': None, 'mtime': None, 'contenu': None}
+
+
+def instantane_courant(age_max=0):
+    """Description de l'instantané courant, ou None s'il n'existe pas ou est plus vieux que
+    INSTANTANES_AGE_MAX_HEURES (age_max=None : aucune limite)"""
+    chemin = os.path.join(repertoire_instantanes(), FICHIER_COURANT)
+    try:
+        mtime = os.stat(chemin).st_mtime
+    except OSError:
+        return None
+
+    if _pointeur['chemin'] != chemin or _pointeur['mtime'] != mtime:
+        try:
+            with open(chemin, encoding='utf-8') as fichier:
+                contenu = json.load(fichier)
+        except (OSError, ValueError):
+            return None
+        with _verrou:
+            _pointeur.update(chemin=chemin, mtime=mtime, contenu=contenu)
+            # Tables de l'instantané précédent : libère les projections mémoire
+            repertoire = os.path.join(repertoire_instantanes(), contenu['repertoire'])
+            for cle in [cle for cle in _tables if os.path.dirname(cle) != repertoire]:
+                del _tables[cle]
+    contenu = _pointeur['contenu']
+
+    if age_max == 0:
+        age_max = current_app.config.get('INSTANTANES_AGE_MAX_HEURES', 36)
+    if age_max is not None:
+        if datetime.now() - datetime.fromisoformat(contenu['date_generation']) > timedelta(hours=age_max):
+            return None
+    return contenu
+
+
+def _table(chemin):
+    table = _tables.get(chemin)
+    if table is None:
+        with _verrou:
+            table = _tables.get(chemin)
+            if table is None:
+                table = pq.read_table(chemin, memory_map=True)
+                _tables[chemin] = table
+    return table
+
+
+def lire_instantane(nom, colonnes=None, filtre=None):
+    """DataFrame pandas d'un jeu de l'instantané courant (colonnes choisies, filtre pyarrow.compute
+    optionnel), ou None sans instantané récent : l'appelant se replie alors sur la base"""
+    courant = instantane_courant()
+    if courant is None or nom not in courant['jeux']:
+        return None
+    chemin = os.path.join(repertoire_instantanes(), courant['repertoire'], f"{nom}.parquet")
+    try:
+        table = _table(chemin)
+    except (OSError, pa.ArrowException):
+        current_app.logger.warning(f"Instantané analytique illisible : {chemin}")
+        return None
+    if filtre is not None:
+        table = table.filter(filtre)
+    if colonnes is not None:
+        table = table.select(colonnes)
+    # Dates en datetime64 pour les regroupements pandas (.dt)
+    return table.to_pandas(date_as_object=False)
@@ -0,0 +1,122 @@
+"""
+Création groupée des notifications de présence (NotificationPresence)
+"""
+
+from app import db
+from app.models import Employee, NotificationPresence
+from app.utils.boite_notifications import ajuster_non_lues
+from app.utils.flux_presences import publier_evenement
+from sqlalchemy import insert
+from datetime import datetime
+from string import Formatter
+
+# Modèles de notification par type ; {nom} et {date} sont toujours fournis,
+# les autres champs proviennent des données de référence (0 si absents)
+MODELES_NOTIFICATIONS = {
+    'retard': {
+        'titre': 'Retard détecté - {nom}',
+        'message': '{nom} est arrivé en retard de {retard_minutes} minutes le {date}.',
+        'priorite': 'normale'
+    },
+    'absence': {
+        'titre': 'Absence détectée - {nom}',
+        'message': '{nom} est absent le {date} sans justification.',
+        'priorite': 'haute'
+    },
+    'depart_anticipe': {
+        'titre': 'Départ anticipé - {nom}',
+        'message': '{nom} est parti {depart_anticipe_minutes} minutes plus tôt le {date}.',
+        'priorite': 'normale'
+    },
+    'heures_sup': {
+        'titre': 'Heures supplémentaires - {nom}',
+        'message': '{nom} a effectué {heures_sup} heures supplémentaires le {date}.',
+        'priorite': 'normale'
+    }
+}
+
+
+def _compiler(chaine):
+    """Analyse une chaîne de format une fois ; le rendu ne fait plus que concaténer texte et valeurs"""
+    morceaux = [(texte, champ, spec or '') for texte, champ, spec, _ in Formatter().parse(chaine)]
+
+    def rendre(valeurs):
+        return ''.join(
+            texte if champ is None else texte + format(valeurs[champ], spec)
+            for texte, champ, spec in morceaux
+        )
+    return rendre
+
+
+# Les chaînes de format sont analysées une seule fois au chargement du module
+_MODELES_COMPILES = {
+    type_notif: {
+        'titre': _compiler(modele['titre']),
+        'message': _compiler(modele['message']),
+        'priorite': modele['priorite']
+    }
+    for type_notif, modele in MODELES_NOTIFICATIONS.items()
+}
+
+
+class _Valeurs(dict):
+    """Valeurs de rendu : 0 pour toute donnée de référence manquante"""
+
+    def __missing__(self, cle):
+        return 0
+
+
+def creer_notifications_presence(evenements):
+    """Insère en une fois les notifications (employe_id, type, date, données) non encore créées (sans commit)"""
+    a_creer = {}
+    for employe_id, type_notif, date_reference, donnees in evenements:
+        if type_notif not in _MODELES_COMPILES:
+            continue
+        # Une seule notification par employé, type et jour
+        a_creer.setdefault((employe_id, type_notif, date_reference), donnees or {})
+    if not a_creer:
+        return 0
+
+    employe_ids = {cle[0] for cle in a_creer}
+    existantes = db.session.query(
+        NotificationPresence.employe_id,
+        NotificationPresence.type_notification,
+        NotificationPresence.date_reference
+    ).filter(
+        NotificationPresence.employe_id.in_(employe_ids),
+        NotificationPresence.type_notification.in_({cle[1] for cle in a_creer}),
+        NotificationPresence.date_reference.in_({cle[2] for cle in a_creer})
+    ).all()
+    for cle in existantes:
+        a_creer.pop(tuple(cle), None)
+    if not a_creer:
+        return 0
+
+    noms = dict(db.session.query(Employee.id, Employee.nom).filter(Employee.id.in_(employe_ids)).all())
+
+    maintenant = datetime.utcnow()
+    lignes = []
+    for (employe_id, type_notif, date_reference), donnees in a_creer.items():
+        if employe_id not in noms:
+            continue
+        modele = _MODELES_COMPILES[type_notif]
+        valeurs = _Valeurs(donnees, nom=noms[employe_id], date=date_reference.strftime("%d/%m/%Y"))
+        lignes.append({
+            'employe_id': employe_id,
+            'type_notification': type_notif,
+            'titre': modele['titre'](valeurs),
+            'message': modele['message'](valeurs),
+            'priorite': modele['priorite'],
+            'date_reference': date_reference,
+            'donnees_reference': donnees,
+            'date_creation': maintenant,
+        })
+
+    if lignes:
+        db.session.execute(insert(NotificationPresence), lignes)
+        ajuster_non_lues(len(lignes))
+        publier_evenement('notifications', {'notifications': [
+            {cle: ligne[cle] for cle in ('employe_id', 'type_notification', 'titre', 'message', 'priorite', 'date_reference')}
+            for ligne in lignes
+        ]})
+    return len(lignes)
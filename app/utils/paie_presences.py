@@ -0,0 +1,105 @@
+"""
+Pipeline présences -> paie : éléments de temps des bulletins calculés pour une période
+"""
+
+from app import db
+from app.models import Employee, Absence, Conge, TypeConge
+from app.utils.archivage_presences import heures_travail_periode
+from app.utils.heures_hebdomadaires import heures_periode
+from sqlalchemy import func, case
+from collections import defaultdict
+from datetime import timedelta
+
+STATUTS_PRESENTS = ('present', 'retard')
+
+
+def jours_ouvres(date_debut, date_fin):
+    """Jours du lundi au vendredi compris dans la période (bornes incluses)"""
+    if not date_debut or not date_fin or date_fin < date_debut:
+        return []
+    jours = []
+    jour = date_debut
+    while jour <= date_fin:
+        if jour.weekday() < 5:
+            jours.append(jour)
+        jour += timedelta(days=1)
+    return jours
+
+
+def calculer_elements_temps_paie(date_debut, date_fin, employe_ids=None):
+    """Éléments de temps de la période pour tous les employés actifs (ou ceux donnés), en requêtes groupées"""
+    if employe_ids is None:
+        employe_ids = [e_id for (e_id,) in db.session.query(Employee.id).filter(Employee.statut == 'Actif').all()]
+    employe_ids = list(employe_ids)
+    if not employe_ids:
+        return {}
+
+    ouvres = jours_ouvres(date_debut, date_fin)
+    ensemble_ouvres = set(ouvres)
+
+    # Présences pointées et heures normales (archives comprises pour un mois clos)
+    journees = heures_travail_periode(date_debut, date_fin)
+    presences = {
+        employe_id: (jours_pointes or 0, heures_normales or 0.0)
+        for employe_id, jours_pointes, heures_normales in db.session.query(
+            journees.employe_id,
+            func.sum(case((journees.statut.in_(STATUTS_PRESENTS), 1), else_=0)),
+            func.sum(journees.heures_normales)
+        ).filter(
+            journees.employe_id.in_(employe_ids),
+            journees.date_travail >= date_debut,
+            journees.date_travail <= date_fin
+        ).group_by(journees.employe_id).all()
+    }
+
+    # Heures supplémentaires issues des cumuls hebdomadaires
+    heures_sup = heures_periode(date_debut, date_fin, employe_ids)
+
+    # Congés approuvés chevauchant la période, avec leur caractère rémunéré
+    jours_conges = defaultdict(set)
+    jours_sans_solde = defaultdict(set)
+    conges = db.session.query(
+        Conge.employe_id, Conge.date_debut, Conge.date_fin, TypeConge.remunere
+    ).outerjoin(TypeConge, TypeConge.nom == Conge.type_conge).filter(
+        Conge.employe_id.in_(employe_ids),
+        Conge.statut == 'Approuvé',
+        Conge.date_debut <= date_fin,
+        Conge.date_fin >= date_debut
+    ).all()
+    for employe_id, debut, fin, remunere in conges:
+        jours = set(jours_ouvres(max(debut, date_debut), min(fin, date_fin)))
+        if remunere is False:
+            jours_sans_solde[employe_id] |= jours
+        else:
+            jours_conges[employe_id] |= jours
+
+    # Absences ayant un impact sur la paie
+    jours_absences = defaultdict(set)
+    absences = db.session.query(Absence.employe_id, Absence.date_absence).filter(
+        Absence.employe_id.in_(employe_ids),
+        Absence.impact_paie == True,
+        Absence.date_absence >= date_debut,
+        Absence.date_absence <= date_fin
+    ).distinct().all()
+    for employe_id, date_absence in absences:
+        if date_absence in ensemble_ouvres:
+            jours_absences[employe_id].add(date_absence)
+
+    elements = {}
+    for employe_id in employe_ids:
+        jours_non_payes = jours_sans_solde[employe_id] | jours_absences[employe_id]
+        jours_pointes, heures_normales = presences.get(employe_id, (0, 0.0))
+        hs = heures_sup.get(employe_id, {})
+        elements[employe_id] = {
+            'nb_jours_ouvres': len(ouvres),
+            'nb_jours_travailles': max(0, len(ouvres) - len(jours_non_payes)),
+            'nb_jours_pointes': jours_pointes,
+            'nb_heures_normales': heures_normales,
+            'nb_heures_supplementaires': hs.get('heures_supplementaires', 0.0),
+            'nb_heures_sup_25': hs.get('heures_sup_25', 0.0),
+            'nb_heures_sup_50': hs.get('heures_sup_50', 0.0),
+            'nb_jours_conges': len(jours_conges[employe_id] - jours_non_payes),
+            'nb_jours_conges_sans_solde': len(jours_sans_solde[employe_id]),
+            'nb_jours_absences': len(jours_non_payes),
+        }
+    return elements
@@ -0,0 +1,86 @@
+"""
+Vue d'ensemble du pipeline de recrutement
+
+Les offres sont paginées ; les nombres de candidats (par statut) et d'entretiens de la page
+sont obtenus par deux requêtes GROUP BY, sans charger les collections candidats / entretiens.
+Le détail des candidats et des entretiens d'une offre est servi par pages séparées.
+"""
+
+from app import db
+from app.models import OffreEmploi, Candidat, Entretien, ParticipantEntretien
+from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload
+from datetime import datetime
+
+OFFRES_PAR_PAGE = 12
+CANDIDATS_PAR_PAGE = 20
+ENTRETIENS_PAR_PAGE = 20
+
+
+def comptes_pipeline(offre_ids):
+    """{offre_id: {'candidats_par_statut': {...}, 'nb_candidats': n, 'nb_entretiens': n}}"""
+    comptes = {offre_id: {'candidats_par_statut': {}, 'nb_candidats': 0, 'nb_entretiens': 0}
+               for offre_id in offre_ids}
+    if not comptes:
+        return comptes
+
+    candidats = db.session.execute(
+        select(Candidat.offre_emploi_id, Candidat.statut, func.count())
+        .where(Candidat.offre_emploi_id.in_(comptes))
+        .group_by(Candidat.offre_emploi_id, Candidat.statut)
+    )
+    for offre_id, statut, nombre in candidats:
+        comptes[offre_id]['candidats_par_statut'][statut] = nombre
+        comptes[offre_id]['nb_candidats'] += nombre
+
+    entretiens = db.session.execute(
+        select(Entretien.offre_emploi_id, func.count())
+        .where(Entretien.offre_emploi_id.in_(comptes))
+        .group_by(Entretien.offre_emploi_id)
+    )
+    for offre_id, nombre in entretiens:
+        comptes[offre_id]['nb_entretiens'] = nombre
+    return comptes
+
+
+def apercu_pipeline(page=1, par_page=OFFRES_PAR_PAGE, recherche=None):
+    """Page d'offres (hors supprimées) avec leurs comptages : (pagination, liste de dicts)"""
+    requete = select(OffreEmploi).where(OffreEmploi.statut != 'Supprimée')
+    if recherche:
+        requete = requete.where(OffreEmploi.titre.ilike(f'%{recherche}%'))
+    requete = requete.order_by(OffreEmploi.date_publication.desc(), OffreEmploi.id.desc())
+    pagination = db.paginate(requete, page=page, per_page=par_page, error_out=False)
+
+    comptes = comptes_pipeline([offre.id for offre in pagination.items])
+    aujourdhui = datetime.utcnow().date()
+    liste = []
+    for offre in pagination.items:
+        liste.append({
+            'id': offre.id,
+            'titre': offre.titre,
+            'departement': offre.departement,
+            'description': offre.description,
+            'statut': offre.statut,
+            'jours_restants': max(0, (offre.date_cloture - aujourdhui).days) if offre.date_cloture else 0,
+            'date_publication': offre.date_publication,
+            'date_cloture': offre.date_cloture,
+            **comptes[offre.id],
+        })
+    return pagination, liste
+
+
+def candidats_offre(offre_id, page=1, par_page=CANDIDATS_PAR_PAGE, statut=None):
+    """Page des candidats d'une offre, les plus récents d'abord"""
+    requete = select(Candidat).where(Candidat.offre_emploi_id == offre_id)
+    if statut:
+        requete = requete.where(Candidat.statut == statut)
+    requete = requete.order_by(Candidat.date_soumission.desc(), Candidat.id.desc())
+    return db.paginate(requete, page=page, per_page=par_page, error_out=False)
+
+
+def entretiens_offre(offre_id, page=1, par_page=ENTRETIENS_PAR_PAGE):
+    """Page des entretiens d'une offre, les plus récents d'abord"""
+    requete = (select(Entretien).where(Entretien.offre_emploi_id == offre_id)
+               .options(selectinload(Entretien.participants_employes).joinedload(ParticipantEntretien.employe))
+               .order_by(Entretien.datetime.desc(), Entretien.id.desc()))
+    return db.paginate(requete, page=page, per_page=par_page, error_out=False)
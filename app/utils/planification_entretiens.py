@@ -0,0 +1,174 @@
+"""
+Planification des entretiens de recrutement
+
+Les employés participants sont liés à chaque entretien (ParticipantEntretien) avec une copie
+du créneau, indexée par (employe_id, debut) : la recherche des chevauchements d'un employé est
+une lecture d'intervalle d'index bornée par la durée maximale d'un entretien. Les congés
+approuvés des participants bloquent des journées entières. Les créneaux libres communs sont
+cherchés sur les intervalles occupés fusionnés et triés, par dichotomie.
+"""
+
+from app import db
+from app.models import Entretien, ParticipantEntretien, Conge, Employee
+from flask import current_app
+from sqlalchemy import select
+from datetime import datetime, timedelta, time
+from bisect import bisect_right
+import math
+
+DUREE_DEFAUT = 60  # minutes
+PAS_CRENEAUX = 15  # minutes
+
+
+def _heure(nom, defaut):
+    return time(current_app.config.get(nom, defaut))
+
+
+def duree_max():
+    return timedelta(minutes=current_app.config.get('ENTRETIEN_DUREE_MAX', 480))
+
+
+class IndexOccupations:
+    """Intervalles occupés fusionnés et triés ; chevauchement testé en O(log n)"""
+
+    def __init__(self, intervalles):
+        self.debuts = []
+        self.fins = []
+        for debut, fin in sorted(intervalles):
+            if self.fins and debut <= self.fins[-1]:
+                self.fins[-1] = max(self.fins[-1], fin)
+            else:
+                self.debuts.append(debut)
+                self.fins.append(fin)
+
+    def chevauche(self, debut, fin):
+        i = bisect_right(self.debuts, debut) - 1
+        if i >= 0 and self.fins[i] > debut:
+            return True
+        return i + 1 < len(self.debuts) and self.debuts[i + 1] < fin
+
+    def premier_instant_libre(self, instant):
+        """instant, ou la fin de l'occupation qui le contient"""
+        i = bisect_right(self.debuts, instant) - 1
+        return self.fins[i] if i >= 0 and self.fins[i] > instant else instant
+
+    def prochaine_occupation(self, instant):
+        """Début de la première occupation commençant après instant, ou None"""
+        i = bisect_right(self.debuts, instant)
+        return self.debuts[i] if i < len(self.debuts) else None
+
+
+def occupations(employe_ids, debut, fin, exclure_entretien_id=None):
+    """Occupations des employés qui chevauchent [debut, fin[ : [(employe_id, debut, fin, motif), ...]"""
+    if not employe_ids:
+        return []
+    requete = select(ParticipantEntretien.employe_id, ParticipantEntretien.debut, ParticipantEntretien.fin,
+                     ParticipantEntretien.entretien_id).where(
+        ParticipantEntretien.employe_id.in_(employe_ids),
+        # Bornes sur debut uniquement (index employe / debut) : un entretien dure au plus duree_max()
+        ParticipantEntretien.debut < fin,
+        ParticipantEntretien.debut > debut - duree_max(),
+        ParticipantEntretien.fin > debut,
+    )
+    if exclure_entretien_id:
+        requete = requete.where(ParticipantEntretien.entretien_id != exclure_entretien_id)
+    resultat = [(employe_id, d, f, 'entretien') for employe_id, d, f, _ in db.session.execute(requete)]
+
+    conges = db.session.execute(
+        select(Conge.employe_id, Conge.date_debut, Conge.date_fin).where(
+            Conge.employe_id.in_(employe_ids),
+            Conge.statut == 'Approuvé',
+            Conge.date_debut <= fin.date(),
+            Conge.date_fin >= debut.date(),
+        )
+    )
+    for employe_id, date_debut, date_fin in conges:
+        resultat.append((employe_id, datetime.combine(date_debut, time.min),
+                         datetime.combine(date_fin + timedelta(days=1), time.min), 'congé'))
+    return resultat
+
+
+def conflits_participants(employe_ids, debut, fin, exclure_entretien_id=None):
+    """Messages décrivant les occupations des participants pendant le créneau"""
+    noms = dict(db.session.execute(
+        select(Employee.id, Employee.prenom + ' ' + Employee.nom).where(Employee.id.in_(employe_ids))
+    ).all()) if employe_ids else {}
+    messages = []
+    for employe_id, d, f, motif in sorted(occupations(employe_ids, debut, fin, exclure_entretien_id),
+                                          key=lambda o: o[1]):
+        if motif == 'congé':
+            periode = f"du {d.strftime('%d/%m/%Y')} au {(f - timedelta(days=1)).strftime('%d/%m/%Y')}"
+        else:
+            periode = f"de {d.strftime('%d/%m/%Y %H:%M')} à {f.strftime('%H:%M')}"
+        messages.append(f"{noms.get(employe_id, employe_id)} : {motif} {periode}")
+    return messages
+
+
+def planifier_entretien(candidat, titre, debut, duree, employe_ids, participants=None, notes=None):
+    """Crée l'entretien et ses participants (sans commit).
+
+    Lève ValueError si la durée est invalide ou si un participant est déjà occupé.
+    """
+    duree = duree or DUREE_DEFAUT
+    if duree <= 0 or timedelta(minutes=duree) > duree_max():
+        raise ValueError(f"Durée d'entretien invalide (1 à {int(duree_max().total_seconds() // 60)} minutes)")
+    fin = debut + timedelta(minutes=duree)
+    employe_ids = sorted(set(employe_ids))
+
+    conflits = conflits_participants(employe_ids, debut, fin)
+    if conflits:
+        raise ValueError("Participants indisponibles : " + " ; ".join(conflits))
+
+    entretien = Entretien(
+        candidat_id=candidat.id,
+        offre_emploi_id=candidat.offre_emploi_id,
+        titre=titre,
+        datetime=debut,
+        duree=duree,
+        participants=participants,
+        notes=notes,
+        participants_employes=[ParticipantEntretien(employe_id=employe_id, debut=debut, fin=fin)
+                               for employe_id in employe_ids],
+    )
+    db.session.add(entretien)
+    return entretien
+
+
+def _arrondir(instant, pas):
+    """Premier multiple de pas (depuis minuit) à partir de instant"""
+    minuit = datetime.combine(instant.date(), time.min)
+    return minuit + pas * math.ceil((instant - minuit) / pas)
+
+
+def creneaux_libres(employe_ids, date_debut, date_fin, duree, nombre=5, pas=PAS_CRENEAUX, maintenant=None):
+    """Premiers créneaux de duree minutes où tous les employés sont libres, en heures et jours
+    ouvrés, entre date_debut et date_fin incluses : [(debut, fin), ...]"""
+    duree = timedelta(minutes=duree)
+    pas = timedelta(minutes=pas)
+    maintenant = maintenant or datetime.now()
+    heure_debut = _heure('ENTRETIENS_HEURE_DEBUT', 8)
+    heure_fin = _heure('ENTRETIENS_HEURE_FIN', 18)
+
+    periode_debut = datetime.combine(date_debut, time.min)
+    periode_fin = datetime.combine(date_fin + timedelta(days=1), time.min)
+    index = IndexOccupations((d, f) for _, d, f, _ in occupations(employe_ids, periode_debut, periode_fin))
+
+    creneaux = []
+    jour = date_debut
+    while jour <= date_fin and len(creneaux) < nombre:
+        if jour.weekday() < 5:
+            instant = _arrondir(max(datetime.combine(jour, heure_debut), maintenant), pas)
+            fin_jour = datetime.combine(jour, heure_fin)
+            while instant + duree <= fin_jour and len(creneaux) < nombre:
+                libre = index.premier_instant_libre(instant)
+                if libre > instant:
+                    instant = _arrondir(libre, pas)
+                    continue
+                suivante = index.prochaine_occupation(instant)
+                if suivante is not None and suivante < instant + duree:
+                    instant = _arrondir(index.premier_instant_libre(suivante), pas)
+                    continue
+                creneaux.append((instant, instant + duree))
+                instant += duree
+        jour += timedelta(days=1)
+    return creneaux
@@ -0,0 +1,168 @@
+"""
+Moteur PDF paginé pour les rapports volumineux (ReportLab platypus, écriture sur disque)
+
+Les lignes sont consommées au fil de la génération par blocs d'une page : chaque bloc devient
+un tableau de hauteur fixe qui remplit exactement le cadre de la page, sans découpage de tableau
+ni liste complète des lignes en mémoire. Le temps de rendu et la mémoire par page sont donc
+constants, quel que soit le nombre de lignes. Le PDF est écrit dans un fichier temporaire.
+"""
+
+from flask import send_file
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame, Table, TableStyle, Paragraph, Spacer
+from datetime import datetime
+import tempfile
+import time
+
+POLICE = 'Helvetica'
+POLICE_GRAS = 'Helvetica-Bold'
+TAILLE_POLICE = 8
+HAUTEUR_LIGNE = 14
+MARGE = 1.5 * cm
+HAUTEUR_ENTETE = 1.8 * cm  # bandeau titre / date dessiné sur chaque page
+
+# Style commun à tous les tableaux, construit une seule fois
+STYLE_TABLEAU = TableStyle([
+    ('FONT', (0, 0), (-1, -1), POLICE, TAILLE_POLICE),
+    ('FONT', (0, 0), (-1, 0), POLICE_GRAS, TAILLE_POLICE),
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f4f6f7')]),
+    ('LINEBELOW', (0, 0), (-1, -1), 0.25, colors.HexColor('#bdc3c7')),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), 3),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+    ('TOPPADDING', (0, 0), (-1, -1), 0),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+])
+
+
+def _tronquer(valeur, nb_caracteres):
+    """Texte d'une cellule sur une seule ligne (la hauteur de ligne est fixe)"""
+    texte = '' if valeur is None else str(valeur)
+    if len(texte) > nb_caracteres:
+        return texte[:max(nb_caracteres - 1, 1)] + '…'
+    return texte
+
+
+class DocumentFlux(BaseDocTemplate):
+    """Document alimenté par un générateur de flowables au lieu d'une liste complète"""
+
+    def __init__(self, fichier, flux, titre, sous_titre=None, **kwargs):
+        super().__init__(fichier, **kwargs)
+        self.flux = flux
+        self.titre = titre
+        self.sous_titre = sous_titre
+        self.durees_pages = []
+        self._a_traiter = None
+        self._debut_page = time.perf_counter()
+
+        cadre = Frame(self.leftMargin, self.bottomMargin, self.width, self.height - HAUTEUR_ENTETE,
+                      leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0, id='lignes')
+        self.addPageTemplates([PageTemplate(id='rapport', frames=[cadre], onPage=self._dessiner_entete)])
+
+    def construire(self):
+        """Lance la génération ; le flux fournit toujours au moins un flowable"""
+        self._a_traiter = [next(self.flux)]
+        self.build(self._a_traiter)
+
+    def filterFlowables(self, flowables):
+        # Appelé avant chaque flowable traité (y compris ceux en attente de saut de page) :
+        # seule la liste principale est réalimentée, avec un bloc d'avance
+        if flowables is self._a_traiter and len(flowables) < 2:
+            suivant = next(self.flux, None)
+            if suivant is not None:
+                flowables.append(suivant)
+
+    def afterPage(self):
+        maintenant = time.perf_counter()
+        self.durees_pages.append(maintenant - self._debut_page)
+        self._debut_page = maintenant
+
+    def _dessiner_entete(self, canv, doc):
+        largeur, hauteur = self.pagesize
+        canv.saveState()
+        canv.setFont(POLICE_GRAS, 13)
+        canv.drawString(self.leftMargin, hauteur - self.topMargin - 14, self.titre)
+        canv.setFont(POLICE, 8)
+        if self.sous_titre:
+            canv.drawString(self.leftMargin, hauteur - self.topMargin - 28, self.sous_titre)
+        canv.drawRightString(largeur - self.rightMargin, self.bottomMargin - 20, f"Page {doc.page}")
+        canv.restoreState()
+
+
+def generer_pdf_tableau(fichier, titre, colonnes, lignes, largeurs=None, sous_titre=None,
+                        paysage=False, pied=None):
+    """Écrit un rapport tabulaire dans fichier (chemin ou objet fichier) et retourne ses métriques.
+
+    lignes est un itérable (requête en yield_per, générateur...) de séquences de valeurs ;
+    pied est un callable appelé une fois toutes les lignes consommées, qui retourne les
+    flowables de fin de rapport (totaux calculés au fil de l'eau par exemple).
+    """
+    taille_page = landscape(A4) if paysage else A4
+    debut = time.perf_counter()
+    poids = largeurs or [1] * len(colonnes)
+    largeur_utile = taille_page[0] - 2 * MARGE
+    largeurs_colonnes = [largeur_utile * p / sum(poids) for p in poids]
+    # Largeur moyenne d'un caractère Helvetica : environ la moitié du corps
+    caracteres = [max(int((l - 6) / (TAILLE_POLICE * 0.5)), 1) for l in largeurs_colonnes]
+
+    hauteur_cadre = taille_page[1] - 2 * MARGE - HAUTEUR_ENTETE
+    lignes_par_page = int(hauteur_cadre // HAUTEUR_LIGNE) - 1  # moins la ligne d'en-tête
+    entete = list(colonnes)
+    compteur = {'lignes': 0}
+
+    def tableau(bloc):
+        return Table([entete] + bloc, colWidths=largeurs_colonnes, rowHeights=HAUTEUR_LIGNE,
+                     repeatRows=1, style=STYLE_TABLEAU)
+
+    def flux():
+        bloc = []
+        for ligne in lignes:
+            bloc.append([_tronquer(valeur, n) for valeur, n in zip(ligne, caracteres)])
+            if len(bloc) == lignes_par_page:
+                compteur['lignes'] += len(bloc)
+                yield tableau(bloc)
+                bloc = []
+        compteur['lignes'] += len(bloc)
+        if bloc or not compteur['lignes']:
+            yield tableau(bloc or [['Aucune donnée'] + [''] * (len(colonnes) - 1)])
+        if pied is not None:
+            yield Spacer(1, 0.4 * cm)
+            yield from pied()
+
+    doc = DocumentFlux(fichier, flux(), titre, sous_titre,
+                       pagesize=taille_page, leftMargin=MARGE, rightMargin=MARGE,
+                       topMargin=MARGE, bottomMargin=MARGE, title=titre)
+    doc.construire()
+
+    durees = doc.durees_pages or [0.0]
+    return {
+        'lignes': compteur['lignes'],
+        'pages': len(doc.durees_pages),
+        'duree': time.perf_counter() - debut,
+        'duree_page_max': max(durees),
+        'duree_page_moyenne': sum(durees) / len(durees),
+    }
+
+
+def paragraphes_synthese(elements):
+    """Flowables d'un bloc de synthèse [(libellé, valeur), ...] pour le pied de rapport"""
+    style = getSampleStyleSheet()['Normal']
+    return [Paragraph(f"<b>{libelle} :</b> {valeur}", style) for libelle, valeur in elements]
+
+
+def rapport_pdf(nom_fichier, titre, colonnes, lignes, sous_titre=None, **options):
+    """Génère le rapport dans un fichier temporaire (supprimé à sa fermeture) et le renvoie en téléchargement"""
+    sous_titre = sous_titre or f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
+    fichier = tempfile.TemporaryFile(prefix='rapport_', suffix='.pdf')
+    try:
+        generer_pdf_tableau(fichier, titre, colonnes, lignes, sous_titre=sous_titre, **options)
+    except Exception:
+        fichier.close()
+        raise
+    fichier.seek(0)
+    return send_file(fichier, as_attachment=True, download_name=nom_fichier, mimetype='application/pdf')
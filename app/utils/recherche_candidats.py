@@ -0,0 +1,210 @@
+"""
+Recherche plein texte des candidats (index SQLite FTS5 local)
+
+L'index est un fichier SQLite séparé de la base principale (RECHERCHE_CANDIDATS_INDEX, par
+défaut instance/recherche_candidats.db) : une ligne par candidat, rowid = Candidat.id, sur
+le nom, l'email, le titre et le département de l'offre et le texte extrait du CV. Il est
+alimenté de façon incrémentale par le worker d'extraction (nouvelles candidatures et CV
+extraits depuis le dernier passage) ; la commande index-candidates le reconstruit.
+"""
+
+from app import db
+from app.models import Candidat, OffreEmploi, FichierCandidature
+from flask import current_app
+from markupsafe import escape, Markup
+from sqlalchemy import select, func, or_
+from datetime import datetime
+import os
+import re
+import sqlite3
+import time
+
+TAILLE_LOT = 1000
+# Poids bm25 des colonnes indexées : nom, email, titre de l'offre, département, texte du CV, offre
+POIDS_COLONNES = (8.0, 4.0, 3.0, 1.0, 1.0, 0.0)
+DEBUT_EXTRAIT, FIN_EXTRAIT = '\x02', '\x03'
+
+SCHEMA = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS candidat_fts USING fts5(
+        nom, email, titre_offre, departement, texte_cv,
+        offre,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '3'
+    )""",
+    "CREATE TABLE IF NOT EXISTS etat_index (cle TEXT PRIMARY KEY, valeur TEXT)",
+)
+
+
+def chemin_index():
+    return current_app.config.get('RECHERCHE_CANDIDATS_INDEX') or os.path.join(
+        current_app.instance_path, 'recherche_candidats.db')
+
+
+def connexion_index():
+    chemin = chemin_index()
+    os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+    connexion = sqlite3.connect(chemin, timeout=10)
+    connexion.execute('PRAGMA journal_mode=WAL')
+    for instruction in SCHEMA:
+        connexion.execute(instruction)
+    return connexion
+
+
+def _lire_etat(connexion, cle, defaut=None):
+    ligne = connexion.execute("SELECT valeur FROM etat_index WHERE cle = ?", (cle,)).fetchone()
+    return ligne[0] if ligne else defaut
+
+
+def _ecrire_etat(connexion, cle, valeur):
+    connexion.execute("INSERT OR REPLACE INTO etat_index (cle, valeur) VALUES (?, ?)", (cle, str(valeur)))
+
+
+def _documents(condition):
+    """Lignes à indexer (id, nom, email, titre, département, texte du CV, offre) lues par lots"""
+    requete = (
+        select(Candidat.id, Candidat.nom, Candidat.email, OffreEmploi.titre, OffreEmploi.departement,
+               FichierCandidature.texte, Candidat.offre_emploi_id)
+        .join(OffreEmploi, Candidat.offre_emploi_id == OffreEmploi.id)
+        .outerjoin(FichierCandidature, Candidat.cv_fichier_id == FichierCandidature.id)
+        .where(condition)
+        .order_by(Candidat.id)
+        .execution_options(yield_per=TAILLE_LOT)
+    )
+    return db.session.execute(requete)
+
+
+def _indexer(connexion, documents):
+    nombre = 0
+    for lot in documents.partitions():
+        # L'offre est indexée comme un mot (o<id>) : le filtre par offre passe par l'index
+        lignes = [tuple('' if valeur is None else valeur for valeur in ligne[:-1]) + (f'o{ligne[-1]}',)
+                  for ligne in lot]
+        # Une réindexation remplace le document existant
+        connexion.executemany("DELETE FROM candidat_fts WHERE rowid = ?", [(ligne[0],) for ligne in lignes])
+        connexion.executemany(
+            "INSERT INTO candidat_fts (rowid, nom, email, titre_offre, departement, texte_cv, offre) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)", lignes)
+        nombre += len(lignes)
+    return nombre
+
+
+def synchroniser_index():
+    """Indexe les nouvelles candidatures et réindexe celles dont le CV a été extrait depuis le
+    dernier passage. Retourne le nombre de documents écrits."""
+    connexion = connexion_index()
+    try:
+        dernier_id = int(_lire_etat(connexion, 'dernier_candidat_id', 0))
+        derniere_extraction = _lire_etat(connexion, 'derniere_extraction')
+
+        # Bornes lues avant l'indexation : ce qui arrive pendant le passage sera repris au suivant
+        max_id, max_extraction = db.session.execute(
+            select(select(func.max(Candidat.id)).scalar_subquery(),
+                   select(func.max(FichierCandidature.date_extraction)).scalar_subquery())
+        ).one()
+
+        conditions = [Candidat.id.between(dernier_id + 1, max_id or 0)]
+        if derniere_extraction:
+            fichiers_extraits = select(FichierCandidature.id).where(
+                FichierCandidature.date_extraction > datetime.fromisoformat(derniere_extraction))
+            conditions.append(Candidat.cv_fichier_id.in_(fichiers_extraits) & (Candidat.id <= dernier_id))
+        elif max_extraction:
+            conditions.append(Candidat.cv_fichier_id.isnot(None) & (Candidat.id <= dernier_id))
+
+        with connexion:
+            nombre = _indexer(connexion, _documents(or_(*conditions)))
+            _ecrire_etat(connexion, 'dernier_candidat_id', max(dernier_id, max_id or 0))
+            if max_extraction:
+                _ecrire_etat(connexion, 'derniere_extraction', max_extraction.isoformat())
+        return nombre
+    finally:
+        connexion.close()
+
+
+def reconstruire_index():
+    """Vide l'index et le reconstruit à partir de la base. Retourne le nombre de documents."""
+    connexion = connexion_index()
+    try:
+        with connexion:
+            connexion.execute("DELETE FROM candidat_fts")
+            connexion.execute("DELETE FROM etat_index")
+    finally:
+        connexion.close()
+    nombre = synchroniser_index()
+    connexion = connexion_index()
+    try:
+        connexion.execute("INSERT INTO candidat_fts (candidat_fts) VALUES ('optimize')")
+        connexion.commit()
+    finally:
+        connexion.close()
+    return nombre
+
+
+def requete_fts(texte, offre_id=None):
+    """Mots saisis -> requête FTS5 : tous les mots, le dernier pouvant être un début de mot
+    (recherche au fil de la frappe) ; la syntaxe FTS saisie est neutralisée"""
+    mots = [f'"{mot}"' for mot in re.findall(r'\w+', texte or '')]
+    if not mots:
+        return ''
+    if len(mots[-1]) >= 5:  # au moins 3 caractères entre guillemets
+        mots[-1] += '*'
+    if offre_id:
+        mots.append(f'offre : "o{int(offre_id)}"')
+    return ' '.join(mots)
+
+
+def _extrait_html(extrait):
+    return Markup(str(escape(extrait)).replace(DEBUT_EXTRAIT, '<mark>').replace(FIN_EXTRAIT, '</mark>'))
+
+
+def rechercher_candidats(texte, offre_id=None, limite=20, decalage=0):
+    """Candidats classés par pertinence (bm25) pour les mots saisis, sur une offre ou toutes.
+
+    Retourne {'resultats': [...], 'duree_ms': ...} ; les statuts et offres sont relus dans la
+    base principale pour ne jamais afficher un état périmé de l'index.
+    """
+    debut = time.perf_counter()
+    requete = requete_fts(texte, offre_id)
+    if not requete:
+        return {'resultats': [], 'duree_ms': 0.0}
+
+    sql = (f"SELECT rowid, bm25(candidat_fts, {', '.join(map(str, POIDS_COLONNES))}) AS score, "
+           f"snippet(candidat_fts, 4, ?, ?, '…', 12) "
+           "FROM candidat_fts WHERE candidat_fts MATCH ?")
+    parametres = [DEBUT_EXTRAIT, FIN_EXTRAIT, requete]
+    sql += " ORDER BY score LIMIT ? OFFSET ?"
+    parametres += [limite, decalage]
+
+    connexion = connexion_index()
+    try:
+        trouves = connexion.execute(sql, parametres).fetchall()
+    finally:
+        connexion.close()
+
+    candidats = {}
+    if trouves:
+        lignes = db.session.execute(
+            select(Candidat.id, Candidat.nom, Candidat.email, Candidat.statut, Candidat.date_soumission,
+                   Candidat.cv, OffreEmploi.id, OffreEmploi.titre)
+            .join(OffreEmploi, Candidat.offre_emploi_id == OffreEmploi.id)
+            .where(Candidat.id.in_([ligne[0] for ligne in trouves]))
+        )
+        candidats = {ligne[0]: ligne for ligne in lignes}
+
+    resultats = []
+    for candidat_id, score, extrait in trouves:
+        ligne = candidats.get(candidat_id)
+        if ligne is None:  # candidat supprimé depuis l'indexation
+            continue
+        resultats.append({
+            'id': candidat_id,
+            'nom': ligne.nom,
+            'email': ligne.email,
+            'statut': ligne.statut,
+            'date_soumission': ligne.date_soumission.isoformat() if ligne.date_soumission else None,
+            'cv': ligne.cv,
+            'offre_id': ligne[6],
+            'offre_titre': ligne.titre,
+            'score': round(-score, 3),
+            'extrait': str(_extrait_html(extrait)) if extrait else '',
+        })
+    return {'resultats': resultats, 'duree_ms': round((time.perf_counter() - debut) * 1000, 2)}
@@ -0,0 +1,78 @@
+"""
+Recalcul des scores d'évaluation en SQL
+
+Le score global est la moyenne pondérée des critères ramenée sur 100 :
+100 * Σ(score_obtenu × poids) / Σ(score_max × poids). Une seule instruction UPDATE agrège les
+critères (GROUP BY) et écrit score_global et note_finale, pour une évaluation ou pour toutes
+celles d'une année / d'un modèle. Les évaluations sans critère (ou de total nul) sont laissées
+telles quelles.
+"""
+
+from app import db
+from app.models import Evaluation, CritereEvaluation
+from sqlalchemy import select, update, func, case
+
+# Seuils de la note finale, du plus haut au plus bas (en dessous : Insuffisant)
+SEUILS_NOTES = (
+    (90, 'Excellent'),
+    (80, 'Très Bien'),
+    (70, 'Bien'),
+    (60, 'Satisfaisant'),
+)
+NOTE_INSUFFISANTE = 'Insuffisant'
+
+
+def note_finale(score):
+    """Note finale correspondant à un score sur 100"""
+    for seuil, note in SEUILS_NOTES:
+        if score >= seuil:
+            return note
+    return NOTE_INSUFFISANTE
+
+
+def _expression_note(score):
+    return case(*[(score >= seuil, note) for seuil, note in SEUILS_NOTES], else_=NOTE_INSUFFISANTE)
+
+
+def recalculer_scores(evaluation_ids=None, annee=None, template_id=None, type_evaluation=None):
+    """Recalcule score_global et note_finale des évaluations filtrées en une instruction (sans commit).
+
+    Retourne le nombre d'évaluations mises à jour.
+    """
+    poids = func.coalesce(CritereEvaluation.poids, 1.0)
+    total_max = func.sum(CritereEvaluation.score_max * poids)
+    agregats = (
+        select(CritereEvaluation.evaluation_id.label('evaluation_id'),
+               (100.0 * func.sum(CritereEvaluation.score_obtenu * poids) / total_max).label('score'))
+        .group_by(CritereEvaluation.evaluation_id)
+        .having(total_max > 0)
+    )
+    if evaluation_ids is not None:
+        agregats = agregats.where(CritereEvaluation.evaluation_id.in_(evaluation_ids))
+    agregats = agregats.subquery()
+
+    instruction = (
+        update(Evaluation)
+        .where(Evaluation.id == agregats.c.evaluation_id)
+        .values(score_global=func.round(agregats.c.score, 2), note_finale=_expression_note(agregats.c.score))
+        .execution_options(synchronize_session=False)
+    )
+    if annee is not None:
+        instruction = instruction.where(Evaluation.annee == annee)
+    if template_id is not None:
+        instruction = instruction.where(Evaluation.template_id == template_id)
+    if type_evaluation is not None:
+        instruction = instruction.where(Evaluation.type_evaluation == type_evaluation)
+
+    # Critères ajoutés / modifiés / supprimés dans la session pris en compte
+    db.session.flush()
+    resultat = db.session.execute(instruction)
+    return resultat.rowcount
+
+
+def recalculer_score(evaluation):
+    """Recalcule le score d'une évaluation et rafraîchit l'objet chargé"""
+    nombre = recalculer_scores(evaluation_ids=[evaluation.id])
+    if nombre:
+        db.session.refresh(evaluation, ['score_global', 'note_finale', 'updated_at'])
+    return nombre
@@ -0,0 +1,127 @@
+"""
+Agrégats journaliers de présence par département (table StatistiquePresenceJour)
+"""
+
+from app import db
+from app.models import Employee, StatistiquePresenceJour
+from app.utils.archivage_presences import heures_travail_periode
+from sqlalchemy import func, case
+
+STATUTS_PRESENTS = ('present', 'retard')
+
+
+def _requete_agregats(date_debut, date_fin, departement=None):
+    """Agrège les heures de travail (archives comprises) par (date, département) sur une période"""
+    heures = heures_travail_periode(date_debut, date_fin)
+    departement_col = func.coalesce(Employee.departement, '')
+    query = db.session.query(
+        heures.date_travail,
+        departement_col,
+        func.count(heures.id),
+        func.sum(case((heures.statut.in_(STATUTS_PRESENTS), 1), else_=0)),
+        func.sum(case((heures.statut == 'absent', 1), else_=0)),
+        func.sum(case((heures.statut == 'retard', 1), else_=0)),
+        func.sum(heures.heures_travaillees),
+        func.sum(heures.heures_supplementaires),
+        func.sum(heures.retard_minutes),
+        func.sum(case((heures.statut == 'retard', heures.retard_minutes), else_=0)),
+    ).join(Employee, heures.employe_id == Employee.id).filter(
+        heures.date_travail >= date_debut,
+        heures.date_travail <= date_fin
+    )
+    if departement is not None:
+        query = query.filter(departement_col == departement)
+    return query.group_by(heures.date_travail, departement_col)
+
+
+def _enregistrer_agregats(lignes, date_debut, date_fin, departement=None):
+    """Remplace les faits de la période par les agrégats calculés (sans commit)"""
+    query = StatistiquePresenceJour.query.filter(
+        StatistiquePresenceJour.date_travail >= date_debut,
+        StatistiquePresenceJour.date_travail <= date_fin
+    )
+    if departement is not None:
+        query = query.filter(StatistiquePresenceJour.departement == departement)
+    existants = {(s.date_travail, s.departement): s for s in query.all()}
+
+    for date_travail, dept, total, presents, absents, retards, heures, heures_sup, retard, retard_retards in lignes:
+        stat = existants.pop((date_travail, dept), None)
+        if stat is None:
+            stat = StatistiquePresenceJour(date_travail=date_travail, departement=dept)
+            db.session.add(stat)
+        stat.nb_enregistrements = total or 0
+        stat.nb_presents = presents or 0
+        stat.nb_absents = absents or 0
+        stat.nb_retards = retards or 0
+        stat.heures_travaillees = heures or 0.0
+        stat.heures_supplementaires = heures_sup or 0.0
+        stat.retard_minutes = retard or 0
+        stat.retard_minutes_retards = retard_retards or 0
+
+    # Jours/départements qui n'ont plus aucune ligne d'heures
+    for stat in existants.values():
+        db.session.delete(stat)
+
+    return len(lignes)
+
+
+def actualiser_statistiques_presence(date_travail, employe_id=None):
+    """Recalcule les faits d'un jour, limités au département de l'employé si fourni (sans commit)"""
+    departement = None
+    if employe_id is not None:
+        departement = db.session.query(
+            func.coalesce(Employee.departement, '')
+        ).filter(Employee.id == employe_id).scalar()
+
+    lignes = _requete_agregats(date_travail, date_travail, departement).all()
+    return _enregistrer_agregats(lignes, date_travail, date_travail, departement)
+
+
+def reconstruire_statistiques_presence(date_debut=None, date_fin=None):
+    """Reconstruit la table de faits sur une période (toute l'historique par défaut, sans commit)"""
+    if date_debut is None or date_fin is None:
+        heures = heures_travail_periode(date_debut, date_fin)
+        premiere, derniere = db.session.query(
+            func.min(heures.date_travail), func.max(heures.date_travail)
+        ).one()
+        date_debut = date_debut or premiere
+        date_fin = date_fin or derniere
+    if date_debut is None or date_fin is None:
+        return 0
+
+    lignes = _requete_agregats(date_debut, date_fin).all()
+    return _enregistrer_agregats(lignes, date_debut, date_fin)
+
+
+def statistiques_presence_periode(date_debut=None, date_fin=None, departement=None):
+    """Somme des faits journaliers sur une période (bornes incluses, optionnelles)"""
+    query = db.session.query(
+        func.coalesce(func.sum(StatistiquePresenceJour.nb_enregistrements), 0),
+        func.coalesce(func.sum(StatistiquePresenceJour.nb_presents), 0),
+        func.coalesce(func.sum(StatistiquePresenceJour.nb_absents), 0),
+        func.coalesce(func.sum(StatistiquePresenceJour.nb_retards), 0),
+        func.coalesce(func.sum(StatistiquePresenceJour.heures_travaillees), 0.0),
+        func.coalesce(func.sum(StatistiquePresenceJour.heures_supplementaires), 0.0),
+        func.coalesce(func.sum(StatistiquePresenceJour.retard_minutes), 0),
+        func.coalesce(func.sum(StatistiquePresenceJour.retard_minutes_retards), 0),
+    )
+    if date_debut is not None:
+        query = query.filter(StatistiquePresenceJour.date_travail >= date_debut)
+    if date_fin is not None:
+        query = query.filter(StatistiquePresenceJour.date_travail <= date_fin)
+    if departement is not None:
+        query = query.filter(StatistiquePresenceJour.departement == departement)
+
+    total, presents, absents, retards, heures, heures_sup, retard, retard_retards = query.one()
+    return {
+        'nb_enregistrements': total,
+        'nb_presents': presents,
+        'nb_absents': absents,
+        'nb_retards': retards,
+        'heures_travaillees': heures,
+        'heures_supplementaires': heures_sup,
+        'retard_minutes': retard,
+        'moyenne_retard': retard / total if total else 0,
+        'moyenne_retard_retards': retard_retards / retards if retards else 0,
+        'taux_presence': presents / max(total, 1) * 100,
+    }
@@ -0,0 +1,180 @@
+"""
+Synchronisation des bornes de pointage hors ligne (journaux horodatés et numérotés)
+"""
+
+from app import db
+from app.models import Pointage, Employee, ArchivePresence
+from app.utils.archivage_presences import debut_zone_chaude
+from app.utils.geofence import valider_positions, MOTIF_HORS_ZONE, lire_coordonnee
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+from datetime import datetime, timedelta
+
+TYPES_POINTAGE = ('entree', 'sortie', 'pause_debut', 'pause_fin')
+TAILLE_LOT_MAX = 5000
+# Tolérance pour un horodatage corrigé légèrement postérieur à l'heure du serveur
+AVANCE_MAX = timedelta(minutes=5)
+
+
+def lire_horodatage(valeur):
+    """Horodatage ISO 8601 ou epoch (secondes ou millisecondes) -> datetime local naïf"""
+    if valeur is None or valeur == '':
+        return None
+    if isinstance(valeur, bool):
+        raise ValueError("Horodatage invalide")
+    if isinstance(valeur, (int, float)):
+        return datetime.fromtimestamp(valeur / 1000 if valeur > 1e11 else valeur)
+    horodatage = datetime.fromisoformat(str(valeur))
+    if horodatage.tzinfo is not None:
+        horodatage = horodatage.astimezone().replace(tzinfo=None)
+    return horodatage
+
+
+def _entier(valeur):
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        return None
+
+
+def synchroniser_borne(borne, horloge_appareil, pointages, ip_address=None, user_agent=None, maintenant=None):
+    """Intègre un lot de pointages d'une borne (sans commit).
+
+    Les séquences déjà reçues sont ignorées, les horodatages sont corrigés du décalage
+    d'horloge mesuré à l'envoi et le curseur d'acquittement avance jusqu'à la dernière
+    séquence contiguë reçue. Retourne le bilan, les journées (employé, date) à recalculer et
+    les Pointage créés.
+    """
+    maintenant = maintenant or datetime.now()
+    if horloge_appareil is not None:
+        borne.decalage_secondes = (maintenant - horloge_appareil).total_seconds()
+    decalage = timedelta(seconds=round(borne.decalage_secondes or 0.0))
+
+    recus = {}
+    rejetes = []
+    doublons = 0
+    for pointage in pointages:
+        sequence = _entier(pointage.get('sequence')) if isinstance(pointage, dict) else None
+        if sequence is None or sequence <= 0:
+            rejetes.append({'sequence': pointage.get('sequence') if isinstance(pointage, dict) else None,
+                            'erreur': 'Séquence invalide'})
+        elif sequence <= borne.dernier_sequence or sequence in recus:
+            doublons += 1
+        else:
+            recus[sequence] = pointage
+
+    deja_recus = set()
+    employes = set()
+    if recus:
+        deja_recus = {sequence for (sequence,) in db.session.query(Pointage.sequence).filter(
+            Pointage.borne_id == borne.id,
+            Pointage.sequence.in_(list(recus))
+        ).all()}
+        ids_demandes = {_entier(p.get('employe_id')) for p in recus.values()} - {None}
+        if ids_demandes:
+            employes = {employe_id for (employe_id,) in db.session.query(Employee.id).filter(
+                Employee.id.in_(ids_demandes)
+            ).all()}
+    doublons += len(deja_recus)
+
+    horodatages = {}
+    for sequence, pointage in recus.items():
+        try:
+            horodatages[sequence] = lire_horodatage(pointage.get('horodatage'))
+        except (TypeError, ValueError, OverflowError, OSError):
+            horodatages[sequence] = None
+
+    # Mois archivés : une seule lecture du manifeste, seulement pour un lot remontant avant la zone chaude
+    zone_chaude = debut_zone_chaude(maintenant.date())
+    mois_archives = set()
+    if any(h is not None and (h + decalage).date() < zone_chaude for h in horodatages.values()):
+        mois_archives = set(db.session.query(ArchivePresence.annee, ArchivePresence.mois).distinct().all())
+
+    lignes = []
+    traites = set(deja_recus)
+    for sequence, pointage in recus.items():
+        if sequence in deja_recus:
+            continue
+        traites.add(sequence)
+
+        horodatage = horodatages[sequence]
+        employe_id = _entier(pointage.get('employe_id'))
+
+        erreur = None
+        if horodatage is None:
+            erreur = 'Horodatage invalide'
+        elif pointage.get('type_pointage') not in TYPES_POINTAGE:
+            erreur = 'Type de pointage invalide'
+        elif employe_id not in employes:
+            erreur = 'Employé inconnu'
+        else:
+            corrige = (horodatage + decalage).replace(microsecond=0)
+            if corrige > maintenant + AVANCE_MAX:
+                erreur = 'Horodatage dans le futur'
+            elif corrige.date() < zone_chaude and (corrige.year, corrige.month) in mois_archives:
+                erreur = 'Période archivée'
+        if erreur:
+            rejetes.append({'sequence': sequence, 'erreur': erreur})
+            continue
+
+        lignes.append({
+            'employe_id': employe_id,
+            'date_pointage': corrige.date(),
+            'heure_pointage': corrige.time(),
+            'type_pointage': pointage['type_pointage'],
+            'methode': str(pointage.get('methode') or 'borne')[:50],
+            'latitude': lire_coordonnee(pointage.get('latitude')),
+            'longitude': lire_coordonnee(pointage.get('longitude')),
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'valide': True,
+            'site_id': None,
+            'commentaire': None,
+            'borne_id': borne.id,
+            'sequence': sequence,
+            'horodatage_appareil': horodatage,
+            'timestamp_creation': maintenant,
+        })
+
+    # Validation géographique du lot en une passe vectorisée
+    hors_zone = 0
+    positions = valider_positions([(ligne['latitude'], ligne['longitude']) for ligne in lignes])
+    for ligne, (valide, site_id) in zip(lignes, positions):
+        ligne['site_id'] = site_id
+        if not valide:
+            ligne['valide'] = False
+            ligne['commentaire'] = MOTIF_HORS_ZONE
+            hors_zone += 1
+
+    # Insertion dans l'ordre chronologique corrigé, quel que soit l'ordre d'arrivée
+    lignes.sort(key=lambda ligne: (ligne['date_pointage'], ligne['heure_pointage'], ligne['sequence']))
+    crees = []
+    if lignes:
+        db.session.execute(insert(Pointage), lignes)
+        # Relecture en une requête (sans RETURNING, non portable) pour la diffusion en direct
+        crees = Pointage.query.options(joinedload(Pointage.employe)).filter(
+            Pointage.borne_id == borne.id,
+            Pointage.sequence.in_([ligne['sequence'] for ligne in lignes])
+        ).order_by(Pointage.date_pointage, Pointage.heure_pointage, Pointage.sequence).all()
+
+    # Curseur : dernière séquence contiguë parmi ce lot et les séquences reçues non encore acquittées
+    en_attente = traites | {sequence for (sequence,) in db.session.query(Pointage.sequence).filter(
+        Pointage.borne_id == borne.id,
+        Pointage.sequence > borne.dernier_sequence
+    ).all()}
+    curseur = borne.dernier_sequence
+    while curseur + 1 in en_attente:
+        curseur += 1
+    borne.dernier_sequence = curseur
+    borne.date_derniere_synchro = maintenant
+
+    return {
+        'ack': curseur,
+        'acceptes': len(lignes),
+        'doublons': doublons,
+        'hors_zone': hors_zone,
+        'rejetes': rejetes,
+        'decalage_secondes': round(borne.decalage_secondes or 0.0, 3),
+        'journees': sorted({(ligne['employe_id'], ligne['date_pointage']) for ligne in lignes}),
+        'pointages': crees,
+    }
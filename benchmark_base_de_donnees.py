@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark de concurrence en écriture sur la base de données
+Simule plusieurs workers (comme gunicorn) qui enregistrent des pointages en parallèle
+et compare le journal SQLite par défaut (DELETE) avec le mode WAL + busy_timeout.
+
+Usage : python benchmark_base_de_donnees.py [--workers 4] [--ecritures 200]
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+import multiprocessing
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.models import Pointage
+from app.utils.database import configurer_base_de_donnees
+
+SCENARIOS = {
+    'defaut (DELETE)': {
+        'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_BUSY_TIMEOUT': 0, 'SQLITE_MMAP_SIZE': 0,
+    },
+    'WAL + busy_timeout': {
+        'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_SYNCHRONOUS': 'NORMAL',
+        'SQLITE_BUSY_TIMEOUT': 5000, 'SQLITE_MMAP_SIZE': 268435456,
+    },
+}
+
+
+def creer_app_benchmark(uri, reglages):
+    """Application minimale reprenant la configuration base de données de create_app"""
+    app = Flask(__name__)
+    app.config.from_object('config.Config')
+    app.config['SQLALCHEMY_DATABASE_URI'] = uri
+    app.config.update(reglages)
+    db.init_app(app)
+    configurer_base_de_donnees(app, db)
+    return app
+
+
+def worker(uri, reglages, numero, nb_ecritures, depart, resultats):
+    """Enregistre des pointages un par un, avec un commit par pointage"""
+    app = creer_app_benchmark(uri, reglages)
+    reussites = 0
+    verrous = 0
+    with app.app_context():
+        depart.wait()
+        for i in range(nb_ecritures):
+            try:
+                db.session.add(Pointage(
+                    employe_id=numero + 1,
+                    date_pointage=date.today(),
+                    heure_pointage=datetime.now().time(),
+                    type_pointage='entree' if i % 2 == 0 else 'sortie',
+                    methode='benchmark',
+                ))
+                db.session.commit()
+                reussites += 1
+            except OperationalError:
+                db.session.rollback()
+                verrous += 1
+    resultats.put((reussites, verrous))
+
+
+def executer_scenario(nom, reglages, nb_workers, nb_ecritures):
+    """Lance les workers sur une base neuve et mesure le débit d'écriture"""
+    dossier = tempfile.mkdtemp(prefix='rh_bench_')
+    uri = f"sqlite:///{os.path.join(dossier, 'bench.db')}"
+
+    app = creer_app_benchmark(uri, reglages)
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+    depart = multiprocessing.Event()
+    resultats = multiprocessing.Queue()
+    processus = [
+        multiprocessing.Process(target=worker, args=(uri, reglages, n, nb_ecritures, depart, resultats))
+        for n in range(nb_workers)
+    ]
+    for p in processus:
+        p.start()
+
+    debut = time.perf_counter()
+    depart.set()
+    bilans = [resultats.get() for _ in processus]
+    duree = time.perf_counter() - debut
+    for p in processus:
+        p.join()
+
+    reussites = sum(b[0] for b in bilans)
+    verrous = sum(b[1] for b in bilans)
+    return {
+        'scenario': nom,
+        'reussites': reussites,
+        'verrous': verrous,
+        'duree': duree,
+        'debit': reussites / duree if duree else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concurrence en écriture SQLite")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--ecritures', type=int, default=200, help="Écritures par worker")
+    args = parser.parse_args()
+
+    print("🏁 Benchmark de concurrence en écriture")
+    print(f"   {args.workers} workers x {args.ecritures} pointages (un commit par pointage)")
+    print("=" * 70)
+    print(f"{'Scénario':<22}{'Réussites':>10}{'Verrous':>10}{'Durée (s)':>12}{'Écritures/s':>14}")
+    for nom, reglages in SCENARIOS.items():
+        r = executer_scenario(nom, reglages, args.workers, args.ecritures)
+        print(f"{r['scenario']:<22}{r['reussites']:>10}{r['verrous']:>10}{r['duree']:>12.2f}{r['debit']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
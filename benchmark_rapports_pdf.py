@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark du moteur PDF paginé des rapports (app/utils/rapports_pdf.py)
+Génère des rapports de présence synthétiques de 10 000 et 100 000 lignes dans un fichier
+temporaire et mesure la durée totale, le débit, le temps de rendu par page et la mémoire.
+
+Usage : python benchmark_rapports_pdf.py [--lignes 10000 100000] [--memoire]
+"""
+
+import sys
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, time as heure, timedelta
+
+from app.utils.rapports_pdf import generer_pdf_tableau, paragraphes_synthese
+
+COLONNES = ['Employé', 'Date', 'Arrivée', 'Départ', 'Heures', 'Heures sup.', 'Retard (min)', 'Statut']
+LARGEURS = [5, 2, 1.5, 1.5, 1.5, 1.5, 1.5, 2]
+STATUTS = ['present', 'present', 'present', 'retard', 'absent']
+
+
+def lignes_synthetiques(nb_lignes):
+    """Lignes de présence générées à la volée (aucune liste complète en mémoire)"""
+    debut = date(2026, 1, 1)
+    for i in range(nb_lignes):
+        retard = (i * 7) % 25 if i % 4 == 0 else 0
+        yield (
+            f"Employé {i % 500:03d} Nom-de-famille-{i % 97}",
+            (debut + timedelta(days=i // 500)).strftime('%d/%m/%Y'),
+            heure(8, retard).strftime('%H:%M'),
+            heure(17, (i * 13) % 60).strftime('%H:%M'),
+            7.5 + (i % 5) * 0.25,
+            (i % 5) * 0.25,
+            retard,
+            STATUTS[i % len(STATUTS)],
+        )
+
+
+def executer(nb_lignes, memoire):
+    """Génère un rapport de nb_lignes lignes dans un fichier temporaire et retourne ses métriques"""
+    dossier = tempfile.mkdtemp(prefix='rh_bench_pdf_')
+    chemin = os.path.join(dossier, f'rapport_{nb_lignes}.pdf')
+
+    if memoire:
+        tracemalloc.start()
+    debut = time.perf_counter()
+    metriques = generer_pdf_tableau(
+        chemin, 'Rapport de présence (benchmark)', COLONNES, lignes_synthetiques(nb_lignes),
+        largeurs=LARGEURS, paysage=True,
+        pied=lambda: paragraphes_synthese([('Lignes', nb_lignes)])
+    )
+    duree = time.perf_counter() - debut
+    pic = None
+    if memoire:
+        pic = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    metriques.update({
+        'duree': duree,
+        'debit': nb_lignes / duree if duree else 0,
+        'taille': os.path.getsize(chemin),
+        'pic_memoire': pic,
+    })
+    os.remove(chemin)
+    os.rmdir(dossier)
+    return metriques
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du moteur PDF paginé")
+    parser.add_argument('--lignes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--memoire', action='store_true',
+                        help="Mesurer le pic mémoire Python (tracemalloc, ralentit le rendu)")
+    args = parser.parse_args()
+
+    print("🏁 Benchmark du moteur PDF paginé (ReportLab platypus, un tableau par page)")
+    print("=" * 96)
+    print(f"{'Lignes':>8}{'Pages':>8}{'Durée (s)':>11}{'Lignes/s':>11}{'Page moy. (ms)':>16}"
+          f"{'Page max (ms)':>15}{'Taille (Mo)':>13}{'Pic mém. (Mo)':>14}")
+    for nb_lignes in args.lignes:
+        r = executer(nb_lignes, args.memoire)
+        pic = f"{r['pic_memoire'] / 1048576:>14.1f}" if r['pic_memoire'] is not None else f"{'-':>14}"
+        print(f"{r['lignes']:>8}{r['pages']:>8}{r['duree']:>11.2f}{r['debit']:>11.0f}"
+              f"{r['duree_page_moyenne'] * 1000:>16.2f}{r['duree_page_max'] * 1000:>15.2f}"
+              f"{r['taille'] / 1048576:>13.2f}{pic}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,93 @@
 import os
 
+
+def _env_int(nom, defaut):
+    """Lit un entier depuis l'environnement"""
+    return int(os.environ.get(nom, defaut))
+
+
+def _env_bool(nom, defaut):
+    """Lit un booléen depuis l'environnement"""
+    valeur = os.environ.get(nom)
+    if valeur is None:
+        return defaut
+    return valeur.strip().lower() in ('1', 'true', 'yes', 'on', 'oui')
+
+
+def _engine_options(uri):
+    """Options du moteur SQLAlchemy (pool de connexions) selon le type de base"""
+    options = {
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+    }
+    # Une base SQLite en mémoire utilise un pool statique sans taille configurable
+    if uri.startswith('sqlite') and (uri in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in uri):
+        return options
+    options.update({
+        'pool_size': _env_int('DB_POOL_SIZE', 10),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+    })
+    return options
+
+
 class Config:
-    SECRET_KEY = 'flask_key'
-    # SQLALCHEMY_DATABASE_URI = 'mysql+pymysql://kalash_mdb:@localhost/rh_manager_db'
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///rh_manager.db'
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'flask_key')
+    # Exemple MySQL : DATABASE_URL='mysql+pymysql://kalash_mdb:@localhost/rh_manager_db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///rh_manager.db')
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Réplique de lecture pour les tableaux de bord, rapports et exports (vues @lecture_replica)
+    SQLALCHEMY_REPLICA_URI = os.environ.get('DATABASE_REPLICA_URL')
+    SQLALCHEMY_REPLICA_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_REPLICA_URI or '')
+    # Sans réplique : connexion SQLite en lecture seule sur le fichier principal (mode WAL)
+    SQLITE_LECTURE_SEULE = _env_bool('SQLITE_LECTURE_SEULE', False)
+    REPLICA_HEALTHCHECK_INTERVAL = _env_int('REPLICA_HEALTHCHECK_INTERVAL', 30)  # secondes
+
+    # Réglages SQLite appliqués à chaque connexion (ignorés pour les autres bases)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT = _env_int('SQLITE_BUSY_TIMEOUT', 5000)  # millisecondes
+    SQLITE_MMAP_SIZE = _env_int('SQLITE_MMAP_SIZE', 268435456)  # 256 Mo
+
+    # Flux temps réel du tableau de bord des présences (commentaire de maintien toutes les N secondes)
+    PRESENCES_SSE_HEARTBEAT = _env_int('PRESENCES_SSE_HEARTBEAT', 15)
+    # Durée de vie de l'index des sites pour la validation GPS (reconstruit aussi à chaque modification)
+    GEOFENCE_CACHE_SECONDES = _env_int('GEOFENCE_CACHE_SECONDES', 300)
+
+    # Instantanés analytiques Parquet (par défaut dans instance/instantanes)
+    INSTANTANES_REPERTOIRE = os.environ.get('INSTANTANES_REPERTOIRE')
+    INSTANTANES_CONSERVES = _env_int('INSTANTANES_CONSERVES', 3)
+    # Au-delà, les endpoints analytiques se replient sur la base (export nocturne manqué)
+    INSTANTANES_AGE_MAX_HEURES = _env_int('INSTANTANES_AGE_MAX_HEURES', 36)
+
+    # Génération en lot des bulletins PDF par 'flask generate-payslips' (0 : un processus par cœur) ;
+    # le téléchargement depuis l'interface rend toujours dans le processus web
+    ENTREPRISE_NOM = os.environ.get('ENTREPRISE_NOM', 'RH Manager')
+    BULLETINS_PDF_PROCESSUS = _env_int('BULLETINS_PDF_PROCESSUS', 0)
+
+    # Cache disque des rapports téléchargés (par défaut dans instance/cache_rapports)
+    CACHE_RAPPORTS_ACTIF = _env_bool('CACHE_RAPPORTS_ACTIF', True)
+    CACHE_RAPPORTS_REPERTOIRE = os.environ.get('CACHE_RAPPORTS_REPERTOIRE')
+    CACHE_RAPPORTS_TAILLE_MO = _env_int('CACHE_RAPPORTS_TAILLE_MO', 500)
+
+    # Candidatures publiques : taille maximale de chaque PDF déposé (CV, lettre)
+    CANDIDATURE_TAILLE_MAX_MO = _env_int('CANDIDATURE_TAILLE_MAX_MO', 5)
+    # Index FTS5 de recherche des candidats (par défaut instance/recherche_candidats.db)
+    RECHERCHE_CANDIDATS_INDEX = os.environ.get('RECHERCHE_CANDIDATS_INDEX')
+
+    # Planification des entretiens : plage horaire proposée et durée maximale (minutes)
+    ENTRETIENS_HEURE_DEBUT = _env_int('ENTRETIENS_HEURE_DEBUT', 8)
+    ENTRETIENS_HEURE_FIN = _env_int('ENTRETIENS_HEURE_FIN', 18)
+    ENTRETIEN_DUREE_MAX = _env_int('ENTRETIEN_DUREE_MAX', 480)
+
+    # Analytique des évaluations : rechargement complet du cache mémoire (secondes)
+    ANALYTIQUE_EVALUATIONS_RECHARGEMENT = _env_int('ANALYTIQUE_EVALUATIONS_RECHARGEMENT', 3600)
+
     MAIL_SERVER = 'smtp.gmail.com'
     MAIL_PORT = 587
     MAIL_USE_TLS = True
     MAIL_USERNAME = 'gptc33074@gmail.com'
     MAIL_PASSWORD = 'Mail_App_PassWord'
     MAIL_DEFAULT_SENDER = 'gptc33074@gmail.com'
-
@@ -1,4 +1,5 @@
 import logging
+import re
 from logging.config import fileConfig
 
 from flask import current_app
@@ -51,6 +52,16 @@ def get_metadata():
     return target_db.metadata
 
 
+# Les tables d'archive annuelles des présences sont créées à la demande, hors migrations
+TABLES_ARCHIVE = re.compile(r'^(pointage|heures_travail)_archive_\d{4}$')
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    if type_ == 'table' and reflected and compare_to is None and TABLES_ARCHIVE.match(name):
+        return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -93,6 +104,8 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
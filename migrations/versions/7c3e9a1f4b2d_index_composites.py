@@ -0,0 +1,110 @@
+"""index composites sur les colonnes de filtrage frequentes
+
+Revision ID: 7c3e9a1f4b2d
+Revises: 554d9222fed2
+Create Date: 2026-10-19 09:12:04.318221
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c3e9a1f4b2d'
+down_revision = '554d9222fed2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('employee', schema=None) as batch_op:
+        batch_op.create_index('idx_employee_statut_departement', ['statut', 'departement'], unique=False)
+        batch_op.create_index('idx_employee_departement', ['departement'], unique=False)
+
+    with op.batch_alter_table('absence', schema=None) as batch_op:
+        batch_op.create_index('idx_absence_date', ['date_absence'], unique=False)
+        batch_op.create_index('idx_absence_etat_date', ['etat', 'date_absence'], unique=False)
+        batch_op.create_index('idx_absence_employe_date', ['employe_id', 'date_absence'], unique=False)
+
+    with op.batch_alter_table('conge', schema=None) as batch_op:
+        batch_op.create_index('idx_conge_statut_dates', ['statut', 'date_debut', 'date_fin'], unique=False)
+        batch_op.create_index('idx_conge_employe_statut', ['employe_id', 'statut'], unique=False)
+
+    with op.batch_alter_table('evaluation', schema=None) as batch_op:
+        batch_op.create_index('idx_evaluation_annee_statut', ['annee', 'statut'], unique=False)
+        batch_op.create_index('idx_evaluation_employe_annee', ['employe_id', 'annee'], unique=False)
+
+    with op.batch_alter_table('critere_evaluation', schema=None) as batch_op:
+        batch_op.create_index('idx_critere_evaluation', ['evaluation_id', 'section', 'ordre'], unique=False)
+
+    with op.batch_alter_table('historique_conge', schema=None) as batch_op:
+        batch_op.create_index('idx_historique_conge_date', ['conge_id', 'date_action'], unique=False)
+
+    with op.batch_alter_table('employee_history', schema=None) as batch_op:
+        batch_op.create_index('idx_employee_history_employee_date', ['employee_id', 'date_modification'], unique=False)
+
+    with op.batch_alter_table('notification_presence', schema=None) as batch_op:
+        batch_op.create_index('idx_notif_statut_date', ['statut', 'date_reference'], unique=False)
+
+    with op.batch_alter_table('bulletin_paie', schema=None) as batch_op:
+        batch_op.create_index('idx_bulletin_statut', ['statut'], unique=False)
+
+    with op.batch_alter_table('element_paie', schema=None) as batch_op:
+        batch_op.create_index('idx_element_paie_bulletin_type', ['bulletin_id', 'type_element'], unique=False)
+
+    with op.batch_alter_table('historique_paie', schema=None) as batch_op:
+        batch_op.create_index('idx_historique_paie_bulletin_date', ['bulletin_id', 'date_action'], unique=False)
+
+    with op.batch_alter_table('avance_salaire', schema=None) as batch_op:
+        batch_op.create_index('idx_avance_employe_statut', ['employe_id', 'statut'], unique=False)
+        batch_op.create_index('idx_avance_statut_date', ['statut', 'date_demande'], unique=False)
+
+    with op.batch_alter_table('remboursement_avance', schema=None) as batch_op:
+        batch_op.create_index('idx_remboursement_bulletin', ['bulletin_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('remboursement_avance', schema=None) as batch_op:
+        batch_op.drop_index('idx_remboursement_bulletin')
+
+    with op.batch_alter_table('avance_salaire', schema=None) as batch_op:
+        batch_op.drop_index('idx_avance_statut_date')
+        batch_op.drop_index('idx_avance_employe_statut')
+
+    with op.batch_alter_table('historique_paie', schema=None) as batch_op:
+        batch_op.drop_index('idx_historique_paie_bulletin_date')
+
+    with op.batch_alter_table('element_paie', schema=None) as batch_op:
+        batch_op.drop_index('idx_element_paie_bulletin_type')
+
+    with op.batch_alter_table('bulletin_paie', schema=None) as batch_op:
+        batch_op.drop_index('idx_bulletin_statut')
+
+    with op.batch_alter_table('notification_presence', schema=None) as batch_op:
+        batch_op.drop_index('idx_notif_statut_date')
+
+    with op.batch_alter_table('employee_history', schema=None) as batch_op:
+        batch_op.drop_index('idx_employee_history_employee_date')
+
+    with op.batch_alter_table('historique_conge', schema=None) as batch_op:
+        batch_op.drop_index('idx_historique_conge_date')
+
+    with op.batch_alter_table('critere_evaluation', schema=None) as batch_op:
+        batch_op.drop_index('idx_critere_evaluation')
+
+    with op.batch_alter_table('evaluation', schema=None) as batch_op:
+        batch_op.drop_index('idx_evaluation_employe_annee')
+        batch_op.drop_index('idx_evaluation_annee_statut')
+
+    with op.batch_alter_table('conge', schema=None) as batch_op:
+        batch_op.drop_index('idx_conge_employe_statut')
+        batch_op.drop_index('idx_conge_statut_dates')
+
+    with op.batch_alter_table('absence', schema=None) as batch_op:
+        batch_op.drop_index('idx_absence_employe_date')
+        batch_op.drop_index('idx_absence_etat_date')
+        batch_op.drop_index('idx_absence_date')
+
+    with op.batch_alter_table('employee', schema=None) as batch_op:
+        batch_op.drop_index('idx_employee_departement')
+        batch_op.drop_index('idx_employee_statut_departement')
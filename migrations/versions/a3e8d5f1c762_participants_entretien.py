@@ -0,0 +1,39 @@
+"""participants des entretiens (occupations indexées par employé)
+
+Revision ID: a3e8d5f1c762
+Revises: f7d3c1b8e246
+Create Date: 2026-10-19 21:04:36.551870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3e8d5f1c762'
+down_revision = 'f7d3c1b8e246'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('participant_entretien',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entretien_id', sa.Integer(), nullable=False),
+    sa.Column('employe_id', sa.Integer(), nullable=False),
+    sa.Column('debut', sa.DateTime(), nullable=False),
+    sa.Column('fin', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['employe_id'], ['employee.id'], ),
+    sa.ForeignKeyConstraint(['entretien_id'], ['entretien.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('entretien_id', 'employe_id', name='unique_participant_entretien')
+    )
+    with op.batch_alter_table('participant_entretien', schema=None) as batch_op:
+        batch_op.create_index('idx_participant_employe_debut', ['employe_id', 'debut'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('participant_entretien', schema=None) as batch_op:
+        batch_op.drop_index('idx_participant_employe_debut')
+
+    op.drop_table('participant_entretien')
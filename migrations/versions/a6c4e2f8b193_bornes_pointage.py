@@ -0,0 +1,49 @@
+"""bornes de pointage hors ligne et séquences de synchronisation
+
+Revision ID: a6c4e2f8b193
+Revises: f3b8d1c7a925
+Create Date: 2026-10-19 17:02:44.905613
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c4e2f8b193'
+down_revision = 'f3b8d1c7a925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('borne_pointage',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('identifiant', sa.String(length=50), nullable=False),
+    sa.Column('nom', sa.String(length=100), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=True),
+    sa.Column('dernier_sequence', sa.Integer(), nullable=False),
+    sa.Column('decalage_secondes', sa.Float(), nullable=False),
+    sa.Column('date_derniere_synchro', sa.DateTime(), nullable=True),
+    sa.Column('date_creation', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('identifiant')
+    )
+
+    with op.batch_alter_table('pointage', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('borne_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('sequence', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('horodatage_appareil', sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key('fk_pointage_borne', 'borne_pointage', ['borne_id'], ['id'])
+        batch_op.create_unique_constraint('unique_pointage_borne_sequence', ['borne_id', 'sequence'])
+
+
+def downgrade():
+    with op.batch_alter_table('pointage', schema=None) as batch_op:
+        batch_op.drop_constraint('unique_pointage_borne_sequence', type_='unique')
+        batch_op.drop_constraint('fk_pointage_borne', type_='foreignkey')
+        batch_op.drop_column('horodatage_appareil')
+        batch_op.drop_column('sequence')
+        batch_op.drop_column('borne_id')
+
+    op.drop_table('borne_pointage')
@@ -0,0 +1,61 @@
+"""table de faits statistique_presence_jour
+
+Revision ID: b81f4d2c6e0a
+Revises: 7c3e9a1f4b2d
+Create Date: 2026-10-19 14:03:51.802114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b81f4d2c6e0a'
+down_revision = '7c3e9a1f4b2d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('statistique_presence_jour',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('date_travail', sa.Date(), nullable=False),
+    sa.Column('departement', sa.String(length=50), nullable=False),
+    sa.Column('nb_enregistrements', sa.Integer(), nullable=False),
+    sa.Column('nb_presents', sa.Integer(), nullable=False),
+    sa.Column('nb_absents', sa.Integer(), nullable=False),
+    sa.Column('nb_retards', sa.Integer(), nullable=False),
+    sa.Column('heures_travaillees', sa.Float(), nullable=False),
+    sa.Column('heures_supplementaires', sa.Float(), nullable=False),
+    sa.Column('retard_minutes', sa.Integer(), nullable=False),
+    sa.Column('retard_minutes_retards', sa.Integer(), nullable=False),
+    sa.Column('date_mise_a_jour', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('date_travail', 'departement', name='unique_statistique_date_departement')
+    )
+
+    # Historique existant : mêmes agrégats que reconstruire_statistiques_presence()
+    op.execute("""
+        INSERT INTO statistique_presence_jour (
+            date_travail, departement, nb_enregistrements, nb_presents, nb_absents, nb_retards,
+            heures_travaillees, heures_supplementaires, retard_minutes, retard_minutes_retards,
+            date_mise_a_jour)
+        SELECT h.date_travail,
+               COALESCE(e.departement, ''),
+               COUNT(h.id),
+               SUM(CASE WHEN h.statut IN ('present', 'retard') THEN 1 ELSE 0 END),
+               SUM(CASE WHEN h.statut = 'absent' THEN 1 ELSE 0 END),
+               SUM(CASE WHEN h.statut = 'retard' THEN 1 ELSE 0 END),
+               COALESCE(SUM(h.heures_travaillees), 0),
+               COALESCE(SUM(h.heures_supplementaires), 0),
+               COALESCE(SUM(h.retard_minutes), 0),
+               COALESCE(SUM(CASE WHEN h.statut = 'retard' THEN h.retard_minutes ELSE 0 END), 0),
+               CURRENT_TIMESTAMP
+        FROM heures_travail h
+        JOIN employee e ON e.id = h.employe_id
+        GROUP BY h.date_travail, COALESCE(e.departement, '')
+    """)
+
+
+def downgrade():
+    op.drop_table('statistique_presence_jour')
@@ -0,0 +1,43 @@
+"""date de modification des absences, congés et présences (jeton du cache des rapports)
+
+Revision ID: c2b7e4a9d518
+Revises: a3e8d5f1c762
+Create Date: 2026-10-19 22:10:12.418305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2b7e4a9d518'
+down_revision = 'a3e8d5f1c762'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('absence', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('date_modification', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('conge', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('date_modification', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('presence', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('date_modification', sa.DateTime(), nullable=True))
+
+    # Lignes existantes : dernière date connue
+    op.execute("UPDATE absence SET date_modification = date_enregistrement")
+    op.execute("UPDATE conge SET date_modification = COALESCE(date_approbation, date_demande)")
+    op.execute("UPDATE presence SET date_modification = CURRENT_TIMESTAMP")
+
+
+def downgrade():
+    with op.batch_alter_table('presence', schema=None) as batch_op:
+        batch_op.drop_column('date_modification')
+
+    with op.batch_alter_table('conge', schema=None) as batch_op:
+        batch_op.drop_column('date_modification')
+
+    with op.batch_alter_table('absence', schema=None) as batch_op:
+        batch_op.drop_column('date_modification')
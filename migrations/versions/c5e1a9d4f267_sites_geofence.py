@@ -0,0 +1,45 @@
+"""sites de pointage pour la validation GPS
+
+Revision ID: c5e1a9d4f267
+Revises: a6c4e2f8b193
+Create Date: 2026-10-19 17:48:12.551930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e1a9d4f267'
+down_revision = 'a6c4e2f8b193'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('site',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nom', sa.String(length=100), nullable=False),
+    sa.Column('adresse', sa.String(length=200), nullable=True),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('rayon_metres', sa.Integer(), nullable=True),
+    sa.Column('polygone', sa.JSON(), nullable=True),
+    sa.Column('actif', sa.Boolean(), nullable=True),
+    sa.Column('date_creation', sa.DateTime(), nullable=True),
+    sa.Column('date_modification', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('nom')
+    )
+
+    with op.batch_alter_table('pointage', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('site_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_pointage_site', 'site', ['site_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('pointage', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_pointage_site', type_='foreignkey')
+        batch_op.drop_column('site_id')
+
+    op.drop_table('site')
@@ -0,0 +1,43 @@
+"""cumuls hebdomadaires heures_semaine
+
+Revision ID: d4a7e3b9c15f
+Revises: b81f4d2c6e0a
+Create Date: 2026-10-19 16:40:12.507389
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a7e3b9c15f'
+down_revision = 'b81f4d2c6e0a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('heures_semaine',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employe_id', sa.Integer(), nullable=False),
+    sa.Column('date_debut_semaine', sa.Date(), nullable=False),
+    sa.Column('nb_jours', sa.Integer(), nullable=False),
+    sa.Column('heures_travaillees', sa.Float(), nullable=False),
+    sa.Column('heures_normales', sa.Float(), nullable=False),
+    sa.Column('heures_supplementaires', sa.Float(), nullable=False),
+    sa.Column('heures_sup_25', sa.Float(), nullable=False),
+    sa.Column('heures_sup_50', sa.Float(), nullable=False),
+    sa.Column('date_mise_a_jour', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['employe_id'], ['employee.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('employe_id', 'date_debut_semaine', name='unique_employe_semaine')
+    )
+    with op.batch_alter_table('heures_semaine', schema=None) as batch_op:
+        batch_op.create_index('idx_heures_semaine_date', ['date_debut_semaine'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('heures_semaine', schema=None) as batch_op:
+        batch_op.drop_index('idx_heures_semaine_date')
+
+    op.drop_table('heures_semaine')
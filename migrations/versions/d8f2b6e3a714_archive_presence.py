@@ -0,0 +1,35 @@
+"""manifeste d'archivage des pointages et heures de travail
+
+Revision ID: d8f2b6e3a714
+Revises: c5e1a9d4f267
+Create Date: 2026-10-19 18:31:26.174309
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd8f2b6e3a714'
+down_revision = 'c5e1a9d4f267'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Les tables <source>_archive_<année> sont créées par la commande archive-presences
+    op.create_table('archive_presence',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('source', sa.String(length=50), nullable=False),
+    sa.Column('annee', sa.Integer(), nullable=False),
+    sa.Column('mois', sa.Integer(), nullable=False),
+    sa.Column('table_archive', sa.String(length=64), nullable=False),
+    sa.Column('nb_lignes', sa.Integer(), nullable=False),
+    sa.Column('date_archivage', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source', 'annee', 'mois', name='unique_archive_source_mois')
+    )
+
+
+def downgrade():
+    op.drop_table('archive_presence')
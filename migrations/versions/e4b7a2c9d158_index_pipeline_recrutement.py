@@ -0,0 +1,32 @@
+"""index du pipeline de recrutement (comptages par offre)
+
+Revision ID: e4b7a2c9d158
+Revises: d8f2b6e3a714
+Create Date: 2026-10-19 19:42:13.508614
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7a2c9d158'
+down_revision = 'd8f2b6e3a714'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('candidat', schema=None) as batch_op:
+        batch_op.create_index('idx_candidat_offre_statut', ['offre_emploi_id', 'statut'], unique=False)
+
+    with op.batch_alter_table('entretien', schema=None) as batch_op:
+        batch_op.create_index('idx_entretien_offre_datetime', ['offre_emploi_id', 'datetime'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('entretien', schema=None) as batch_op:
+        batch_op.drop_index('idx_entretien_offre_datetime')
+
+    with op.batch_alter_table('candidat', schema=None) as batch_op:
+        batch_op.drop_index('idx_candidat_offre_statut')
@@ -0,0 +1,30 @@
+"""type_conge.remunere pour les congés sans solde
+
+Revision ID: e9c2f6a8d371
+Revises: d4a7e3b9c15f
+Create Date: 2026-10-19 18:22:47.115630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e9c2f6a8d371'
+down_revision = 'd4a7e3b9c15f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('type_conge', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('remunere', sa.Boolean(), nullable=True, server_default=sa.true()))
+
+    op.execute(sa.text(
+        "UPDATE type_conge SET remunere = :remunere WHERE lower(nom) LIKE '%sans solde%'"
+    ).bindparams(remunere=False))
+
+
+def downgrade():
+    with op.batch_alter_table('type_conge', schema=None) as batch_op:
+        batch_op.drop_column('remunere')
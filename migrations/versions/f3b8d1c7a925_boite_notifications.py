@@ -0,0 +1,64 @@
+"""boîte de notifications : compteur non lues et archive
+
+Revision ID: f3b8d1c7a925
+Revises: e9c2f6a8d371
+Create Date: 2026-10-19 16:21:07.318402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8d1c7a925'
+down_revision = 'e9c2f6a8d371'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_presence_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employe_id', sa.Integer(), nullable=False),
+    sa.Column('type_notification', sa.String(length=50), nullable=False),
+    sa.Column('titre', sa.String(length=100), nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('priorite', sa.String(length=20), nullable=True),
+    sa.Column('destinataire_employe', sa.Boolean(), nullable=True),
+    sa.Column('destinataire_manager', sa.Boolean(), nullable=True),
+    sa.Column('destinataire_rh', sa.Boolean(), nullable=True),
+    sa.Column('statut', sa.String(length=20), nullable=True),
+    sa.Column('date_envoi', sa.DateTime(), nullable=True),
+    sa.Column('date_lecture', sa.DateTime(), nullable=True),
+    sa.Column('date_reference', sa.Date(), nullable=False),
+    sa.Column('donnees_reference', sa.JSON(), nullable=True),
+    sa.Column('date_creation', sa.DateTime(), nullable=True),
+    sa.Column('date_archivage', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['employe_id'], ['employee.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notification_presence_archive', schema=None) as batch_op:
+        batch_op.create_index('idx_notif_archive_employe_date', ['employe_id', 'date_reference'], unique=False)
+
+    op.create_table('compteur_notification',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cle', sa.String(length=50), nullable=False),
+    sa.Column('valeur', sa.Integer(), nullable=False),
+    sa.Column('date_mise_a_jour', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cle')
+    )
+
+    with op.batch_alter_table('notification_presence', schema=None) as batch_op:
+        batch_op.create_index('idx_notif_rh_statut_id', ['destinataire_rh', 'statut', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notification_presence', schema=None) as batch_op:
+        batch_op.drop_index('idx_notif_rh_statut_id')
+
+    op.drop_table('compteur_notification')
+    with op.batch_alter_table('notification_presence_archive', schema=None) as batch_op:
+        batch_op.drop_index('idx_notif_archive_employe_date')
+
+    op.drop_table('notification_presence_archive')
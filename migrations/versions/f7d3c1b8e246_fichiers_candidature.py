@@ -0,0 +1,55 @@
+"""fichiers de candidature dédupliqués et extraction différée du texte
+
+Revision ID: f7d3c1b8e246
+Revises: e4b7a2c9d158
+Create Date: 2026-10-19 20:15:47.902135
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7d3c1b8e246'
+down_revision = 'e4b7a2c9d158'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('fichier_candidature',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('empreinte', sa.String(length=64), nullable=False),
+    sa.Column('chemin', sa.String(length=200), nullable=False),
+    sa.Column('taille', sa.Integer(), nullable=False),
+    sa.Column('date_depot', sa.DateTime(), nullable=True),
+    sa.Column('statut_extraction', sa.String(length=20), nullable=False),
+    sa.Column('texte', sa.Text(), nullable=True),
+    sa.Column('erreur_extraction', sa.String(length=255), nullable=True),
+    sa.Column('date_extraction', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('empreinte')
+    )
+    with op.batch_alter_table('fichier_candidature', schema=None) as batch_op:
+        batch_op.create_index('idx_fichier_candidature_extraction', ['statut_extraction', 'id'], unique=False)
+
+    with op.batch_alter_table('candidat', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cv_fichier_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('lettre_fichier_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_candidat_cv_fichier', 'fichier_candidature', ['cv_fichier_id'], ['id'])
+        batch_op.create_foreign_key('fk_candidat_lettre_fichier', 'fichier_candidature', ['lettre_fichier_id'], ['id'])
+        batch_op.create_index('idx_candidat_offre_email', ['offre_emploi_id', 'email'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('candidat', schema=None) as batch_op:
+        batch_op.drop_index('idx_candidat_offre_email')
+        batch_op.drop_constraint('fk_candidat_lettre_fichier', type_='foreignkey')
+        batch_op.drop_constraint('fk_candidat_cv_fichier', type_='foreignkey')
+        batch_op.drop_column('lettre_fichier_id')
+        batch_op.drop_column('cv_fichier_id')
+
+    with op.batch_alter_table('fichier_candidature', schema=None) as batch_op:
+        batch_op.drop_index('idx_fichier_candidature_extraction')
+
+    op.drop_table('fichier_candidature')
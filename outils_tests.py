@@ -0,0 +1,80 @@
+"""
+Outils communs des tests
+Application minimale sur une base SQLite en mémoire, comptage des requêtes SQL et création
+des données de base (utilisateur connecté, employés)
+"""
+
+from datetime import date
+import itertools
+from flask import Flask
+from sqlalchemy import event
+
+from app import db, login_manager
+from app.models import Employee, Utilisateur, Role, Permission
+
+_numeros = itertools.count()
+
+
+def creer_app_test(**config):
+    """Crée une application minimale sur une base SQLite en mémoire"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config)
+    db.init_app(app)
+    return app
+
+
+def compter_requetes(fonction):
+    """Exécute fonction et retourne (nombre de requêtes SQL émises, résultat)"""
+    compteur = {'requetes': 0}
+
+    def compter(*args):
+        compteur['requetes'] += 1
+
+    event.listen(db.engine, 'before_cursor_execute', compter)
+    try:
+        resultat = fonction()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', compter)
+    return compteur['requetes'], resultat
+
+
+def creer_utilisateur(nom_utilisateur='rh'):
+    utilisateur = Utilisateur(nom_utilisateur=nom_utilisateur, email=f'{nom_utilisateur}@test.local',
+                              mot_de_passe_hash='x')
+    db.session.add(utilisateur)
+    db.session.flush()
+    return utilisateur
+
+
+def creer_client_connecte(app, *permissions):
+    """Client de test connecté en tant qu'utilisateur ayant les permissions données (crée le schéma)"""
+    login_manager.init_app(app)
+    with app.app_context():
+        db.create_all()
+        utilisateur = creer_utilisateur()
+        utilisateur.role = Role(nom='RH', permissions=[Permission(nom=code, code=code) for code in permissions])
+        db.session.commit()
+        utilisateur_id = utilisateur.id
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(utilisateur_id)
+    return client
+
+
+def creer_employes(nombre, **champs):
+    """Employés Employe0..N ; champs peut contenir des fonctions de l'indice (ex. departement)"""
+    employes = [
+        Employee(**{'nom': f'Employe{i}', 'prenom': 'Test', 'email': f'employe{next(_numeros)}@test.local', 'poste': 'Dev',
+                    'departement': 'IT', 'date_embauche': date(2020, 1, 1),
+                    **{cle: valeur(i) if callable(valeur) else valeur for cle, valeur in champs.items()}})
+        for i in range(nombre)
+    ]
+    db.session.add_all(employes)
+    db.session.flush()
+    return employes
+
+
+def creer_employe(**champs):
+    return creer_employes(1, **champs)[0]
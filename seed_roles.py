@@ -243,7 +243,7 @@ def seed_type_conges():
         {"nom": "Congé maladie", "duree_max_jours": 90},
         {"nom": "Congé maternité", "duree_max_jours": 98},
         {"nom": "Congé paternité", "duree_max_jours": 10},
-        {"nom": "Congé sans solde", "duree_max_jours": None},
+        {"nom": "Congé sans solde", "duree_max_jours": None, "remunere": False},
         {"nom": "Permission exceptionnelle", "duree_max_jours": 3}
     ]
     
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test de l'analytique des évaluations
+Vérifie les statistiques calculées sur les tableaux NumPy en cache et leur mise à jour
+incrémentale après modification, ajout ou suppression d'évaluations
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date
+
+from app import db
+from app.models import Evaluation
+from app.utils import analytique_evaluations
+from app.utils.analytique_evaluations import (distribution, evolutions, calibration, percentile_employe,
+                                              donnees_evaluations)
+from outils_tests import creer_app_test as creer_app_minimale, creer_utilisateur, creer_employes
+
+
+def creer_app_test():
+    """Application minimale, cache analytique vidé"""
+    analytique_evaluations._cache['donnees'] = None
+    return creer_app_minimale()
+
+
+def preparer():
+    """Quatre employés sur deux départements, évalués en 2025 et 2026"""
+    db.create_all()
+    evaluateur = creer_utilisateur()
+    employes = creer_employes(4, departement=lambda i: 'IT' if i < 2 else 'RH')
+    scores = {2025: [60, 70, 80, 90], 2026: [65, 85, 75, 90]}
+    for annee, valeurs in scores.items():
+        db.session.add_all([
+            Evaluation(employe_id=employe.id, evaluateur_id=evaluateur.id, periode=str(annee), annee=annee,
+                       score_global=score, statut='Validé', date_evaluation=date(annee, 12, 1))
+            for employe, score in zip(employes, valeurs)
+        ])
+    db.session.commit()
+    return employes, evaluateur
+
+
+def test_statistiques():
+    """Distribution, évolutions, calibration et percentile cohérents avec les données"""
+    app = creer_app_test()
+    with app.app_context():
+        employes, _ = preparer()
+        resultat = distribution(2026)
+        assert resultat['nombre'] == 4 and resultat['moyenne'] == 78.75
+        assert resultat['percentiles']['p50'] == 80.0
+        assert resultat['repartition_notes']['Excellent'] == 1
+
+        evolution = evolutions(2026)
+        assert evolution['nombre'] == 4 and evolution['ecart_moyen'] == 3.75
+        assert evolution['plus_fortes_progressions'][0]['employe_id'] == employes[1].id
+
+        departements = {d['departement']: d for d in calibration(2026)['departements']}
+        assert departements['RH']['moyenne'] == 82.5 and departements['IT']['moyenne'] == 75.0
+
+        position = percentile_employe(employes[1].id, 2026)
+        assert position['percentile'] == 62.5 and position['percentile_departement'] == 75.0
+        assert percentile_employe(employes[0].id, 2030) is None
+        print(f"✅ Moyenne {resultat['moyenne']}, écart moyen {evolution['ecart_moyen']}")
+
+
+def test_mise_a_jour_incrementale():
+    """Modifications fusionnées sans rechargement, suppression détectée"""
+    app = creer_app_test()
+    with app.app_context():
+        employes, evaluateur = preparer()
+        assert distribution(2026)['moyenne'] == 78.75
+        charge_le = donnees_evaluations()['charge_le']
+
+        evaluation = Evaluation.query.filter_by(employe_id=employes[0].id, annee=2026).one()
+        evaluation.score_global = 95
+        db.session.add(Evaluation(employe_id=employes[0].id, evaluateur_id=evaluateur.id, periode='2027',
+                                  annee=2027, score_global=50, statut='Validé', date_evaluation=date(2027, 1, 1)))
+        db.session.commit()
+        assert distribution(2026)['moyenne'] == 86.25
+        assert distribution(2027)['nombre'] == 1
+        assert donnees_evaluations()['charge_le'] == charge_le
+
+        Evaluation.query.filter_by(annee=2027).delete()
+        db.session.commit()
+        assert distribution(2027)['nombre'] == 0
+        assert len(donnees_evaluations()['id']) == 8
+        print("✅ Cache mis à jour après modification, ajout et suppression")
+
+
+if __name__ == "__main__":
+    print("🧪 Test de l'analytique des évaluations")
+    print("=" * 50)
+    try:
+        test_statistiques()
+        test_mise_a_jour_incrementale()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
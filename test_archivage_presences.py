@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test de l'archivage des présences
+Vérifie qu'un mois n'est clos qu'avec une paie faite et payée, et que les heures d'un mois
+archivé restent lisibles (liste paginée et totaux) comme avant l'archivage
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date
+
+from sqlalchemy import func
+
+from app import db
+from app.models import Employee, HeuresTravail, BulletinPaie
+from app.utils.archivage_presences import mois_clos, mois_a_archiver, archiver_mois, heures_travail_periode
+from outils_tests import creer_app_test, creer_employes
+
+REFERENCE = date(2026, 5, 15)  # zone chaude : avril et mai 2026
+
+
+def bulletin(employe, mois, statut):
+    return BulletinPaie(employe_id=employe.id, periode_debut=date(2026, mois, 1), periode_fin=date(2026, mois, 28),
+                        mois=mois, annee=2026, numero_bulletin=f'B-{employe.id}-{mois}', salaire_base=100000,
+                        salaire_brut=100000, salaire_net=80000, statut=statut)
+
+
+def lister_heures(date_debut, date_fin):
+    """Même lecture que la page de gestion des heures"""
+    heures = heures_travail_periode(date_debut, date_fin)
+    query = db.session.query(heures).join(Employee, heures.employe_id == Employee.id).filter(
+        heures.date_travail >= date_debut,
+        heures.date_travail <= date_fin
+    )
+    page = query.order_by(heures.date_travail.desc()).paginate(page=1, per_page=50, error_out=False)
+    total = query.with_entities(func.sum(heures.heures_travaillees)).scalar()
+    return page, total
+
+
+def test_mois_clos():
+    """Mois sans bulletin ou avec un bulletin non payé : non clos"""
+    app = creer_app_test()
+    with app.app_context():
+        db.create_all()
+        premier, second = creer_employes(2)
+        assert not mois_clos(2026, 1, REFERENCE)
+
+        db.session.add_all([bulletin(premier, 1, 'payé'), bulletin(second, 1, 'validé')])
+        db.session.flush()
+        assert not mois_clos(2026, 1, REFERENCE)
+
+        BulletinPaie.query.filter_by(employe_id=second.id).update({'statut': 'payé'})
+        assert mois_clos(2026, 1, REFERENCE)
+
+        db.session.add(bulletin(premier, 4, 'payé'))
+        assert not mois_clos(2026, 4, REFERENCE)
+        print("✅ Mois clos seulement avec tous ses bulletins payés")
+
+
+def test_lecture_mois_archive():
+    """Les heures d'un mois archivé restent listées et totalisées"""
+    app = creer_app_test()
+    with app.app_context():
+        db.create_all()
+        employe = creer_employes(1)[0]
+        db.session.add_all([
+            HeuresTravail(employe_id=employe.id, date_travail=date(2026, 2, jour), heures_travaillees=8,
+                          statut='present')
+            for jour in (2, 3, 4)
+        ] + [HeuresTravail(employe_id=employe.id, date_travail=date(2026, 3, 2), heures_travaillees=7,
+                           statut='present'), bulletin(employe, 2, 'payé')])
+        db.session.commit()
+        assert mois_a_archiver(REFERENCE) == [(2026, 2)]
+
+        avant = lister_heures(date(2026, 2, 1), date(2026, 2, 28))
+        assert archiver_mois(2026, 2) == {'pointage': 0, 'heures_travail': 3}
+        db.session.commit()
+        assert HeuresTravail.query.count() == 1
+
+        page, total = lister_heures(date(2026, 2, 1), date(2026, 2, 28))
+        assert page.total == avant[0].total == 3 and total == avant[1] == 24
+        assert page.items[0].date_travail == date(2026, 2, 4) and page.items[0].employe.id == employe.id
+        print("✅ Février archivé : 3 journées, 24 h toujours lisibles")
+
+
+if __name__ == "__main__":
+    print("🧪 Test de l'archivage des présences")
+    print("=" * 50)
+    try:
+        test_mois_clos()
+        test_lecture_mois_archive()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test de la boîte de notifications de présence
+Vérifie la pagination par curseur, le compteur de non lues, le marquage en masse (ids ou
+curseur, valeur invalide refusée) et l'archivage des notifications traitées
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date
+
+from app import db
+from app.models import NotificationPresence, NotificationPresenceArchive
+from app.routes.conges_temps import conges_temps_bp
+from app.utils.notifications_presence import creer_notifications_presence
+from app.utils.boite_notifications import compter_non_lues, recalculer_non_lues, archiver_notifications
+from outils_tests import creer_app_test, creer_client_connecte, creer_employes
+
+
+def creer_app_boite():
+    """Application avec le blueprint des présences et cinq notifications non lues"""
+    app = creer_app_test(SECRET_KEY='test', TESTING=True)
+    app.register_blueprint(conges_temps_bp)
+    client = creer_client_connecte(app, 'presences')
+    with app.app_context():
+        employes = creer_employes(5)
+        creer_notifications_presence(
+            (employe.id, 'absence', date(2026, 3, 2 + i), {}) for i, employe in enumerate(employes)
+        )
+        recalculer_non_lues()
+        db.session.commit()
+    return app, client
+
+
+def marquer(client, **donnees):
+    return client.post('/api/presences/notifications/statut', json=donnees)
+
+
+def test_liste_et_compteur():
+    """Pages par curseur décroissant et compteur de non lues"""
+    app, client = creer_app_boite()
+    page = client.get('/api/presences/notifications?limite=3').get_json()
+    assert len(page['notifications']) == 3 and page['non_lues'] == 5
+    suite = client.get(f"/api/presences/notifications?limite=3&curseur={page['curseur_suivant']}").get_json()
+    assert len(suite['notifications']) == 2 and suite['curseur_suivant'] is None
+    ids = [n['id'] for n in page['notifications'] + suite['notifications']]
+    assert ids == sorted(ids, reverse=True)
+    assert client.get('/api/presences/notifications/non-lues').get_json() == {'non_lues': 5}
+    print("✅ Deux pages de notifications, 5 non lues")
+
+
+def test_marquage():
+    """Marquage par ids puis par curseur ; curseur invalide refusé sans rien modifier"""
+    app, client = creer_app_boite()
+    with app.app_context():
+        ids = [notif_id for (notif_id,) in db.session.query(NotificationPresence.id).order_by(NotificationPresence.id)]
+
+    for invalide in ('abc', [1], {'id': 1}):
+        reponse = marquer(client, jusqu_a=invalide)
+        assert reponse.status_code == 400, (invalide, reponse.get_json())
+    assert marquer(client, statut='supprimee', ids=ids[:1]).status_code == 400
+    assert marquer(client).status_code == 400
+    with app.app_context():
+        assert compter_non_lues() == 5
+
+    assert marquer(client, ids=[ids[0]]).get_json()['modifiees'] == 1
+    reponse = marquer(client, statut='traitee', jusqu_a=str(ids[2])).get_json()
+    assert reponse['modifiees'] == 3 and reponse['non_lues'] == 2
+    with app.app_context():
+        assert NotificationPresence.query.filter_by(statut='traitee').count() == 3
+        assert compter_non_lues() == 2
+    print("✅ Curseurs invalides refusés, marquage par ids et par curseur")
+
+
+def test_archivage():
+    """Seules les notifications traitées antérieures à la date sont archivées"""
+    app, client = creer_app_boite()
+    with app.app_context():
+        premiere = db.session.query(NotificationPresence.id).order_by(NotificationPresence.id).first()[0]
+    marquer(client, statut='traitee', jusqu_a=premiere + 1)
+    with app.app_context():
+        assert archiver_notifications(date(2026, 3, 3), taille_lot=1) == 1
+        assert NotificationPresenceArchive.query.one().id == premiere
+        assert NotificationPresence.query.count() == 4 and compter_non_lues() == 3
+    print("✅ Une notification traitée archivée")
+
+
+if __name__ == "__main__":
+    print("🧪 Test de la boîte de notifications")
+    print("=" * 50)
+    try:
+        test_liste_et_compteur()
+        test_marquage()
+        test_archivage()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test du cache disque des rapports
+Vérifie que le jeton de version change après modification d'une absence, d'un congé ou d'une
+présence, et qu'un rapport est resservi depuis le cache tant que ses sources n'ont pas changé
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+import time
+from datetime import date
+
+from flask import Response
+
+from app import db
+from app.models import Absence, Conge, Presence, Employee, TypeConge
+from app.utils.cache_rapports import jeton_version, rapport_en_cache
+from outils_tests import creer_app_test, creer_employe
+
+
+def preparer():
+    db.create_all()
+    employe = creer_employe()
+    absence = Absence(employe_id=employe.id, date_absence=date(2026, 3, 2), motif='Maladie')
+    conge = Conge(employe_id=employe.id, type_conge='Annuel', date_debut=date(2026, 4, 1),
+                  date_fin=date(2026, 4, 3), nombre_jours=3)
+    presence = Presence(employe_id=employe.id, date=date(2026, 3, 3), retard_minutes=0)
+    db.session.add_all([absence, conge, presence])
+    db.session.commit()
+    return absence, conge, presence
+
+
+def modifier(objet, **champs):
+    """Modifie puis valide, après un délai garantissant un horodatage distinct"""
+    time.sleep(0.01)
+    for champ, valeur in champs.items():
+        setattr(objet, champ, valeur)
+    db.session.commit()
+
+
+def test_jeton_modifications():
+    """Une modification sans ajout ni suppression change le jeton"""
+    app = creer_app_test()
+    with app.app_context():
+        absence, conge, presence = preparer()
+        for modele, objet, champs in ((Absence, absence, {'etat': 'Justifiée'}),
+                                      (Conge, conge, {'date_fin': date(2026, 4, 10), 'nombre_jours': 8}),
+                                      (Presence, presence, {'retard_minutes': 20})):
+            avant = jeton_version([modele, Employee])
+            modifier(objet, **champs)
+            assert jeton_version([modele, Employee]) != avant, modele.__name__
+        print("✅ Jeton modifié après édition d'une absence, d'un congé et d'une présence")
+
+
+def test_rapport_en_cache():
+    """Rapport resservi sans regénération, regénéré après modification ; sources non suivies jamais cachées"""
+    app = creer_app_test(CACHE_RAPPORTS_REPERTOIRE=tempfile.mkdtemp())
+    generations = []
+
+    def generer():
+        generations.append(1)
+        return Response(f'rapport {len(generations)}', mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=absences.csv'})
+
+    def telecharger(modeles):
+        reponse = rapport_en_cache('absences', {'format': 'csv'}, modeles, generer)
+        reponse.direct_passthrough = False
+        return reponse.get_data(as_text=True)
+
+    with app.test_request_context():
+        absence, _, _ = preparer()
+        assert telecharger([Absence, Employee]) == telecharger([Absence, Employee]) == 'rapport 1'
+        modifier(absence, etat='Justifiée')
+        assert telecharger([Absence, Employee]) == 'rapport 2'
+
+        telecharger([TypeConge])
+        telecharger([TypeConge])
+        assert len(generations) == 4
+        print(f"✅ {len(generations)} générations pour 6 téléchargements")
+
+
+if __name__ == "__main__":
+    print("🧪 Test du cache des rapports")
+    print("=" * 50)
+    try:
+        test_jeton_modifications()
+        test_rapport_en_cache()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
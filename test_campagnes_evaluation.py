@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test des campagnes d'évaluation
+Vérifie la saisie des critères d'un modèle, la création des évaluations et critères d'une
+campagne pour la population ciblée, en un nombre de requêtes indépendant du nombre
+d'employés, et qu'une relance ne duplique rien
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import db
+from app.models import Employee, Evaluation, CritereEvaluation, TemplateEvaluation
+from app.utils.campagnes_evaluation import (lancer_campagne, analyser_criteres, criteres_en_texte,
+                                            criteres_modele, enregistrer_criteres, TAILLE_LOT)
+from outils_tests import creer_app_test, compter_requetes, creer_utilisateur, creer_employes
+
+CRITERES = """
+# Section | Critère | score max | poids | description
+Compétences | Maîtrise technique | 10 | 2 | Outils et méthodes
+Compétences | Autonomie
+Comportement | Travail en équipe | 5 | 1,5
+"""
+
+
+def preparer(nb_employes):
+    db.create_all()
+    evaluateur = creer_utilisateur()
+    template = TemplateEvaluation(nom='Annuel', type_evaluation='annuelle')
+    enregistrer_criteres(template, analyser_criteres(CRITERES))
+    db.session.add(template)
+    creer_employes(nb_employes, departement=lambda i: 'IT' if i % 2 else 'RH',
+                   statut=lambda i: 'Inactif' if i % 5 == 0 else 'Actif')
+    db.session.flush()
+    return template, evaluateur
+
+
+def test_saisie_criteres():
+    """Critères saisis ligne à ligne, enregistrés en JSON puis relus à l'identique"""
+    app = creer_app_test()
+    with app.app_context():
+        template, _ = preparer(0)
+        criteres = criteres_modele(template)
+        assert [(c['section'], c['critere'], c['ordre']) for c in criteres] == [
+            ('Compétences', 'Maîtrise technique', 1), ('Compétences', 'Autonomie', 2),
+            ('Comportement', 'Travail en équipe', 1)]
+        assert criteres[0]['poids'] == 2 and criteres[0]['description'] == 'Outils et méthodes'
+        assert criteres[1]['score_max'] == 5.0 and criteres[2]['poids'] == 1.5
+        assert template.sections_json == '["Compétences", "Comportement"]'
+        assert analyser_criteres(criteres_en_texte(criteres)) == criteres
+
+        for texte in ("Compétences sans séparateur", "Compétences | Autonomie | -1"):
+            try:
+                analyser_criteres(texte)
+                assert False, f"saisie refusée attendue : {texte}"
+            except ValueError as e:
+                assert str(e).startswith('Ligne 1')
+
+        template.criteres_json = None
+        try:
+            lancer_campagne(template, 2026, 1)
+            assert False, "un modèle sans critère doit être refusé"
+        except ValueError:
+            pass
+        print("✅ Saisie des critères du modèle")
+
+
+def test_campagne_population():
+    """Une évaluation par employé ciblé, critères développés, relance sans doublon"""
+    app = creer_app_test()
+    with app.app_context():
+        template, evaluateur = preparer(50)
+        bilan = lancer_campagne(template, 2026, evaluateur.id, departement='IT')
+        cibles = Employee.query.filter_by(departement='IT', statut='Actif').count()
+        assert bilan['evaluations'] == cibles == Evaluation.query.count()
+        assert bilan['criteres'] == CritereEvaluation.query.count() == 3 * cibles
+        assert {e.employe.departement for e in Evaluation.query.all()} == {'IT'}
+        assert Evaluation.query.first().periode == 'Annuelle 2026'
+
+        relance = lancer_campagne(template, 2026, evaluateur.id)
+        assert relance['employes_ignores'] == cibles
+        assert relance['evaluations'] == Employee.query.filter_by(statut='Actif').count() - cibles
+        print(f"✅ {bilan['evaluations']} évaluations, relance : {relance['evaluations']} nouvelles")
+
+
+def test_nombre_requetes_par_lot():
+    """Le nombre de requêtes dépend du nombre de lots, pas du nombre d'employés"""
+    app = creer_app_test()
+    with app.app_context():
+        template, evaluateur = preparer(2 * TAILLE_LOT)
+        requetes, bilan = compter_requetes(lambda: lancer_campagne(template, 2026, evaluateur.id, statut=None))
+        assert bilan['evaluations'] == 2 * TAILLE_LOT
+        assert requetes <= 2 + 3 * 2, requetes
+        print(f"✅ {bilan['evaluations']} évaluations en {requetes} requêtes")
+
+
+if __name__ == "__main__":
+    print("🧪 Test des campagnes d'évaluation")
+    print("=" * 50)
+    try:
+        test_saisie_criteres()
+        test_campagne_population()
+        test_nombre_requetes_par_lot()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test du dépôt des candidatures publiques
+Vérifie le stockage unique d'un même fichier, le refus des fichiers non PDF, vides ou trop
+volumineux et le refus d'une seconde candidature pour la même offre et le même email
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+from io import BytesIO
+
+from werkzeug.datastructures import FileStorage
+
+from app import db
+from app.models import OffreEmploi, Candidat, FichierCandidature
+from app.utils.candidatures import deposer_candidature, enregistrer_fichier, repertoire_uploads
+from outils_tests import creer_app_test
+
+CV = b'%PDF-1.4\n' + b'0' * 200 * 1024
+
+
+def creer_app_candidatures():
+    """Application minimale dont les fichiers déposés vont dans un dossier temporaire"""
+    app = creer_app_test(CANDIDATURE_TAILLE_MAX_MO=1)
+    app.root_path = tempfile.mkdtemp()
+    return app
+
+
+def fichier(contenu, nom='cv.pdf'):
+    return FileStorage(stream=BytesIO(contenu), filename=nom, content_type='application/pdf')
+
+
+def creer_offre(titre):
+    offre = OffreEmploi(titre=titre, departement='IT')
+    db.session.add(offre)
+    db.session.flush()
+    return offre
+
+
+def fichiers_sur_disque():
+    return [nom for _, _, noms in os.walk(repertoire_uploads()) for nom in noms]
+
+
+def test_deduplication():
+    """Même CV pour deux offres : un seul fichier ; même email sur la même offre : refusé"""
+    app = creer_app_candidatures()
+    with app.app_context():
+        db.create_all()
+        premiere, seconde = creer_offre('Développeur'), creer_offre('Analyste')
+        lettre = b'%PDF-1.4\nlettre'
+        a = deposer_candidature(premiere, 'Awa', ' Awa@Test.local ', '600000000', fichier(CV), fichier(lettre))
+        b = deposer_candidature(seconde, 'Awa', 'awa@test.local', '600000000', fichier(CV), fichier(lettre))
+        db.session.commit()
+        assert a.email == 'awa@test.local' and a.cv_fichier_id == b.cv_fichier_id
+        assert FichierCandidature.query.count() == 2 and len(fichiers_sur_disque()) == 2
+        assert FichierCandidature.query.get(a.cv_fichier_id).statut_extraction == 'en_attente'
+
+        try:
+            deposer_candidature(premiere, 'Awa', 'AWA@test.local', '600000000', fichier(CV), fichier(lettre))
+            assert False, "seconde candidature sur la même offre acceptée"
+        except ValueError:
+            pass
+        assert Candidat.query.count() == 2
+        print("✅ CV stocké une fois pour deux offres, doublon refusé")
+
+
+def test_controles_fichier():
+    """Fichiers non PDF, vides ou trop volumineux refusés sans laisser de fichier sur le disque"""
+    app = creer_app_candidatures()
+    with app.app_context():
+        db.create_all()
+        refus = {
+            'PNG': b'\x89PNG\r\n\x1a\n' + b'0' * 100,
+            'vide': b'',
+            'trop grand': b'%PDF-1.4\n' + b'0' * (1024 * 1024 + 1),
+        }
+        for libelle, contenu in refus.items():
+            try:
+                enregistrer_fichier(fichier(contenu), libelle)
+                assert False, f"fichier {libelle} accepté"
+            except ValueError as e:
+                assert str(e).startswith(libelle)
+        assert FichierCandidature.query.count() == 0 and fichiers_sur_disque() == []
+        print("✅ PNG, fichier vide et fichier de plus de 1 Mo refusés")
+
+
+if __name__ == "__main__":
+    print("🧪 Test du dépôt des candidatures")
+    print("=" * 50)
+    try:
+        test_deduplication()
+        test_controles_fichier()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
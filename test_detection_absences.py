@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test de la détection des absences en fin de journée
+Vérifie que seuls les employés actifs sans pointage ni congé sont marqués absents, que seules
+les absences non déclarées sont notifiées et qu'une relance n'insère rien
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, time
+
+from app import db
+from app.models import HeuresTravail, Pointage, Conge, Absence, NotificationPresence, StatistiquePresenceJour
+from app.utils.detection_absences import detecter_absences_jour
+from outils_tests import creer_app_test, creer_employes
+
+JOUR = date(2026, 3, 4)  # mercredi
+
+
+def preparer():
+    """Six employés : présent, en congé, absent déclaré, inactif, embauché après, absent"""
+    db.create_all()
+    employes = creer_employes(6, statut=lambda i: 'Inactif' if i == 3 else 'Actif',
+                              date_embauche=lambda i: date(2026, 6, 1) if i == 4 else date(2020, 1, 1))
+    present, en_conge, declare = employes[:3]
+    db.session.add_all([
+        Pointage(employe_id=present.id, date_pointage=JOUR, heure_pointage=time(8, 0),
+                 type_pointage='entree', valide=True),
+        Conge(employe_id=en_conge.id, type_conge='Annuel', date_debut=JOUR, date_fin=JOUR, nombre_jours=1,
+              statut='Approuvé'),
+        Absence(employe_id=declare.id, date_absence=JOUR, motif='Maladie'),
+    ])
+    db.session.commit()
+    return employes
+
+
+def test_detection_absences():
+    """Absents enregistrés, absence déclarée non notifiée, relance sans doublon"""
+    app = creer_app_test()
+    with app.app_context():
+        employes = preparer()
+        resultat = detecter_absences_jour(JOUR)
+        db.session.commit()
+        assert resultat['absents'] == 2 and resultat['notifications'] == 1
+        absents = {h.employe_id for h in HeuresTravail.query.filter_by(date_travail=JOUR, statut='absent')}
+        assert absents == {employes[2].id, employes[5].id}
+        assert NotificationPresence.query.one().employe_id == employes[5].id
+        assert StatistiquePresenceJour.query.filter_by(date_travail=JOUR).one().nb_absents == 2
+
+        relance = detecter_absences_jour(JOUR)
+        assert relance['absents'] == 0 and HeuresTravail.query.count() == 2
+        print(f"✅ {resultat['absents']} absents, {resultat['notifications']} notification, relance sans doublon")
+
+
+def test_weekend_ignore():
+    """Le samedi n'est traité que sur demande"""
+    app = creer_app_test()
+    with app.app_context():
+        preparer()
+        samedi = date(2026, 3, 7)
+        assert detecter_absences_jour(samedi)['absents'] == 0
+        assert detecter_absences_jour(samedi, inclure_weekend=True)['absents'] == 4
+        print("✅ Week-end ignoré par défaut")
+
+
+if __name__ == "__main__":
+    print("🧪 Test de la détection des absences")
+    print("=" * 50)
+    try:
+        test_detection_absences()
+        test_weekend_ignore()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Test de la validation géographique des pointages
+Vérifie les distances haversine sur des valeurs connues, le test d'appartenance à un polygone
+concave et la recherche par grille de l'index des sites (rayon et polygone)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import math
+
+import numpy as np
+
+from app.models import Site
+from app.utils.geofence import distances_haversine, points_dans_polygone, IndexSites, RAYON_TERRE_METRES
+
+# Polygone en U (latitude, longitude) : l'encoche lat 1..3, lon 1..2 est hors du polygone
+POLYGONE_U = [(0, 0), (3, 0), (3, 1), (1, 1), (1, 2), (3, 2), (3, 3), (0, 3)]
+METRES_PAR_DEGRE_MERIDIEN = RAYON_TERRE_METRES * math.pi / 180
+
+
+def test_distances_haversine():
+    """Un degré de méridien, un degré d'équateur, Paris-Londres et distance nulle"""
+    distances = distances_haversine([0, 0, 48.8566, 5.35], [0, 0, 2.3522, -4.0],
+                                    [1, 0, 51.5074, 5.35], [0, 1, -0.1278, -4.0])
+    assert abs(distances[0] - METRES_PAR_DEGRE_MERIDIEN) < 1e-6
+    assert abs(distances[1] - METRES_PAR_DEGRE_MERIDIEN) < 1e-6
+    assert abs(distances[2] - 343_560) < 500, distances[2]
+    assert distances[3] == 0
+    print(f"✅ Paris-Londres : {distances[2] / 1000:.1f} km")
+
+
+def test_polygone_concave():
+    """Points dans les branches et la base du U acceptés, point dans l'encoche refusé"""
+    polygone = np.asarray(POLYGONE_U, dtype=float)
+    latitudes = [2, 2, 0.5, 2, 4, -0.5]
+    longitudes = [0.5, 2.5, 1.5, 1.5, 1, 1.5]
+    assert points_dans_polygone(latitudes, longitudes, polygone).tolist() == [True, True, True, False, False, False]
+    print("✅ Encoche du polygone concave hors zone")
+
+
+def test_index_sites():
+    """Rayon de 100 m : 99 m dans la cellule voisine accepté, 101 m refusé ; polygone concave indexé"""
+    centre_lat, centre_lon = 5.35995, -4.0  # 99 m au nord tombent dans la cellule de grille suivante
+    sites = [
+        Site(id=1, nom='Siège', latitude=centre_lat, longitude=centre_lon, rayon_metres=100),
+        Site(id=2, nom='Entrepôt', polygone=[(5.30 + lat / 1000, -4.10 + lon / 1000) for lat, lon in POLYGONE_U]),
+    ]
+    index = IndexSites(sites)
+    assert index.actif and not index.globaux
+
+    def nord(metres):
+        return centre_lat + metres / METRES_PAR_DEGRE_MERIDIEN
+
+    assert np.floor(nord(99) / index.taille_cellule) != np.floor(centre_lat / index.taille_cellule)
+    latitudes = [centre_lat, nord(99), nord(101), 5.302, 5.302, 5.302]
+    longitudes = [centre_lon, centre_lon, centre_lon, -4.0995, -4.0985, -4.0975]
+    assert index.localiser(latitudes, longitudes).tolist() == [1, 1, 0, 2, 0, 2]
+
+    assert index.localiser([], []).tolist() == []
+    assert not IndexSites([Site(id=3, nom='Sans coordonnées')]).actif
+    print("✅ Point à 101 m du site et point dans l'encoche hors zone")
+
+
+if __name__ == "__main__":
+    print("🧪 Test de la validation géographique")
+    print("=" * 50)
+    try:
+        test_distances_haversine()
+        test_polygone_concave()
+        test_index_sites()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
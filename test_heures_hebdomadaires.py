@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test des cumuls hebdomadaires d'heures
+Vérifie le calcul des heures supplémentaires selon le seuil hebdomadaire, leur ventilation
+25 % / 50 % et la suppression d'un employé ayant des cumuls hebdomadaires
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, timedelta
+
+from app import db
+from app.models import Employee, HeuresTravail, HeuresSemaine, ParametrePresence
+from app.utils.heures_hebdomadaires import (actualiser_heures_semaine, reconstruire_heures_semaine,
+                                            heures_periode)
+from outils_tests import creer_app_test, creer_employe
+
+LUNDI = date(2026, 3, 2)
+
+
+def preparer(heures_jours):
+    """Un employé et ses journées de la semaine du 2 mars 2026"""
+    db.create_all()
+    db.session.add(ParametrePresence(seuil_hs_hebdomadaire=40.0))
+    employe = creer_employe()
+    for i, (heures, heures_sup) in enumerate(heures_jours):
+        db.session.add(HeuresTravail(employe_id=employe.id, date_travail=LUNDI + timedelta(days=i),
+                                     heures_travaillees=heures, heures_supplementaires=heures_sup))
+    db.session.flush()
+    return employe
+
+
+def test_heures_supplementaires_hebdomadaires():
+    """Dépassement du seuil hebdomadaire ventilé entre les tranches 25 % et 50 %"""
+    app = creer_app_test()
+    with app.app_context():
+        employe = preparer([(10, 0)] * 5)
+        semaine = actualiser_heures_semaine(employe.id, LUNDI + timedelta(days=2))
+        assert semaine.date_debut_semaine == LUNDI and semaine.nb_jours == 5
+        assert semaine.heures_supplementaires == 10 and semaine.heures_normales == 40
+        assert (semaine.heures_sup_25, semaine.heures_sup_50) == (8, 2)
+        print("✅ 50 h travaillées : 10 HS dont 8 à 25 %")
+
+
+def test_depassements_quotidiens():
+    """Les dépassements quotidiens comptent même sous le seuil hebdomadaire"""
+    app = creer_app_test()
+    with app.app_context():
+        employe = preparer([(9, 1), (9, 1), (8, 0)])
+        assert reconstruire_heures_semaine() == 1
+        cumuls = heures_periode(LUNDI, LUNDI + timedelta(days=6))[employe.id]
+        assert cumuls['heures_travaillees'] == 26 and cumuls['heures_supplementaires'] == 2
+
+        HeuresTravail.query.delete()
+        reconstruire_heures_semaine(LUNDI, LUNDI + timedelta(days=6))
+        assert HeuresSemaine.query.count() == 0
+        print("✅ Dépassements quotidiens retenus, semaine vide supprimée")
+
+
+def test_suppression_employe():
+    """Supprimer un employé supprime ses cumuls hebdomadaires"""
+    app = creer_app_test()
+    with app.app_context():
+        employe = preparer([(8, 0)] * 5)
+        actualiser_heures_semaine(employe.id, LUNDI)
+        db.session.commit()
+        assert HeuresSemaine.query.count() == 1
+
+        HeuresTravail.query.delete()
+        db.session.delete(employe)
+        db.session.commit()
+        assert HeuresSemaine.query.count() == 0 and Employee.query.count() == 0
+        print("✅ Employé supprimé avec ses cumuls hebdomadaires")
+
+
+if __name__ == "__main__":
+    print("🧪 Test des cumuls hebdomadaires d'heures")
+    print("=" * 50)
+    try:
+        test_heures_supplementaires_hebdomadaires()
+        test_depassements_quotidiens()
+        test_suppression_employe()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test des index composites
+Vérifie via EXPLAIN QUERY PLAN (SQLite) que les requêtes chaudes des tableaux de bord
+utilisent un index, et que la migration Alembic crée les mêmes index que les modèles
+"""
+
+import sys
+import os
+import importlib.util
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine, inspect, func
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from app import db
+from app.models import (Employee, Absence, Conge, Evaluation, HistoriqueConge, EmployeeHistory,
+                        NotificationPresence, BulletinPaie, ElementPaie, AvanceSalaire, Candidat, Entretien,
+                        ParticipantEntretien)
+from outils_tests import creer_app_test
+
+VERSIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations', 'versions')
+
+
+def plan_requete(query):
+    """Retourne les lignes de détail de EXPLAIN QUERY PLAN pour une requête"""
+    statement = query.statement if hasattr(query, 'statement') else query
+    sql = str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + sql).fetchall()
+    return [row[-1] for row in rows]
+
+
+def requetes_chaudes():
+    """Requêtes représentatives des tableaux de bord et listes"""
+    today = date.today()
+    return {
+        'employes_actifs': Employee.query.filter_by(statut='Actif'),
+        'employes_par_departement': db.session.query(
+            Employee.departement, func.count(Employee.id)
+        ).filter(Employee.statut == 'Actif').group_by(Employee.departement),
+        'absences_du_jour': Absence.query.filter_by(date_absence=today),
+        'absences_non_justifiees': Absence.query.filter_by(etat='Non justifiée'),
+        'absences_employe': Absence.query.filter(Absence.employe_id == 1,
+                                                 Absence.date_absence >= today.replace(day=1)),
+        'conges_en_attente': Conge.query.filter_by(statut='En attente'),
+        'conges_en_cours': Conge.query.filter(Conge.statut == 'Approuvé',
+                                              Conge.date_debut <= today, Conge.date_fin >= today),
+        'conges_employe': Conge.query.filter_by(employe_id=1, statut='Approuvé'),
+        'evaluations_annee': Evaluation.query.filter_by(annee=today.year, statut='Terminée'),
+        'evaluations_employe': Evaluation.query.filter_by(employe_id=1),
+        'historique_conge': HistoriqueConge.query.filter_by(conge_id=1).order_by(HistoriqueConge.date_action),
+        'historique_employe': EmployeeHistory.query.filter_by(employee_id=1),
+        'notifications_nouvelles': NotificationPresence.query.filter(
+            NotificationPresence.statut == 'nouvelle', NotificationPresence.date_reference >= today),
+        'bulletins_brouillon': BulletinPaie.query.filter_by(statut='brouillon'),
+        'elements_bulletin': ElementPaie.query.filter_by(bulletin_id=1, type_element='gain'),
+        'avances_employe': AvanceSalaire.query.filter_by(employe_id=1, statut='En cours'),
+        'avances_en_attente': AvanceSalaire.query.filter(AvanceSalaire.statut.in_(['En attente', 'Approuvée'])),
+        'pipeline_candidats': db.session.query(
+            Candidat.offre_emploi_id, Candidat.statut, func.count()
+        ).filter(Candidat.offre_emploi_id.in_([1, 2, 3])).group_by(Candidat.offre_emploi_id, Candidat.statut),
+        'pipeline_entretiens': db.session.query(
+            Entretien.offre_emploi_id, func.count()
+        ).filter(Entretien.offre_emploi_id.in_([1, 2, 3])).group_by(Entretien.offre_emploi_id),
+        'occupations_participants': ParticipantEntretien.query.filter(
+            ParticipantEntretien.employe_id.in_([1, 2]),
+            ParticipantEntretien.debut < datetime.combine(today, datetime.min.time()) + timedelta(hours=18),
+            ParticipantEntretien.debut > datetime.combine(today, datetime.min.time())),
+    }
+
+
+def test_requetes_utilisent_index():
+    """Aucune requête chaude ne doit faire de parcours complet de table"""
+    app = creer_app_test()
+    with app.app_context():
+        db.create_all()
+        echecs = {}
+        for nom, query in requetes_chaudes().items():
+            details = plan_requete(query)
+            scans = [d for d in details if d.startswith('SCAN ') and 'INDEX' not in d]
+            if scans:
+                echecs[nom] = details
+            else:
+                print(f"✅ {nom} : {' | '.join(details)}")
+        for nom, details in echecs.items():
+            print(f"❌ {nom} : {' | '.join(details)}")
+        assert not echecs, f"Parcours complet de table : {sorted(echecs)}"
+
+
+def charger_migrations():
+    """Charge les révisions Alembic de migrations/versions dans l'ordre de la chaîne"""
+    modules = {}
+    for nom_fichier in os.listdir(VERSIONS_DIR):
+        if not nom_fichier.endswith('.py'):
+            continue
+        spec = importlib.util.spec_from_file_location(nom_fichier[:-3], os.path.join(VERSIONS_DIR, nom_fichier))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        modules[module.down_revision] = module
+
+    revisions = []
+    precedente = None
+    while precedente in modules:
+        revisions.append(modules[precedente])
+        precedente = revisions[-1].revision
+    return revisions
+
+
+def test_migration_coherente_avec_modeles():
+    """La chaîne de migrations crée exactement les index déclarés dans les modèles"""
+    engine = create_engine('sqlite://')
+    revisions = charger_migrations()
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            for revision in revisions:
+                revision.upgrade()
+
+    inspector = inspect(engine)
+    for table in db.metadata.sorted_tables:
+        attendus = {index.name for index in table.indexes}
+        presents = {index['name'] for index in inspector.get_indexes(table.name)}
+        assert attendus <= presents, f"{table.name} : index manquants {attendus - presents}"
+
+    with engine.begin() as connection:
+        with Operations.context(MigrationContext.configure(connection)):
+            for revision in reversed(revisions[1:]):
+                revision.downgrade()
+    assert not any(index['name'] == 'idx_conge_statut_dates' for index in inspect(engine).get_indexes('conge'))
+    print("✅ Migration des index cohérente avec les modèles")
+
+
+if __name__ == "__main__":
+    print("🧪 Test des index composites")
+    print("=" * 50)
+    try:
+        test_requetes_utilisent_index()
+        test_migration_coherente_avec_modeles()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print("🎉 Tous les tests d'index sont passés")
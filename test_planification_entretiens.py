@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test de la planification des entretiens
+Vérifie la détection des conflits (entretien ou congé d'un participant), la recherche des
+créneaux libres communs (durée et nombre contrôlés par l'API) et la suppression des
+participations avec l'employé
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime, timedelta
+
+from app import db
+from app.models import OffreEmploi, Candidat, Conge, Entretien, ParticipantEntretien
+from app.routes.recrutement import recrutement_bp
+from app.utils.planification_entretiens import planifier_entretien, conflits_participants, creneaux_libres
+from outils_tests import creer_app_test, creer_client_connecte, creer_employes
+
+LUNDI = date(2026, 3, 2)
+
+
+def preparer():
+    """Deux employés ; le premier a un entretien lundi 9h-10h, le second est en congé mardi"""
+    db.create_all()
+    premier, second = creer_employes(2)
+    offre = OffreEmploi(titre='Développeur', departement='IT')
+    db.session.add(offre)
+    db.session.flush()
+    candidat = Candidat(nom='Awa', email='awa@test.local', telephone='600000000', offre_emploi_id=offre.id)
+    db.session.add_all([candidat, Conge(employe_id=second.id, type_conge='Annuel', date_debut=date(2026, 3, 3),
+                                        date_fin=date(2026, 3, 3), nombre_jours=1, statut='Approuvé')])
+    db.session.flush()
+    planifier_entretien(candidat, 'Technique', datetime(2026, 3, 2, 9), 60, [premier.id])
+    db.session.commit()
+    return candidat, premier, second
+
+
+def test_conflits():
+    """Chevauchement d'entretien et congé refusés, créneau adjacent accepté"""
+    app = creer_app_test()
+    with app.app_context():
+        candidat, premier, second = preparer()
+        conflits = conflits_participants([premier.id, second.id], datetime(2026, 3, 2, 9, 30),
+                                         datetime(2026, 3, 2, 10, 30))
+        assert len(conflits) == 1 and conflits[0].endswith('entretien de 02/03/2026 09:00 à 10:00')
+        assert 'congé du 03/03/2026 au 03/03/2026' in conflits_participants(
+            [second.id], datetime(2026, 3, 3, 14), datetime(2026, 3, 3, 15))[0]
+
+        try:
+            planifier_entretien(candidat, 'RH', datetime(2026, 3, 2, 9, 45), 30, [premier.id])
+            assert False, "entretien en conflit accepté"
+        except ValueError:
+            pass
+        planifier_entretien(candidat, 'RH', datetime(2026, 3, 2, 10), 30, [premier.id, second.id])
+        db.session.commit()
+        assert ParticipantEntretien.query.count() == 3
+        print("✅ Conflits d'entretien et de congé détectés")
+
+
+def test_creneaux_libres():
+    """Créneaux communs après l'entretien du lundi, mardi (congé) et week-end sautés"""
+    app = creer_app_test(ENTRETIENS_HEURE_DEBUT=8, ENTRETIENS_HEURE_FIN=18)
+    with app.app_context():
+        _, premier, second = preparer()
+        creneaux = creneaux_libres([premier.id, second.id], LUNDI, date(2026, 3, 9), 60, nombre=3,
+                                   maintenant=datetime(2026, 3, 1))
+        assert [debut for debut, _ in creneaux] == [
+            datetime(2026, 3, 2, 8), datetime(2026, 3, 2, 10), datetime(2026, 3, 2, 11)]
+
+        tardifs = creneaux_libres([second.id], LUNDI, date(2026, 3, 9), 120, nombre=50,
+                                  maintenant=datetime(2026, 3, 1))
+        jours = {debut.date() for debut, _ in tardifs}
+        assert date(2026, 3, 3) not in jours and date(2026, 3, 7) not in jours
+        assert all(8 <= debut.hour and fin.hour <= 18 for debut, fin in tardifs)
+        print(f"✅ Premiers créneaux communs : {[d.strftime('%a %H:%M') for d, _ in creneaux]}")
+
+
+def test_api_creneaux():
+    """Durée hors de 1..ENTRETIEN_DUREE_MAX refusée, nombre ramené à au moins un créneau"""
+    app = creer_app_test(SECRET_KEY='test', TESTING=True, ENTRETIEN_DUREE_MAX=240)
+    app.register_blueprint(recrutement_bp)
+    client = creer_client_connecte(app, 'recrutement')
+    with app.app_context():
+        ids = ','.join(str(employe.id) for employe in creer_employes(2))
+
+    def creneaux(**parametres):
+        parametres = {'participants': ids, 'date_debut': '2030-03-04', 'date_fin': '2030-03-08', **parametres}
+        return client.get('/recrutement/entretiens/creneaux', query_string=parametres)
+
+    for duree in (0, -60, 241):
+        reponse = creneaux(duree=duree)
+        assert reponse.status_code == 400 and '1 à 240 minutes' in reponse.get_json()['error'], duree
+    for nombre in (0, -5):
+        assert len(creneaux(duree=60, nombre=nombre).get_json()['creneaux']) == 1, nombre
+
+    resultat = creneaux(duree=240, nombre=2).get_json()['creneaux']
+    assert len(resultat) == 2
+    assert all(datetime.fromisoformat(c['fin']) - datetime.fromisoformat(c['debut']) == timedelta(hours=4)
+               for c in resultat)
+    print("✅ Durées nulle, négative et trop longue refusées, nombre minimal d'un créneau")
+
+
+def test_suppression_employe():
+    """Supprimer un employé retire ses participations sans supprimer l'entretien"""
+    app = creer_app_test()
+    with app.app_context():
+        _, premier, _ = preparer()
+        db.session.delete(premier)
+        db.session.commit()
+        assert ParticipantEntretien.query.count() == 0 and Entretien.query.count() == 1
+        print("✅ Participations supprimées avec l'employé")
+
+
+if __name__ == "__main__":
+    print("🧪 Test de la planification des entretiens")
+    print("=" * 50)
+    try:
+        test_conflits()
+        test_creneaux_libres()
+        test_api_creneaux()
+        test_suppression_employe()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test de la recherche plein texte des candidats
+Vérifie l'indexation incrémentale (nouvelles candidatures et CV extraits après un premier
+passage), le filtre par offre et la neutralisation de la syntaxe FTS saisie
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tempfile
+from datetime import datetime
+
+from app import db
+from app.models import OffreEmploi, Candidat, FichierCandidature
+from app.utils.recherche_candidats import synchroniser_index, rechercher_candidats, requete_fts
+from outils_tests import creer_app_test
+
+
+def creer_app_recherche():
+    """Application minimale dont l'index FTS est dans un dossier temporaire"""
+    return creer_app_test(RECHERCHE_CANDIDATS_INDEX=os.path.join(tempfile.mkdtemp(), 'index.db'))
+
+
+def preparer():
+    """Deux offres ; un CV extrait partagé par deux candidats, un CV en attente d'extraction"""
+    db.create_all()
+    developpeur = OffreEmploi(titre='Développeur', departement='IT')
+    comptable = OffreEmploi(titre='Comptable', departement='Finance')
+    extrait = FichierCandidature(empreinte='a' * 64, chemin='cv/a.pdf', taille=100, statut_extraction='terminee',
+                                 texte='Expérience Python et Django', date_extraction=datetime(2026, 3, 1, 8))
+    en_attente = FichierCandidature(empreinte='b' * 64, chemin='cv/b.pdf', taille=100)
+    db.session.add_all([developpeur, comptable, extrait, en_attente])
+    db.session.flush()
+    db.session.add_all([
+        Candidat(nom='Awa Diallo', email='awa@test.local', telephone='600000000',
+                 offre_emploi_id=developpeur.id, cv_fichier_id=extrait.id),
+        Candidat(nom='Koffi Yao', email='koffi@test.local', telephone='600000001',
+                 offre_emploi_id=developpeur.id, cv_fichier_id=en_attente.id),
+        Candidat(nom='Marie Kouassi', email='marie@test.local', telephone='600000002',
+                 offre_emploi_id=comptable.id, cv_fichier_id=extrait.id),
+    ])
+    db.session.commit()
+    return developpeur, comptable, en_attente
+
+
+def noms(texte, offre_id=None):
+    return sorted(r['nom'] for r in rechercher_candidats(texte, offre_id)['resultats'])
+
+
+def test_indexation_incrementale():
+    """Nouvelle candidature indexée, CV extrait après le premier passage réindexé, rien d'autre réécrit"""
+    app = creer_app_recherche()
+    with app.app_context():
+        _, comptable, en_attente = preparer()
+        assert synchroniser_index() == 3
+        assert synchroniser_index() == 0
+        assert noms('kubernetes') == []
+
+        en_attente.statut_extraction = 'terminee'
+        en_attente.texte = 'Administration Kubernetes'
+        en_attente.date_extraction = datetime(2026, 3, 2, 8)
+        db.session.add(Candidat(nom='Jean Konan', email='jean@test.local', telephone='600000003',
+                                offre_emploi_id=comptable.id))
+        db.session.commit()
+        assert synchroniser_index() == 2
+        assert synchroniser_index() == 0
+
+        assert noms('kubernetes') == noms('kuber') == ['Koffi Yao']
+        assert noms('jean') == ['Jean Konan']
+        assert noms('koffi') == ['Koffi Yao']  # document remplacé, pas dupliqué
+        print("✅ Nouvelle candidature et CV extrait indexés au passage suivant")
+
+
+def test_filtre_offre():
+    """Un même CV sur deux offres : le filtre par offre ne garde que le candidat de l'offre"""
+    app = creer_app_recherche()
+    with app.app_context():
+        developpeur, comptable, _ = preparer()
+        synchroniser_index()
+        assert noms('python') == ['Awa Diallo', 'Marie Kouassi']
+        assert noms('python', developpeur.id) == ['Awa Diallo']
+        assert noms('python', comptable.id) == ['Marie Kouassi']
+        assert noms('comptable', developpeur.id) == []
+        print("✅ Filtre par offre appliqué dans l'index")
+
+
+def test_syntaxe_neutralisee():
+    """Opérateurs et guillemets saisis traités comme des mots, sans erreur FTS"""
+    app = creer_app_recherche()
+    with app.app_context():
+        preparer()
+        synchroniser_index()
+        assert requete_fts('"') == ''
+        assert noms('"') == []
+        for texte in ('AND OR "', 'python AND', 'NOT python', 'awa" OR "*', 'o1 NEAR(', 'offre:o1'):
+            rechercher_candidats(texte)
+        assert noms('python OR') == []
+        assert noms('"python" django') == ['Awa Diallo', 'Marie Kouassi']
+        print("✅ Syntaxe FTS saisie neutralisée")
+
+
+if __name__ == "__main__":
+    print("🧪 Test de la recherche des candidats")
+    print("=" * 50)
+    try:
+        test_indexation_incrementale()
+        test_filtre_offre()
+        test_syntaxe_neutralisee()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test du recalcul des scores d'évaluation
+Vérifie que le score pondéré et la note finale calculés en SQL correspondent au calcul
+Python, et que le nombre de requêtes ne dépend pas du nombre de critères
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date
+
+from app import db
+from app.models import Evaluation, CritereEvaluation
+from app.utils.scores_evaluation import recalculer_score, recalculer_scores, note_finale
+from outils_tests import creer_app_test, compter_requetes, creer_utilisateur, creer_employe
+
+
+def creer_evaluation(employe, evaluateur, nb_criteres, annee=2026):
+    """Évaluation avec nb_criteres critères de scores et poids variés"""
+    evaluation = Evaluation(employe_id=employe.id, evaluateur_id=evaluateur.id, periode=str(annee), annee=annee,
+                            score_global=0, date_evaluation=date(annee, 12, 1))
+    db.session.add(evaluation)
+    db.session.flush()
+    db.session.add_all([
+        CritereEvaluation(evaluation_id=evaluation.id, section='S', critere=f'C{i}',
+                          score_obtenu=(i * 7) % 11, score_max=10, poids=1 + i % 3)
+        for i in range(nb_criteres)
+    ])
+    db.session.flush()
+    return evaluation
+
+
+def score_attendu(evaluation):
+    criteres = CritereEvaluation.query.filter_by(evaluation_id=evaluation.id).all()
+    total_points = sum(c.score_obtenu * c.poids for c in criteres)
+    total_max = sum(c.score_max * c.poids for c in criteres)
+    return round(total_points / total_max * 100, 2)
+
+
+def preparer():
+    db.create_all()
+    return creer_employe(), creer_utilisateur()
+
+
+def test_score_pondere_et_note():
+    """Score pondéré identique au calcul Python, note finale cohérente"""
+    app = creer_app_test()
+    with app.app_context():
+        employe, evaluateur = preparer()
+        evaluation = creer_evaluation(employe, evaluateur, 12)
+        sans_critere = creer_evaluation(employe, evaluateur, 0)
+        sans_critere.score_global = 42
+        db.session.flush()
+
+        recalculer_score(evaluation)
+        assert evaluation.score_global == score_attendu(evaluation)
+        assert evaluation.note_finale == note_finale(evaluation.score_global)
+
+        assert recalculer_score(sans_critere) == 0
+        assert sans_critere.score_global == 42
+        print(f"✅ Score pondéré : {evaluation.score_global} ({evaluation.note_finale})")
+
+
+def test_nombre_requetes_constant():
+    """Le recalcul d'une évaluation coûte le même nombre de requêtes avec 2 ou 500 critères"""
+    app = creer_app_test()
+    with app.app_context():
+        employe, evaluateur = preparer()
+        petite = creer_evaluation(employe, evaluateur, 2)
+        grande = creer_evaluation(employe, evaluateur, 500)
+
+        requetes_petite, _ = compter_requetes(lambda: recalculer_score(petite))
+        requetes_grande, _ = compter_requetes(lambda: recalculer_score(grande))
+        assert requetes_petite == requetes_grande, (requetes_petite, requetes_grande)
+        assert grande.score_global == score_attendu(grande)
+        print(f"✅ {requetes_grande} requêtes pour 2 comme pour 500 critères")
+
+
+def test_recalcul_par_annee():
+    """Une seule instruction recalcule toutes les évaluations d'une année"""
+    app = creer_app_test()
+    with app.app_context():
+        employe, evaluateur = preparer()
+        evaluations = [creer_evaluation(employe, evaluateur, n) for n in (3, 8, 20)]
+        autre_annee = creer_evaluation(employe, evaluateur, 5, annee=2025)
+
+        requetes, _ = compter_requetes(lambda: recalculer_scores(annee=2026))
+        assert requetes == 1, requetes
+        for evaluation in evaluations:
+            db.session.refresh(evaluation)
+            assert evaluation.score_global == score_attendu(evaluation)
+        db.session.refresh(autre_annee)
+        assert autre_annee.score_global == 0
+        print("✅ Recalcul d'une année en une instruction")
+
+
+if __name__ == "__main__":
+    print("🧪 Test du recalcul des scores d'évaluation")
+    print("=" * 50)
+    try:
+        test_score_pondere_et_note()
+        test_nombre_requetes_constant()
+        test_recalcul_par_annee()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test de la synchronisation des bornes de pointage hors ligne
+Vérifie l'enregistrement de la borne, l'acquittement et le dédoublonnage des séquences,
+le recalcul des journées touchées dans la transaction du lot, sans email, et la diffusion
+des pointages et des heures aux tableaux de bord
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from datetime import date, datetime
+
+from sqlalchemy import event
+
+from app import db
+from app.models import BornePointage, Pointage, HeuresTravail, HeuresSemaine, ParametrePresence
+from app.routes import conges_temps
+from app.utils.email_service import email_service
+from app.utils.flux_presences import diffuseur_presences
+from outils_tests import creer_app_test, creer_client_connecte, creer_employes
+
+JOUR = date(2026, 3, 4)
+
+
+def creer_app_borne():
+    """Application minimale avec le blueprint des présences et un utilisateur connecté"""
+    app = creer_app_test(SECRET_KEY='test', TESTING=True)
+    app.register_blueprint(conges_temps.conges_temps_bp)
+    client = creer_client_connecte(app, 'presences')
+    with app.app_context():
+        db.session.add(ParametrePresence())
+        db.session.commit()
+    return app, client
+
+
+def evenements_diffuses(abonnement):
+    """Types des événements reçus par un tableau de bord abonné"""
+    types = []
+    while not abonnement.file.empty():
+        types.append(abonnement.file.get_nowait().type)
+    return types
+
+
+def journee(employe_id, sequence, arrivee='08:30'):
+    """Entrée et sortie d'une journée, numérotées à partir de sequence"""
+    return [
+        {'sequence': sequence, 'employe_id': employe_id, 'type_pointage': 'entree',
+         'horodatage': f'{JOUR.isoformat()}T{arrivee}:00'},
+        {'sequence': sequence + 1, 'employe_id': employe_id, 'type_pointage': 'sortie',
+         'horodatage': f'{JOUR.isoformat()}T18:00:00'},
+    ]
+
+
+def test_identifiant_trop_long():
+    """Identifiant refusé avant toute recherche plutôt que tronqué puis jamais retrouvé"""
+    app, client = creer_app_borne()
+    reponse = client.post(f"/api/presences/bornes/{'B' * 60}/synchro", json={'pointages': []})
+    assert reponse.status_code == 400
+    identifiant = 'B' * 50
+    for _ in range(2):
+        reponse = client.post(f'/api/presences/bornes/{identifiant}/synchro', json={'pointages': []})
+        assert reponse.status_code == 200, reponse.get_json()
+    with app.app_context():
+        assert BornePointage.query.one().identifiant == identifiant
+    print("✅ Identifiant de 60 caractères refusé, borne de 50 retrouvée")
+
+
+def test_synchro_lot():
+    """Lot rejoué : doublons ignorés, journées recalculées en un commit, sans email, et diffusées"""
+    app, client = creer_app_borne()
+    with app.app_context():
+        employes = [e.id for e in creer_employes(3)]
+        db.session.commit()
+    pointages = [p for i, employe_id in enumerate(employes) for p in journee(employe_id, 2 * i + 1, '09:00')]
+
+    emails = []
+    commits = []
+
+    def compter_commit(session):
+        commits.append(session)
+
+    notifier = email_service.notify_attendance_issue
+    email_service.notify_attendance_issue = lambda *args, **kwargs: emails.append(args)
+    event.listen(db.session, 'after_commit', compter_commit)
+    abonnement = diffuseur_presences.abonner()
+    try:
+        reponse = client.post('/api/presences/bornes/B1/synchro',
+                              json={'horloge_appareil': datetime.now().isoformat(), 'pointages': pointages})
+    finally:
+        email_service.notify_attendance_issue = notifier
+        event.remove(db.session, 'after_commit', compter_commit)
+        diffuseur_presences.desabonner(abonnement)
+
+    resultat = reponse.get_json()
+    assert reponse.status_code == 200, resultat
+    assert resultat['ack'] == 6 and resultat['acceptes'] == 6 and resultat['journees_recalculees'] == 3
+    # Lot et recalcul des journées dans la même transaction
+    assert len(commits) == 1 and emails == []
+    types = evenements_diffuses(abonnement)
+    assert types.count('pointage') == 6 and types.count('heures') == 3 and 'notifications' in types
+    with app.app_context():
+        heures = HeuresTravail.query.filter_by(date_travail=JOUR).all()
+        assert len(heures) == 3 and {h.statut for h in heures} == {'retard'}
+        assert HeuresSemaine.query.count() == 3
+
+    relance = client.post('/api/presences/bornes/B1/synchro', json={'pointages': pointages}).get_json()
+    assert relance['acceptes'] == 0 and relance['doublons'] == 6 and relance['ack'] == 6
+    with app.app_context():
+        assert Pointage.query.count() == 6
+    print(f"✅ {resultat['acceptes']} pointages, {len(commits)} commit, aucun email, {len(types)} événements diffusés")
+
+
+def test_echec_recalcul():
+    """Recalcul en échec : rien n'est acquitté ni diffusé, le lot renvoyé est accepté"""
+    app, client = creer_app_borne()
+    with app.app_context():
+        employe_id = creer_employes(1)[0].id
+        db.session.commit()
+
+    def echec(*args, **kwargs):
+        raise RuntimeError("recalcul impossible")
+
+    actualiser = conges_temps.actualiser_heures_semaine
+    conges_temps.actualiser_heures_semaine = echec
+    abonnement = diffuseur_presences.abonner()
+    try:
+        reponse = client.post('/api/presences/bornes/B1/synchro', json={'pointages': journee(employe_id, 1)})
+    finally:
+        conges_temps.actualiser_heures_semaine = actualiser
+        diffuseur_presences.desabonner(abonnement)
+    assert reponse.status_code == 500 and evenements_diffuses(abonnement) == []
+    with app.app_context():
+        assert Pointage.query.count() == 0 and HeuresTravail.query.count() == 0
+
+    reponse = client.post('/api/presences/bornes/B1/synchro', json={'pointages': journee(employe_id, 1)})
+    assert reponse.get_json()['ack'] == 2 and reponse.get_json()['journees_recalculees'] == 1
+    print("✅ Échec du recalcul : lot non acquitté puis accepté au renvoi")
+
+
+if __name__ == "__main__":
+    print("🧪 Test de la synchronisation des bornes")
+    print("=" * 50)
+    try:
+        test_identifiant_trop_long()
+        test_synchro_lot()
+        test_echec_recalcul()
+    except AssertionError as e:
+        print(f"❌ {e}")
+        sys.exit(1)